@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# Benchmark for vi.baseline.score_connections: times one vectorized scoring pass
+# over synthetic snapshots and reports per-connection cost, which should stay flat
+# as the snapshot grows (linear scaling).
+#
+#   python scripts/bench_anomaly_scoring.py [--sizes 1000 5000 10000 50000] [--per-process]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+# Keep the benchmark away from the real ~/.vi
+os.environ['HOME'] = tempfile.mkdtemp(prefix='vi-bench-')
+os.makedirs(os.path.join(os.environ['HOME'], '.vi', 'logs'), exist_ok=True)
+
+import numpy as np
+
+from vi.baseline import score_connections
+from vi.stats import BaselineAccumulator
+
+from bench_fixtures import synthetic_connections
+
+REPEATS = 5
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark vectorized anomaly scoring')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 10000, 50000])
+    parser.add_argument('--per-process', action='store_true', help='score against per-process baselines')
+    args = parser.parse_args()
+
+    accumulator = BaselineAccumulator(per_process=args.per_process)
+    for seed in range(1, 6):
+        accumulator.update(synthetic_connections(5000, seed))
+
+    print(f"{'connections':>12} {'median ms':>10} {'us/conn':>8} {'flagged':>8}")
+    for n in args.sizes:
+        snapshot = synthetic_connections(n)
+        timings = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            flagged = score_connections(snapshot, accumulator)
+            timings.append(time.perf_counter() - start)
+        median = float(np.median(timings))
+        print(f"{n:>12} {median * 1000:>10.2f} {median * 1e6 / n:>8.2f} {int(flagged.sum()):>8}")
+
+
+if __name__ == '__main__':
+    main()
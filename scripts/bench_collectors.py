@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# Compares the socket backends of vi.collectors on a live host: opens --sockets
+# established loopback TCP sockets (half client, half server ends) spread over
+# --processes child processes, then times each backend listing them, alone and
+# through net_monitor.get_active_connections, and checks that every backend
+# returns the same Connection list for those processes.
+#
+#   python scripts/bench_collectors.py --sockets 10000 --processes 4
+#   python scripts/bench_collectors.py --backends psutil proc
+#
+# Needs an open-file limit above sockets / processes; lsof and psutil need root to
+# see other users' sockets, so run everything as one user.
+
+import argparse
+import os
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent / 'src'))
+
+_home = tempfile.mkdtemp(prefix='vi-collectors-')
+os.environ['HOME'] = _home
+os.makedirs(os.path.join(_home, '.vi', 'logs'))
+
+from vi.collectors import default_backend, list_sockets
+from vi.net_monitor import get_active_connections
+
+
+def hold_connections(pairs: int, ready_fd: int, release_fd: int):
+    # Child: open `pairs` loopback connections, report ready, hold them until released
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1024)
+    held = []
+    for _ in range(pairs):
+        client = socket.create_connection(listener.getsockname())
+        server, _ = listener.accept()
+        held.extend((client, server))
+    os.write(ready_fd, b'x')
+    os.read(release_fd, 1)
+    os._exit(0)
+
+
+def spawn(sockets: int, processes: int) -> tuple[list[int], int]:
+    ready_r, ready_w = os.pipe()
+    release_r, release_w = os.pipe()
+    pids = []
+    for i in range(processes):
+        pairs = sockets // 2 // processes + (1 if i < sockets // 2 % processes else 0)
+        pid = os.fork()
+        if pid == 0:
+            hold_connections(pairs, ready_w, release_r)
+        pids.append(pid)
+    for _ in pids:
+        os.read(ready_r, 1)
+    return pids, release_w
+
+
+def timed(func, repeats: int) -> tuple[float, object]:
+    func()
+    timings, result = [], None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time and compare socket backends')
+    parser.add_argument('--sockets', type=int, default=10000)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--backends', nargs='+', default=['lsof', 'psutil', 'proc'])
+    args = parser.parse_args()
+
+    pids, release_fd = spawn(args.sockets, args.processes)
+    ours = set(pids)
+    print(f"Holding {args.sockets} established socket(s) in {args.processes} process(es); "
+          f"'auto' is {default_backend()} here\n")
+    print(f"{'backend':<8} {'sockets':>8} {'list ms':>9} {'connections ms':>15}  identical")
+    reference = None
+    try:
+        for backend in args.backends:
+            list_time, sockets = timed(lambda: list_sockets(backend), args.repeats)
+            full_time, connections = timed(lambda: get_active_connections(backend), args.repeats)
+            rows = [(c.pid, c.process_name, c.user, c.local_ip, c.local_port, c.remote_ip, c.remote_port,
+                     c.status, c.connection_count, c.is_remote_ipv6) for c in connections if c.pid in ours]
+            reference = reference or rows
+            same = 'yes' if rows == reference else f'NO ({len(set(rows) ^ set(reference))} differ)'
+            print(f"{backend:<8} {len(sockets):>8} {list_time * 1000:>9.1f} {full_time * 1000:>15.1f}  {same}")
+    finally:
+        # Every child holds the pipe's write end too, so each is released with a byte
+        os.write(release_fd, b'x' * len(pids))
+        for pid in pids:
+            os.waitpid(pid, 0)
+        shutil.rmtree(_home, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# Exports growing synthetic databases in a throwaway HOME and reports export time
+# and peak traced memory per format. Peak memory should stay flat as the database
+# grows (it depends on --chunk-size only), and a repeated export should write nothing.
+#
+#   python scripts/bench_export.py --rows 50000 200000 400000 --chunk-size 50000
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent / 'src'))
+
+_home = tempfile.mkdtemp(prefix='vi-export-')
+os.environ['HOME'] = _home
+os.makedirs(os.path.join(_home, '.vi', 'logs'))
+
+from bench_fixtures import synthetic_connections
+
+from vi.connections.storage import connection_row, init_db, insert_rows
+from vi.export import default_format, export
+
+ROWS_PER_DAY = 50000
+
+
+def grow_to(total: int, current: int, template: list, end: datetime) -> int:
+    # Adds whole days of rows, newest day last, until the database holds `total` rows
+    while current < total:
+        day = current // ROWS_PER_DAY
+        date = end - timedelta(days=1000 - day)
+        insert_rows([((date + timedelta(seconds=i)).strftime('%Y-%m-%d %H:%M:%S'),) + row[1:]
+                     for i, row in enumerate(template)])
+        current += ROWS_PER_DAY
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time and memory of streaming exports as the database grows')
+    parser.add_argument('--rows', type=int, nargs='+', default=[50000, 200000, 400000])
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--formats', nargs='+', default=['csv', default_format()])
+    args = parser.parse_args()
+
+    init_db()
+    template = [connection_row(c) for c in synthetic_connections(ROWS_PER_DAY)]
+    end = datetime.now()
+    current = 0
+    print(f"{'db rows':>8} {'format':>8} {'rows out':>9} {'seconds':>8} {'peak MB':>8} {'rerun rows':>11}")
+    for total in args.rows:
+        current = grow_to(total, current, template, end)
+        for fmt in args.formats:
+            tracemalloc.start()
+            started = time.perf_counter()
+            result = export(fmt, chunk_size=args.chunk_size, full=True)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            rerun = export(fmt, chunk_size=args.chunk_size)['rows']
+            print(f"{current:>8} {fmt:>8} {result['rows']:>9} {elapsed:>8.2f} {peak / 1e6:>8.1f} {rerun:>11}")
+    shutil.rmtree(_home, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# Compares per-feature statistics computed over the columnar feature store (NumPy
+# memmaps) with the same aggregate as a SQL scan of the connections table, in a
+# throwaway HOME. The store is filled column-wise with --rows synthetic rows; SQLite
+# with --sql-rows (a full 100M-row table takes hours to build), and both report
+# rows per second so the two can be compared at any size.
+#
+#   python scripts/bench_feature_store.py --rows 20000000 --sql-rows 1000000
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent / 'src'))
+
+_home = tempfile.mkdtemp(prefix='vi-features-')
+os.environ['HOME'] = _home
+os.makedirs(os.path.join(_home, '.vi', 'logs'))
+
+import numpy as np
+
+from bench_fixtures import synthetic_connections
+
+from vi.connections.storage import DB_PATH, connection_row, init_db, insert_rows
+from vi.db import get_connection
+from vi.feature_store import FeatureStore
+from vi.stats import FEATURES
+
+BATCH = 1_000_000
+
+
+def fill_store(store: FeatureStore, rows: int, end: float):
+    rng = np.random.default_rng(0)
+    processes = store.intern('process_id', [f'proc{i}' for i in range(200)])
+    ips = store.intern('ip_id', [f'10.0.{i // 256}.{i % 256}' for i in range(5000)])
+    start = end - 90 * 86400
+    step = (end - start) / rows
+    for offset in range(0, rows, BATCH):
+        n = min(BATCH, rows - offset)
+        store.append_columns({
+            'timestamp': start + (offset + np.arange(n)) * step,
+            'process_id': processes[rng.integers(0, len(processes), n)],
+            'ip_id': ips[rng.integers(0, len(ips), n)],
+            'cpu_percent': rng.gamma(2.0, 3.0, n),
+            'memory_rss': rng.lognormal(18, 1, n),
+            'connection_count': rng.integers(1, 50, n),
+            'duration_seconds': rng.exponential(120, n),
+            'is_remote_ipv6': rng.integers(0, 2, n),
+            'anomaly_score': np.full(n, np.nan)
+        })
+
+
+def fill_sqlite(rows: int):
+    init_db()
+    template = [connection_row(c) for c in synthetic_connections(10000)]
+    day = datetime.now() - timedelta(days=1)
+    for offset in range(0, rows, len(template)):
+        timestamp = (day + timedelta(seconds=offset // len(template))).strftime('%Y-%m-%d %H:%M:%S')
+        insert_rows([(timestamp,) + row[1:] for row in template[:rows - offset]])
+
+
+def report(label: str, rows: int, func):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<48} {rows:>11} rows {elapsed:>8.2f}s {rows / elapsed / 1e6:>8.1f}M rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Feature statistics over memmapped columns vs a SQL scan')
+    parser.add_argument('--rows', type=int, default=20_000_000)
+    parser.add_argument('--sql-rows', type=int, default=1_000_000)
+    parser.add_argument('--segment-rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    store = FeatureStore(Path(_home) / 'features', segment_rows=args.segment_rows)
+    started = time.perf_counter()
+    fill_store(store, args.rows, time.time())
+    print(f"Wrote {args.rows} row(s) in {len(store.segments())} segment(s) in {time.perf_counter() - started:.1f}s")
+    fill_sqlite(args.sql_rows)
+    print()
+
+    report(f"store: stats of {len(FEATURES)} features", args.rows,
+           lambda: [store.stats(feature) for feature in FEATURES])
+    report("store: cpu_percent of one process", args.rows, lambda: store.stats('cpu_percent', process_name='proc7'))
+    report("store: cpu_percent over the last 7 days", args.rows * 7 // 90, lambda: store.stats('cpu_percent', since='7d'))
+    db_conn = get_connection(DB_PATH)
+    report(f"sqlite: stats of {len(FEATURES)} features", args.sql_rows, lambda: [
+        db_conn.execute(f"SELECT COUNT({f}), AVG({f}), AVG({f} * {f}) FROM connections WHERE {f} IS NOT NULL").fetchone()
+        for f in FEATURES
+    ])
+    shutil.rmtree(_home, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# Synthetic, deterministic inputs for Vi's benchmarks: `lsof -i -n -P` output and
+# Connection lists shaped like a busy host (a few hundred processes, repeated
+# remote IPs, a mix of IPv4 and IPv6), plus stand-in model weights.
+
+import numpy as np
+
+LSOF_HEADER = "COMMAND     PID   USER   FD   TYPE             DEVICE SIZE/OFF NODE NAME"
+
+PROCESS_NAMES = ('Google\\x20Chrome', 'Slack', 'Dropbox', 'python3', 'ssh', 'Spotify', 'mds', 'curl')
+
+
+def _remote_ip(rng_value: int, ipv6: bool) -> str:
+    if ipv6:
+        return f"2606:4700:{rng_value % 4096:x}::{rng_value % 251 + 1:x}"
+    return f"{rng_value % 200 + 20}.{rng_value // 200 % 256}.{rng_value // 51200 % 256}.{rng_value % 251 + 1}"
+
+
+def synthetic_lsof_output(n: int, seed: int = 0, processes: int = 300, ipv6_share: float = 0.1,
+                          noise_share: float = 0.1) -> str:
+    """
+    n lines of lsof output. About noise_share of them are LISTEN/UDP sockets that
+    the parser must skip; the rest are ESTABLISHED TCP connections.
+    """
+    rng = np.random.default_rng(seed)
+    pids = rng.integers(2_000_000, 3_000_000, processes)
+    proc = rng.integers(0, processes, n)
+    remotes = rng.integers(0, max(n // 4, 1), n)
+    is_v6 = rng.random(n) < ipv6_share
+    noise = rng.random(n) < noise_share
+    lines = [LSOF_HEADER]
+    for i in range(n):
+        p = int(proc[i])
+        name = PROCESS_NAMES[p % len(PROCESS_NAMES)]
+        prefix = f"{name:<10} {pids[p]:>6} bench   {i % 200 + 3}u  IPv{6 if is_v6[i] else 4} 0x{i:016x}      0t0  "
+        if noise[i]:
+            lines.append(prefix + (f"UDP *:{5000 + i % 1000}" if i % 2 else f"TCP *:{8000 + i % 1000} (LISTEN)"))
+        elif is_v6[i]:
+            lines.append(prefix + f"TCP [2001:db8::2]:{40000 + i % 20000}->[{_remote_ip(int(remotes[i]), True)}]:443 (ESTABLISHED)")
+        else:
+            lines.append(prefix + f"TCP 10.0.0.2:{40000 + i % 20000}->{_remote_ip(int(remotes[i]), False)}:443 (ESTABLISHED)")
+    return "\n".join(lines) + "\n"
+
+
+def synthetic_connections(n: int, seed: int = 0, processes: int = 200, ipv6_share: float = 0.1) -> list:
+    """n Connection objects with gamma/lognormal/exponential feature distributions."""
+    from vi.connections.models import Connection
+
+    rng = np.random.default_rng(seed)
+    proc = rng.integers(0, processes, n)
+    remotes = rng.integers(0, max(n // 4, 1), n)
+    is_v6 = rng.random(n) < ipv6_share
+    cpu = rng.gamma(2.0, 3.0, n)
+    rss = rng.lognormal(18, 1, n).astype(int)
+    counts = rng.integers(1, 20, n)
+    durations = rng.exponential(300, n)
+    ports = rng.choice([80, 443, 443, 443, 5223, 8080, 22], n)
+    return [
+        Connection(
+            pid=10_000 + int(proc[i]), process_name=f"proc_{proc[i]}", user="bench",
+            local_ip="2001:db8::2" if is_v6[i] else "10.0.0.2", local_port=40000 + i % 20000,
+            remote_ip=_remote_ip(int(remotes[i]), bool(is_v6[i])), remote_port=int(ports[i]),
+            status="ESTABLISHED", cpu_percent=float(cpu[i]), memory_rss=int(rss[i]),
+            timestamp=None, tag="untagged", connection_count=int(counts[i]),
+            duration_seconds=float(durations[i]), is_remote_ipv6=int(is_v6[i])
+        )
+        for i in range(n)
+    ]
+
+
+def write_dummy_weights(path, seed: int = 0):
+    """Random weights with the dummy model's 5-16-8-1 shape, in ml.export_weights format."""
+    rng = np.random.default_rng(seed)
+    sizes = (5, 16, 8, 1)
+    arrays = {'activations': np.array(['relu', 'relu', 'sigmoid'])}
+    for i, (fan_in, fan_out) in enumerate(zip(sizes, sizes[1:])):
+        arrays[f'kernel_{i}'] = (rng.standard_normal((fan_in, fan_out)) * 0.1).astype(np.float32)
+        arrays[f'bias_{i}'] = np.zeros(fan_out, dtype=np.float32)
+    np.savez(path, **arrays)
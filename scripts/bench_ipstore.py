@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# Benchmark for vi.ipstore: builds a store of random IPv4/IPv6 addresses, then
+# times loading the compacted snapshot and vectorized membership lookups.
+#
+#   python scripts/bench_ipstore.py [--v4 2000000] [--v6 500000] [--lookups 10000]
+
+import argparse
+import ipaddress
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import numpy as np
+
+from vi.ipstore import KnownIPStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the known-IP store')
+    parser.add_argument('--v4', type=int, default=2_000_000)
+    parser.add_argument('--v6', type=int, default=500_000)
+    parser.add_argument('--lookups', type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    v4 = np.unique(rng.integers(0, 2 ** 32, args.v4, dtype=np.uint64).astype(np.uint32))
+    v6 = np.unique(np.frombuffer(rng.bytes(16 * args.v6), dtype='S16'))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path, log_path = Path(tmp) / 'known_ips.npz', Path(tmp) / 'known_ips.log'
+        np.savez(store_path, v4=v4, v6=v6, networks=np.asarray(['100.64.0.0/10'], dtype=str))
+        print(f"snapshot: {len(v4) + len(v6)} address(es), {store_path.stat().st_size / 1e6:.1f} MB")
+
+        start = time.perf_counter()
+        store = KnownIPStore(store_path, log_path).load()
+        print(f"load: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        known = [str(ip) for ip in map(ipaddress.IPv4Address, v4[:args.lookups // 2].tolist())]
+        unknown = [f"203.0.{i % 256}.{i // 256 % 256}" for i in range(args.lookups - len(known))]
+        start = time.perf_counter()
+        hits = store.contains_many(known + unknown)
+        elapsed = time.perf_counter() - start
+        print(f"contains_many: {len(hits)} lookups in {elapsed * 1000:.1f} ms "
+              f"({elapsed * 1e6 / len(hits):.2f} us each), {int(hits.sum())} hit(s)")
+
+        for i in range(1000):
+            store.add(f"198.51.{i // 256}.{i % 256}")
+        start = time.perf_counter()
+        store.flush()
+        store.compact()
+        print(f"compact after 1000 additions: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
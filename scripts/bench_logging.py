@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# Compares logging for one busy scan before and after the queued, rate-limited setup:
+# the old per-process and per-connection INFO lines written synchronously through
+# basicConfig, against vi.logs with per-scan summaries. Reports bytes written and
+# time spent in the scanning thread.
+#
+#   python scripts/bench_logging.py --connections 5000 --processes 800 --scans 20
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent / 'src'))
+
+_home = tempfile.mkdtemp(prefix='vi-bench-')
+os.environ['HOME'] = _home
+os.makedirs(os.path.join(_home, '.vi', 'logs'))
+
+from bench_fixtures import synthetic_connections
+
+from vi import logs
+
+
+def legacy_scan(log, connections, processes):
+    # What a scan used to write: every process, every connection and every new link
+    log.info('Active Processes:')
+    for pid in range(processes):
+        log.info(f'     PID: {pid}, Name: proc_{pid}')
+    for conn in connections:
+        log.info(f'     {conn}')
+    log.info(f"[DEBUG] Total established connections: {len(connections)}")
+    log.info("[TRACKER] Tracking process-IP linkage...")
+    for conn in connections:
+        log.debug(f"[KNOWN LINK] PID {conn.pid} -> {conn.remote_ip}")
+
+
+def summary_scan(log, connections, processes):
+    # What a scan writes now: one line per stage, plus any per-item warnings (rate limited)
+    log.info(f"[SYSTEM] {processes} active process(es), 0 started, 0 exited",
+             extra={'processes': processes, 'started': 0, 'exited': 0})
+    log.debug(f"[NET] {len(connections)} established connection(s) from {processes} process(es)")
+    log.info(f"[FLOWS] 0 opened, 0 drifted, {len(connections)} unchanged, 0 closed")
+    for conn in connections[:200]:
+        log.warning(f"Statistical outlier detected: {conn.process_name} (PID {conn.pid}) -> {conn.remote_ip}")
+
+
+def run(scan, configure, path, connections, processes, scans):
+    configure()
+    log = logging.getLogger('vi.bench')
+    started = time.perf_counter()
+    for _ in range(scans):
+        scan(log, connections, processes)
+    elapsed = time.perf_counter() - started
+    logs.stop_logging()
+    logging.shutdown()
+    size = sum(p.stat().st_size for p in path.parent.glob(path.name + '*'))
+    return elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare per-item and summary logging for busy scans')
+    parser.add_argument('--connections', type=int, default=5000)
+    parser.add_argument('--processes', type=int, default=800)
+    parser.add_argument('--scans', type=int, default=20)
+    args = parser.parse_args()
+    connections = synthetic_connections(args.connections)
+    log_dir = Path(_home) / '.vi' / 'logs'
+
+    legacy_path = log_dir / 'legacy.log'
+
+    def configure_legacy():
+        logging.basicConfig(filename=legacy_path, level=logging.DEBUG,
+                            format='%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+
+    def configure_queued():
+        logs.configure_logging(path=log_dir / 'vi.log', max_bytes=0)
+
+    legacy = run(legacy_scan, configure_legacy, legacy_path, connections, args.processes, args.scans)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    queued = run(summary_scan, configure_queued, log_dir / 'vi.log', connections, args.processes, args.scans)
+
+    print(f"{'setup':<22} {'scan-thread ms/scan':>20} {'KB written':>12}")
+    for name, (elapsed, size) in (('per-item, synchronous', legacy), ('summaries, queued', queued)):
+        print(f"{name:<22} {elapsed * 1000 / args.scans:>20.2f} {size / 1024:>12.1f}")
+    print(f"Reduction: {legacy[0] / queued[0]:.0f}x scan-thread time, {legacy[1] / max(queued[1], 1):.0f}x volume")
+    shutil.rmtree(_home, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# Times vi.query over months of synthetic history in a throwaway HOME: daily
+# partitions of raw rows (kept for the whole period), their per-minute rollups and
+# an alerts table. Each query should come back well under a second.
+#
+#   python scripts/bench_query.py --days 90 --rows-per-day 10000
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent / 'src'))
+
+_home = tempfile.mkdtemp(prefix='vi-query-')
+os.environ['HOME'] = _home
+os.makedirs(os.path.join(_home, '.vi', 'logs'))
+
+from bench_fixtures import synthetic_connections
+
+from vi import query
+from vi.alerts import DB_PATH as ALERTS_DB_PATH, init_alerts_db
+from vi.connections.retention import run_retention
+from vi.connections.storage import connection_row, init_db, insert_rows
+from vi.db import transaction
+
+# Queries must stream their first page / finish within this many seconds
+BUDGET = 1.0
+
+
+def populate(days: int, rows_per_day: int, end: datetime):
+    init_db()
+    init_alerts_db()
+    template = [connection_row(c) for c in synthetic_connections(rows_per_day)]
+    step = 86400 / rows_per_day
+    for day in range(days):
+        date = end - timedelta(days=days - day)
+        insert_rows([((date + timedelta(seconds=i * step)).strftime('%Y-%m-%d %H:%M:%S'),) + row[1:]
+                     for i, row in enumerate(template)])
+        with transaction(ALERTS_DB_PATH) as db_conn:
+            db_conn.executemany(
+                'INSERT INTO alerts (timestamp, type, process_name, pid, remote_ip, remote_port, severity) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [((date + timedelta(seconds=i * 600)).strftime('%Y-%m-%d %H:%M:%S'), 'outlier', row[3], row[1],
+                  row[6], row[7], 'low') for i, row in enumerate(template[:144])]
+            )
+    run_retention(raw_days=days + 1, rollup_days=days + 1, now=end)
+
+
+def timed(label: str, func):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    flag = 'ok' if elapsed < BUDGET else 'SLOW'
+    print(f"{label:<66} {elapsed * 1000:>9.1f} ms {len(result):>8} rows  {flag}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time forensic queries over months of history')
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--rows-per-day', type=int, default=10000)
+    args = parser.parse_args()
+
+    end = datetime.now().replace(microsecond=0)
+    started = time.perf_counter()
+    populate(args.days, args.rows_per_day, end)
+    print(f"Populated {args.days} day(s) x {args.rows_per_day} row(s) in {time.perf_counter() - started:.1f}s\n")
+
+    sample = synthetic_connections(args.rows_per_day)[0]
+    ip, process, port = sample.remote_ip, sample.process_name, sample.remote_port
+    since = f"{args.days}d"
+    slow = [
+        timed(f"connections --ip {ip} --since {since}",
+              lambda: list(query.query('connections', since=since, remote_ip=ip))),
+        timed(f"connections --process {process} --port {port} --since {since} --limit 500",
+              lambda: query.page('connections', limit=500, since=since, process_name=process, remote_port=port)[0]),
+        timed("connections in one hour a month ago",
+              lambda: list(query.query('connections', since=end - timedelta(days=30),
+                                       until=end - timedelta(days=30, hours=-1)))),
+        timed(f"talkers --ip {ip} --since {since}", lambda: query.talkers(ip, since=since)),
+        timed(f"rollups --process {process} --since {since} --limit 1000",
+              lambda: query.page('rollups', limit=1000, since=since, process_name=process)[0]),
+        timed(f"alerts --ip {ip} --since {since}", lambda: list(query.query('alerts', since=since, remote_ip=ip))),
+    ]
+
+    # Walk 20 pages deep by cursor: each page should cost about the same
+    cursor, pages = None, []
+    for _ in range(20):
+        t = time.perf_counter()
+        rows, cursor = query.page('connections', limit=1000, after=cursor, since=since)
+        pages.append(time.perf_counter() - t)
+    print(f"{'connections pages 1 / 20 (keyset cursor)':<66} {pages[0] * 1000:>9.1f} ms / {pages[-1] * 1000:.1f} ms")
+
+    shutil.rmtree(_home, ignore_errors=True)
+    if any(elapsed >= BUDGET for elapsed in slow):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# Checks that alert suppression survives a killed daemon. A child process fires
+# --alerts alerts the way the detection stage does (check() and record_alert() in
+# one alerts transaction), then SIGKILLs itself without flushing, so no atexit hook
+# or periodic flush runs. A fresh store must then suppress every one of those keys.
+#
+#   python scripts/check_suppression_restart.py --alerts 50
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+SRC_DIR = SCRIPTS_DIR.parent / 'src'
+
+CHILD = '''
+import os, signal, sys
+from types import SimpleNamespace
+from vi.alerts import DB_PATH, init_alerts_db, record_alert
+from vi.db import transaction
+from vi.suppression import get_suppression_store
+
+init_alerts_db()
+store = get_suppression_store()
+with transaction(DB_PATH):
+    for i in range(int(sys.argv[1])):
+        conn_obj = SimpleNamespace(process_name=f'proc{i}', pid=1000 + i, remote_ip=f'10.0.0.{i % 250}', remote_port=443)
+        if store.check(('new_process', conn_obj.process_name, 443), conn_obj, 'low'):
+            record_alert(conn_obj, 'new_process', severity='low')
+os.kill(os.getpid(), signal.SIGKILL)
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Alert suppression keys across a killed daemon')
+    parser.add_argument('--alerts', type=int, default=50)
+    args = parser.parse_args()
+
+    home = tempfile.mkdtemp(prefix='vi-suppression-')
+    os.makedirs(os.path.join(home, '.vi', 'logs'))
+    env = dict(os.environ, HOME=home, PYTHONPATH=str(SRC_DIR))
+    child = subprocess.run([sys.executable, '-c', CHILD, str(args.alerts)], env=env)
+    if child.returncode != -signal.SIGKILL:
+        print(f'FAIL: child exited with {child.returncode}, expected SIGKILL')
+        return 1
+
+    # The restarted side runs in this process, against the same HOME
+    os.environ['HOME'] = home
+    sys.path.insert(0, str(SRC_DIR))
+    from types import SimpleNamespace
+    from vi.alerts import DB_PATH
+    from vi.db import get_connection
+    from vi.suppression import get_suppression_store
+
+    alerts = get_connection(DB_PATH).execute('SELECT COUNT(*) FROM alerts').fetchone()[0]
+    store = get_suppression_store()
+    restored = len(store.entries)
+    refired = 0
+    for i in range(args.alerts):
+        conn_obj = SimpleNamespace(process_name=f'proc{i}', pid=1000 + i, remote_ip=f'10.0.0.{i % 250}', remote_port=443)
+        refired += store.check(('new_process', conn_obj.process_name, 443), conn_obj, 'low')
+    print(f'{alerts} alert(s) recorded before the kill, {restored} key(s) restored, {refired} re-fired')
+    if alerts != args.alerts or refired:
+        print('FAIL: keys of fired alerts were lost with the process')
+        return 1
+    print('ok')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
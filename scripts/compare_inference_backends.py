@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# Acceptance check for the NumPy inference backend: exports the Keras model's
+# weights, verifies both backends agree, and reports latency and memory.
+#
+#   python scripts/compare_inference_backends.py [path/to/model.keras]
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import numpy as np
+import psutil
+
+from ml.model_loader import MODEL_PATH
+
+TOLERANCE = 1e-5
+BATCH_SIZES = (1, 500)
+REPEATS = 50
+
+
+def rss_mb() -> float:
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def synthetic_features(n: int) -> np.ndarray:
+    # Same ranges the dummy model was trained on (see ml/generate_dummy.py)
+    rng = np.random.default_rng(0)
+    return np.hstack([
+        rng.random((n, 1)) * 100,
+        rng.random((n, 1)) * 100,
+        rng.integers(0, 11, size=(n, 1)),
+        rng.random((n, 1)) * 100,
+        rng.integers(0, 2, size=(n, 1)),
+    ]).astype(np.float64)
+
+
+def median_latency_ms(model, features) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        model.predict(features, verbose=0)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def main():
+    model_path = sys.argv[1] if len(sys.argv) > 1 else MODEL_PATH
+    features = synthetic_features(max(BATCH_SIZES))
+
+    # NumPy backend first, so its footprint is measured before TensorFlow is imported
+    rss_start = rss_mb()
+    from ml.export_weights import export_weights
+    from ml.numpy_model import NumpyModel
+
+    with tempfile.TemporaryDirectory() as tmp:
+        weights_path = os.path.join(tmp, 'model.npz')
+        start = time.perf_counter()
+        export_weights(model_path, weights_path)
+        export_s = time.perf_counter() - start
+        weights_kb = os.path.getsize(weights_path) / 1024
+
+        rss_before_numpy = rss_mb()
+        start = time.perf_counter()
+        numpy_model = NumpyModel.load(weights_path)
+        numpy_load_ms = (time.perf_counter() - start) * 1000
+        numpy_scores = numpy_model.predict(features)[:, 0]
+        numpy_latency = {n: median_latency_ms(numpy_model, features[:n]) for n in BATCH_SIZES}
+        numpy_rss = rss_mb() - rss_before_numpy
+
+    # export_weights already imported Keras, so this measures model load only
+    from keras.models import load_model
+    rss_before_keras = rss_mb()
+    start = time.perf_counter()
+    keras_model = load_model(model_path)
+    keras_load_ms = (time.perf_counter() - start) * 1000
+    keras_scores = keras_model.predict(features, verbose=0)[:, 0]
+    keras_latency = {n: median_latency_ms(keras_model, features[:n]) for n in BATCH_SIZES}
+    keras_rss = rss_mb() - rss_before_keras
+
+    max_diff = float(np.max(np.abs(numpy_scores - keras_scores)))
+    tags_match = bool(np.array_equal(numpy_scores > 0.5, keras_scores > 0.5))
+
+    print(f"Export: {export_s:.2f}s, {weights_kb:.1f} KB of weights")
+    print(f"TensorFlow/Keras import overhead: {rss_before_keras - rss_start:.1f} MB RSS")
+    print(f"{'backend':<8} {'load ms':>9} {'model MB':>9} " + " ".join(f"{f'p50 n={n} ms':>14}" for n in BATCH_SIZES))
+    print(f"{'numpy':<8} {numpy_load_ms:>9.2f} {numpy_rss:>9.1f} " + " ".join(f"{numpy_latency[n]:>14.3f}" for n in BATCH_SIZES))
+    print(f"{'keras':<8} {keras_load_ms:>9.2f} {keras_rss:>9.1f} " + " ".join(f"{keras_latency[n]:>14.3f}" for n in BATCH_SIZES))
+    print(f"Max |score difference| over {len(features)} rows: {max_diff:.2e} (tolerance {TOLERANCE:.0e})")
+    print(f"Tags identical: {tags_match}")
+
+    if max_diff > TOLERANCE or not tags_match:
+        print("FAIL: NumPy backend does not match Keras")
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,39 +1,32 @@
-import sqlite3
-import csv
-from pathlib import Path
+#!/usr/bin/env python3
+# Exports connection history as training data; see vi/export.py. Only rows added
+# since the previous export to the same output are written.
+#
+#   python scripts/export_training_data.py                  # ~/.vi/data/training_data.csv
+#   python scripts/export_training_data.py --format npz     # .npz shards, one per chunk
+#   python scripts/export_training_data.py --format parquet --chunk-size 100000
+#   python scripts/export_training_data.py --full           # start over
 
-DB_PATH = Path.home() / '.vi' / 'logs' / 'connections.sqlite'
-OUTPUT_CSV = Path.home() / '.vi' / 'data' / 'training_data.csv'
-OUTPUT_CSV.parent.mkdir(parents=True, exist_ok=True)
+import argparse
+import os
+import sys
 
-def export_all_data():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
 
-    cursor.execute('''
-        SELECT
-            pid, user, process_name,
-            cpu_percent, memory_rss, connection_count, duration_seconds, is_remote_ipv6,
-            local_port, remote_ip, remote_port,
-            status, tag, anomaly_score, timestamp
-        FROM connections
-    ''')
-    rows = cursor.fetchall()
-    conn.close()
+from vi.export import FORMATS, export
+
+
+def export_all_data(fmt: str = 'csv', output=None, chunk_size: int = 50000, full: bool = False) -> dict:
+    return export(fmt, output, chunk_size=chunk_size, full=full)
 
-    with open(OUTPUT_CSV, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow([
-            'pid', 'user', 'process_name',
-            'cpu_percent', 'memory_rss_mb', 'connection_count', 'duration_seconds', 'is_remote_ipv6',
-            'local_port', 'remote_ip', 'remote_port',
-            'status', 'tag', 'anomaly_score', 'timestamp'
-        ])
-        for row in rows:
-            row = list(row)
-            if row[4] is not None:  # Convert memory_rss from bytes to MB
-                row[4] = round(row[4] / (1024 * 1024), 2)
-            writer.writerow(row)
 
 if __name__ == '__main__':
-    export_all_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Export connection history as training data')
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--output', help='output file (csv) or shard prefix (npz, parquet)')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='rows read and written at a time')
+    parser.add_argument('--full', action='store_true', help='ignore the high-water mark and export everything')
+    args = parser.parse_args()
+    result = export_all_data(args.format, args.output, args.chunk_size, args.full)
+    print(f"Exported {result['rows']} row(s) in {result['chunks']} chunk(s) to {result['output']}"
+          f" (up to {result['timestamp']})")
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# Micro-benchmarks for Vi's hot paths on synthetic fixtures (see bench_fixtures.py).
+# Runs offline in a throwaway HOME: lsof is stubbed, intel lookups hit the warm
+# in-memory cache and the model is a stand-in with the dummy model's shape.
+#
+#   python scripts/run_benchmarks.py                      # compare against bench_baseline.json
+#   python scripts/run_benchmarks.py --sizes 1000 10000   # quicker run
+#   python scripts/run_benchmarks.py --only parse_lsof insert_connections
+#   python scripts/run_benchmarks.py --update-baseline    # record current results
+#
+# Reports median time, throughput (items/s) and peak traced memory per benchmark and
+# size, and exits 1 if throughput drops, or peak memory grows, by more than
+# --tolerance relative to the stored baseline.
+
+import argparse
+import atexit
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent / 'src'))
+
+# Every vi module resolves ~/.vi at import time, so HOME must point elsewhere first
+_home = tempfile.mkdtemp(prefix='vi-bench-')
+atexit.register(shutil.rmtree, _home, ignore_errors=True)
+os.environ['HOME'] = _home
+for sub in ('logs', 'config', 'models'):
+    os.makedirs(os.path.join(_home, '.vi', sub))
+
+from bench_fixtures import synthetic_connections, synthetic_lsof_output, write_dummy_weights
+
+write_dummy_weights(os.path.join(_home, '.vi', 'models', 'dummy_model.npz'))
+
+import numpy as np
+
+from ml import inference
+from vi import behavior, collectors, intel, net_monitor
+from vi.baseline import score_connections, update_baseline
+from vi.behavior import check_behavior, init_behavior_db
+from vi.connections.storage import init_db, insert_connections
+from vi.connections.tracker import track_connections
+from vi.flows import FlowTable
+from vi.intel import get_ip_reputation, init_intel_db
+
+BASELINE_PATH = SCRIPTS_DIR / 'bench_baseline.json'
+DEFAULT_SIZES = (1000, 10000, 100000)
+# Per-row prediction is only timed up to this many rows
+SINGLE_ROW_LIMIT = 1000
+
+
+class Benchmark:
+    """setup(n) returns the argument passed to run(arg); items(n) is the work count."""
+
+    def __init__(self, name, setup, run, warmup: bool = True, items=None):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.warmup = warmup
+        self.items = items or (lambda n: n)
+
+
+def _stub_lsof(n):
+    output = synthetic_lsof_output(n)
+
+    def fake_run(*args, **kwargs):
+        return subprocess.CompletedProcess(args, 0, stdout=output, stderr='')
+    return fake_run
+
+
+def _parse_lsof(fake_run):
+    original = collectors.subprocess.run
+    collectors.subprocess.run = fake_run
+    try:
+        return net_monitor.get_active_connections('lsof')
+    finally:
+        collectors.subprocess.run = original
+
+
+def _reset_behavior(connections):
+    # Steady state: every process and port has been seen, nothing is written
+    behavior.load_seen()
+    check_behavior(connections)
+    return connections
+
+
+def _warm_reputations(connections):
+    for ip in {c.remote_ip for c in connections}:
+        intel._reputation_cache.set(ip, 10)
+    return connections
+
+
+def _get_reputations(connections):
+    for conn in connections:
+        get_ip_reputation(conn.remote_ip)
+
+
+def _predict_rows(connections):
+    for c in connections[:SINGLE_ROW_LIMIT]:
+        inference.predict_connection(c.cpu_percent, c.memory_rss / (1024 * 1024), c.connection_count,
+                                     c.duration_seconds, c.is_remote_ipv6)
+
+
+def _flow_diff(connections):
+    table = FlowTable()
+    table.update(connections)
+    return table, connections
+
+
+BENCHMARKS = [
+    Benchmark('parse_lsof', _stub_lsof, _parse_lsof),
+    Benchmark('check_behavior', lambda n: _reset_behavior(synthetic_connections(n)), check_behavior),
+    Benchmark('insert_connections', synthetic_connections, insert_connections),
+    Benchmark('update_baseline', synthetic_connections, update_baseline),
+    Benchmark('track_connections', synthetic_connections, track_connections),
+    Benchmark('score_connections', synthetic_connections, score_connections),
+    Benchmark('flow_diff', lambda n: _flow_diff(synthetic_connections(n)), lambda arg: arg[0].update(arg[1])),
+    Benchmark('get_ip_reputation_cached', lambda n: _warm_reputations(synthetic_connections(n)), _get_reputations),
+    Benchmark('predict_connections', synthetic_connections, inference.predict_connections),
+    Benchmark('predict_connection', synthetic_connections, _predict_rows,
+              items=lambda n: min(n, SINGLE_ROW_LIMIT)),
+]
+
+
+def measure(bench: Benchmark, n: int, repeats: int) -> dict:
+    arg = bench.setup(n)
+    if bench.warmup:
+        bench.run(arg)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        bench.run(arg)
+        timings.append(time.perf_counter() - start)
+    median = float(np.median(timings))
+
+    # Separate traced run: tracemalloc slows allocation-heavy code too much to time under it
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    bench.run(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    items = bench.items(n)
+    return {
+        'items': items,
+        'median_ms': round(median * 1000, 3),
+        'throughput': round(items / median, 1) if median > 0 else float('inf'),
+        'peak_kb': round(peak / 1024, 1)
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    failures = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if not reference:
+            continue
+        if result['throughput'] < reference['throughput'] * (1 - tolerance):
+            failures.append(f"{key}: throughput {result['throughput']:.0f}/s vs baseline {reference['throughput']:.0f}/s")
+        if result['peak_kb'] > reference['peak_kb'] * (1 + tolerance) + 64:
+            failures.append(f"{key}: peak memory {result['peak_kb']:.0f} KB vs baseline {reference['peak_kb']:.0f} KB")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Vi's hot paths on synthetic fixtures")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--only', nargs='+', choices=[b.name for b in BENCHMARKS])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='allowed relative throughput drop / memory growth before failing')
+    parser.add_argument('--update-baseline', action='store_true', help='write results to the baseline file')
+    args = parser.parse_args()
+
+    # Per-row log lines would dominate several of these paths; time the code, not the I/O
+    logging.disable(logging.WARNING)
+    init_db()
+    init_behavior_db()
+    init_intel_db()
+
+    benchmarks = [b for b in BENCHMARKS if not args.only or b.name in args.only]
+    results = {}
+    print(f"{'benchmark':<26} {'n':>7} {'median ms':>10} {'items/s':>12} {'peak KB':>10}")
+    for bench in benchmarks:
+        for n in args.sizes:
+            result = measure(bench, n, args.repeats)
+            results[f"{bench.name}[{n}]"] = result
+            print(f"{bench.name:<26} {n:>7} {result['median_ms']:>10.2f} {result['throughput']:>12.0f} {result['peak_kb']:>10.0f}")
+
+    if args.update_baseline:
+        baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+        return
+    failures = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+    if failures:
+        print("FAIL: regressions against baseline:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print(f"PASS: within {args.tolerance:.0%} of baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# Fires bursts of alerts through vi.alerts.send_notification in a throwaway HOME,
+# with scripts/stub_notifier.py (sleeping --delay seconds) as the notifier. Reports
+# how long the caller was blocked and how many notifications the stub received: a
+# burst should cost the scan well under a millisecond per alert and arrive as one
+# summary notification.
+#
+#   python scripts/simulate_alert_burst.py --alerts 200 --processes 5 --bursts 3
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent / 'src'))
+
+_home = tempfile.mkdtemp(prefix='vi-notify-')
+os.environ['HOME'] = _home
+os.makedirs(os.path.join(_home, '.vi', 'logs'))
+os.makedirs(os.path.join(_home, '.vi', 'config'))
+_log = os.path.join(_home, 'notifications.jsonl')
+os.environ['VI_STUB_NOTIFIER_LOG'] = _log
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Alert bursts through the notification dispatcher')
+    parser.add_argument('--alerts', type=int, default=200)
+    parser.add_argument('--processes', type=int, default=5)
+    parser.add_argument('--bursts', type=int, default=3)
+    parser.add_argument('--delay', type=float, default=0.5, help='seconds the stub notifier takes')
+    parser.add_argument('--rate-limit', type=float, default=2, help='notifications per minute')
+    args = parser.parse_args()
+
+    with open(os.path.join(_home, '.vi', 'config', 'settings.toml'), 'w') as f:
+        f.write(f'''
+[notifications]
+enable_desktop = true
+notifier = "{sys.executable} {SCRIPTS_DIR / 'stub_notifier.py'}"
+notifier_args = ["--delay", "{args.delay}", "-title", "{{title}}", "-message", "{{message}}"]
+min_severity = "medium"
+coalesce_window = 1.0
+rate_limit = {args.rate_limit}
+''')
+    from vi.alerts import dispatcher_stats, send_notification, stop_dispatcher
+
+    for burst in range(args.bursts):
+        started = time.perf_counter()
+        for i in range(args.alerts):
+            process = f'proc{i % args.processes}'
+            send_notification('Vi Alert', f'Behavioral anomaly [new_process_port] detected: {process} -> {1000 + i}',
+                              severity='medium', anomaly_type='new_process_port', process_name=process)
+            # Below min_severity: filtered before it reaches the queue
+            send_notification('Vi Alert', 'outlier', severity='low', anomaly_type='outlier', process_name=process)
+        blocked = time.perf_counter() - started
+        print(f"burst {burst + 1}: {args.alerts} alert(s) queued, caller blocked {blocked * 1000:.1f} ms "
+              f"({blocked / args.alerts * 1e6:.1f} us per alert)")
+        time.sleep(1.5)
+
+    stop_dispatcher()
+    time.sleep(args.delay + 0.5)
+    with open(_log) as f:
+        received = [json.loads(line)['args'] for line in f]
+    print(f"\nnotifier launched {len(received)} time(s) for {args.alerts * args.bursts} alert(s) "
+          f"(rate limit {args.rate_limit:g}/min)")
+    for notification in received:
+        print('  ', ' '.join(notification))
+    shutil.rmtree(_home, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
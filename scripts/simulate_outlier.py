@@ -1,13 +1,19 @@
 #!/usr/bin/env python3
 
-from src.vi.connections.models import Connection
-from src.vi.baseline import update_baseline
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from vi.connections.models import Connection
+from vi.baseline import score_connections
+from vi.stats import BaselineAccumulator
 
 # Create a "normal" batch of connections
 connections = []
 
 # Simulate normal connections with ~200 seconds duration
-for i in range(10):
+for i in range(40):
     conn = Connection(
         pid=1000 + i,
         process_name=f"test_proc_{i}",
@@ -17,12 +23,12 @@ for i in range(10):
         remote_ip="192.168.1.1",
         remote_port=80,
         status="ESTABLISHED",
-        cpu_percent=5.0,
-        memory_rss=50 * 1024 * 1024,
+        cpu_percent=5.0 + i % 5,
+        memory_rss=(50 + i % 10) * 1024 * 1024,
         timestamp=None,
         tag="untagged",
-        connection_count=1,
-        duration_seconds=200,
+        connection_count=1 + i % 3,
+        duration_seconds=200 + 10 * (i % 7),
         is_remote_ipv6=0
     )
     connections.append(conn)
@@ -47,8 +53,12 @@ outlier_conn = Connection(
 )
 connections.append(outlier_conn)
 
-# Run baseline update to compute anomaly scores
-update_baseline(connections)
+# Scores are relative to history, so build a baseline from the normal batch first
+baseline = BaselineAccumulator()
+baseline.update(connections[:-1])
+
+# Score the whole batch, outlier included, against that baseline
+score_connections(connections, baseline)
 
 # Print all connections with computed anomaly scores
 for conn in connections:
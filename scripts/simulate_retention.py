@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# Simulates a year of connection logging in a throwaway HOME: each day's rows are
+# written through the storage layer, then one rollup and retention pass runs. Prints
+# database size, raw and rollup row counts, and query times along the way, which
+# should level off once raw_days (and later rollup_days) have passed.
+#
+#   python scripts/simulate_retention.py --days 365 --rows-per-day 5000
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent / 'src'))
+
+_home = tempfile.mkdtemp(prefix='vi-retention-')
+os.environ['HOME'] = _home
+os.makedirs(os.path.join(_home, '.vi', 'logs'))
+
+from bench_fixtures import synthetic_connections
+
+from vi.connections.retention import run_retention
+from vi.connections.storage import DB_PATH, connection_row, init_db, insert_rows
+from vi.db import get_connection
+
+
+def timed_query(db_conn, sql: str, params=()) -> float:
+    started = time.perf_counter()
+    db_conn.execute(sql, params).fetchall()
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate a year of storage with rollups and retention')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--rows-per-day', type=int, default=5000)
+    parser.add_argument('--raw-days', type=int, default=7)
+    parser.add_argument('--rollup-days', type=int, default=90)
+    parser.add_argument('--report-every', type=int, default=30)
+    args = parser.parse_args()
+
+    init_db()
+    db_conn = get_connection(DB_PATH)
+    template = [connection_row(c) for c in synthetic_connections(args.rows_per_day)]
+    start = datetime(2024, 1, 1)
+
+    print(f"{'day':>5} {'db MB':>8} {'raw rows':>10} {'rollups':>10} {'raw query ms':>13} {'rollup query ms':>16} {'pass ms':>8}")
+    for day in range(args.days):
+        date = start + timedelta(days=day)
+        # Spread the day's rows over its minutes
+        step = 86400 / len(template)
+        rows = [(
+            (date + timedelta(seconds=i * step)).strftime('%Y-%m-%d %H:%M:%S'),
+        ) + row[1:] for i, row in enumerate(template)]
+        insert_rows(rows)
+
+        started = time.perf_counter()
+        run_retention(args.raw_days, args.rollup_days, now=date + timedelta(days=1))
+        pass_ms = (time.perf_counter() - started) * 1000
+
+        if (day + 1) % args.report_every == 0 or day == args.days - 1:
+            page_size = db_conn.execute('PRAGMA page_size').fetchone()[0]
+            pages = db_conn.execute('PRAGMA page_count').fetchone()[0]
+            raw_rows = db_conn.execute('SELECT COUNT(*) FROM connections').fetchone()[0]
+            rollups = db_conn.execute('SELECT COUNT(*) FROM connection_rollups').fetchone()[0]
+            raw_ms = timed_query(db_conn, 'SELECT process_name, AVG(cpu_percent) FROM connections GROUP BY process_name')
+            rollup_ms = timed_query(db_conn, 'SELECT process_name, SUM(samples) FROM connection_rollups '
+                                             'WHERE minute >= ? GROUP BY process_name',
+                                    ((date - timedelta(days=1)).strftime('%Y-%m-%d'),))
+            print(f"{day + 1:>5} {pages * page_size / 1e6:>8.1f} {raw_rows:>10} {rollups:>10} "
+                  f"{raw_ms:>13.1f} {rollup_ms:>16.1f} {pass_ms:>8.1f}")
+    shutil.rmtree(_home, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
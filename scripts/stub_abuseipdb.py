@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# Local stand-in for the AbuseIPDB check endpoint, for exercising vi.intel offline.
+# Point Vi at it with:  [intel] api_url = "http://127.0.0.1:8765/api/v2/check"
+#
+#   python scripts/stub_abuseipdb.py [--port 8765] [--delay 0.2] [--rate-limit 100]
+#
+# Scores are derived from the IP so repeated runs are deterministic. Once more than
+# --rate-limit requests have been served, every request gets a 429 with Retry-After.
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def make_handler(delay: float, rate_limit: int, retry_after: int):
+    lock = threading.Lock()
+    served = {'count': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            ip = query.get('ipAddress', [''])[0]
+            with lock:
+                served['count'] += 1
+                count = served['count']
+            time.sleep(delay)
+
+            if rate_limit and count > rate_limit:
+                self.send_response(429)
+                self.send_header('Retry-After', str(retry_after))
+                self.end_headers()
+                return
+
+            score = hashlib.sha256(ip.encode()).digest()[0] * 100 // 255
+            body = json.dumps({'data': {'ipAddress': ip, 'abuseConfidenceScore': score}}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            if rate_limit:
+                self.send_header('X-RateLimit-Remaining', str(max(rate_limit - count, 0)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int = 8765, delay: float = 0.0, rate_limit: int = 0, retry_after: int = 60) -> ThreadingHTTPServer:
+    """Starts the stub on a background thread and returns the server."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(delay, rate_limit, retry_after))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stub AbuseIPDB check endpoint')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds to sleep per request')
+    parser.add_argument('--rate-limit', type=int, default=0, help='requests served before returning 429 (0 = unlimited)')
+    parser.add_argument('--retry-after', type=int, default=60)
+    args = parser.parse_args()
+    server = serve(args.port, args.delay, args.rate_limit, args.retry_after)
+    print(f"Stub AbuseIPDB listening on http://127.0.0.1:{server.server_address[1]}/api/v2/check")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+# Stand-in for terminal-notifier: appends its arguments as one JSON line to
+# $VI_STUB_NOTIFIER_LOG (default /tmp/vi-notifications.jsonl), so notifications can
+# be checked without a desktop. Point Vi at it with:
+#   [notifications] notifier = "python3 /path/to/scripts/stub_notifier.py"
+#
+#   python scripts/stub_notifier.py -title 'Vi Alert' -message 'test' [--delay 1]
+
+import json
+import os
+import sys
+import time
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if '--delay' in args:
+        i = args.index('--delay')
+        time.sleep(float(args[i + 1]))
+        del args[i:i + 2]
+    with open(os.environ.get('VI_STUB_NOTIFIER_LOG', '/tmp/vi-notifications.jsonl'), 'a') as f:
+        f.write(json.dumps({'time': time.time(), 'args': args}) + '\n')
@@ -0,0 +1,31 @@
+import numpy as np
+
+from .model_loader import MODEL_PATH, WEIGHTS_PATH
+
+
+def export_weights(model_path=MODEL_PATH, output_path=WEIGHTS_PATH):
+    """Dumps the Dense layers of a Keras model to a compact .npz for NumpyModel."""
+    from keras.models import load_model
+
+    model = load_model(model_path)
+    arrays = {}
+    activations = []
+    for layer in model.layers:
+        weights = layer.get_weights()
+        if not weights:
+            continue
+        if layer.__class__.__name__ != 'Dense':
+            raise ValueError(f"Cannot export layer '{layer.name}' of type {layer.__class__.__name__}")
+        kernel, bias = weights
+        index = len(activations)
+        arrays[f'kernel_{index}'] = kernel.astype(np.float32)
+        arrays[f'bias_{index}'] = bias.astype(np.float32)
+        activations.append(layer.get_config()['activation'])
+
+    np.savez_compressed(output_path, activations=np.array(activations), **arrays)
+    return output_path
+
+
+if __name__ == "__main__":
+    path = export_weights()
+    print("Weights exported to", path)
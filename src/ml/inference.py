@@ -1,10 +1,86 @@
+import os
+import threading
+from typing import Any
+
 import numpy as np
-from .model_loader import load_dummy_model
-from keras.models import Model
+from .model_loader import load_model_backend
 from pydantic import ValidationError
+from vi.config import config
 from vi.connections.schemas import ConnectionFeatures # BaseModel & Field from schemas
 
-model: Model = load_dummy_model()
+# Loaded on first prediction so importing this module stays cheap
+_model: Any = None
+_model_lock = threading.Lock()
+
+
+def get_model() -> Any:
+    """Returns the configured model backend, loading it on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_model_backend(
+                    config.ml['backend'],
+                    os.path.expanduser(config.ml['weights_path'])
+                )
+    return _model
+
+# Feature column order expected by the model
+FEATURE_NAMES = ('cpu_percent', 'memory_rss_mb', 'connection_count', 'duration_seconds', 'is_remote_ipv6')
+
+
+def connection_features(connections) -> np.ndarray:
+    """Builds the (n, 5) feature matrix for a list of Connection objects."""
+    features = np.empty((len(connections), len(FEATURE_NAMES)), dtype=np.float64)
+    for i, conn in enumerate(connections):
+        features[i] = (
+            conn.cpu_percent or 0.0,
+            (conn.memory_rss or 0) / (1024 * 1024),
+            conn.connection_count or 0,
+            conn.duration_seconds or 0.0,
+            conn.is_remote_ipv6 or 0
+        )
+    return features
+
+
+def valid_feature_rows(features: np.ndarray) -> np.ndarray:
+    """
+    Vectorized equivalent of ConnectionFeatures validation.
+    Returns a boolean mask of rows whose features are within bounds.
+    """
+    cpu, mem, count, duration, ipv6 = features.T
+    return (
+        np.isfinite(features).all(axis=1)
+        & (cpu >= 0.0) & (cpu <= 100.0)
+        & (mem >= 0.0)
+        & (count >= 0) & (count == np.floor(count))
+        & (duration >= 0.0)
+        & ((ipv6 == 0) | (ipv6 == 1))
+    )
+
+
+def predict_connections(features):
+    """
+    Predicts a whole snapshot in a single forward pass.
+    Arguments:
+        features: (n, 5) array ordered as FEATURE_NAMES, or a list of Connection objects.
+    Returns (tags, scores): a list of 'normal'/'suspicious' per row and the raw model
+    outputs. Rows that fail validation are tagged 'error' with a NaN score.
+    """
+    if not isinstance(features, np.ndarray):
+        features = connection_features(features)
+    features = np.asarray(features, dtype=np.float64)
+    if features.ndim != 2 or features.shape[1] != len(FEATURE_NAMES):
+        raise ValueError(f"Invalid input shape: expected (n, {len(FEATURE_NAMES)}), got {features.shape}")
+
+    scores = np.full(features.shape[0], np.nan)
+    valid = valid_feature_rows(features)
+    if valid.any():
+        scores[valid] = get_model().predict(features[valid], verbose=0)[:, 0]
+
+    tags = np.where(scores > 0.5, "suspicious", "normal").astype(object)
+    tags[~valid] = "error"
+    return tags.tolist(), scores
 
 
 def predict_connection(cpu_percent, memory_rss_mb, connection_count, duration_seconds, is_remote_ipv6):
@@ -39,7 +115,7 @@ def predict_connection(cpu_percent, memory_rss_mb, connection_count, duration_se
     ]])
     if features.shape != (1, 5):
         raise ValueError(f"Invalid input shape: expected (1, 5), got {features.shape}")
-    prediction = model.predict(features)
+    prediction = get_model().predict(features, verbose=0)
     return "suspicious" if prediction[0][0] > 0.5 else "normal"
 
 
@@ -51,7 +127,7 @@ if __name__ == "__main__":
     print("Input shape:", test_features.shape)
 
     try:
-        prediction = model.predict(test_features)
+        prediction = get_model().predict(test_features)
         print("Prediction:", prediction)
     except Exception as e:
         print(f"Model prediction failed: {e}")
\ No newline at end of file
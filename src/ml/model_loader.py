@@ -1,8 +1,26 @@
 import os
-from keras.models import load_model
+import logging
 from typing import Any
 
+logger = logging.getLogger(__name__)
+
 MODEL_PATH = os.path.expanduser("~/.vi/models/dummy_model.keras")
+WEIGHTS_PATH = os.path.expanduser("~/.vi/models/dummy_model.npz")
 
 def load_dummy_model() -> Any:
-    return load_model(MODEL_PATH)
\ No newline at end of file
+    # Imported here so TensorFlow is only loaded when the Keras backend is used
+    from keras.models import load_model
+    return load_model(MODEL_PATH)
+
+def load_numpy_model(path: str = WEIGHTS_PATH) -> Any:
+    from .numpy_model import NumpyModel
+    return NumpyModel.load(path)
+
+def load_model_backend(backend: str, weights_path: str = WEIGHTS_PATH) -> Any:
+    """Loads the model for the configured backend, falling back to Keras."""
+    if backend == 'numpy':
+        try:
+            return load_numpy_model(weights_path)
+        except Exception as e:
+            logger.warning(f"[ML] NumPy backend unavailable ({e}); falling back to Keras")
+    return load_dummy_model()
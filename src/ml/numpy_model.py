@@ -0,0 +1,37 @@
+import numpy as np
+
+# Activations supported by the exported Dense layers
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0.0),
+    'sigmoid': lambda x: 1.0 / (1.0 + np.exp(-x)),
+    'tanh': np.tanh,
+}
+
+
+class NumpyModel:
+    """
+    Forward pass of a stack of Dense layers exported by ml.export_weights.
+    Mirrors the subset of the Keras Model API used by ml.inference.
+    """
+
+    def __init__(self, layers):
+        # layers: list of (kernel, bias, activation) tuples in forward order
+        self.layers = layers
+
+    @classmethod
+    def load(cls, path) -> "NumpyModel":
+        with np.load(path, allow_pickle=False) as data:
+            activations = [str(a) for a in data['activations']]
+            layers = []
+            for i, activation in enumerate(activations):
+                if activation not in ACTIVATIONS:
+                    raise ValueError(f"Unsupported activation '{activation}' in layer {i} of {path}")
+                layers.append((data[f'kernel_{i}'], data[f'bias_{i}'], activation))
+        return cls(layers)
+
+    def predict(self, features, verbose=None) -> np.ndarray:
+        x = np.asarray(features, dtype=np.float32)
+        for kernel, bias, activation in self.layers:
+            x = ACTIVATIONS[activation](x @ kernel + bias)
+        return x
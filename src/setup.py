@@ -6,4 +6,5 @@ setup(
     name="vi",
     version="0.1",
     packages=find_packages(include=['vi', 'vi.*', 'models', 'models.*']),
+    entry_points={'console_scripts': ['vi=vi.cli:main']},
 )
\ No newline at end of file
@@ -0,0 +1,6 @@
+# Allows `python -m vi <command>`; see vi/cli.py
+import sys
+
+from vi.cli import main
+
+sys.exit(main())
@@ -3,71 +3,307 @@ Handles initialization of alert database,
 recording of alerts, and notification dispatch.
 """
 
-import sqlite3
+import atexit
+import queue
+import shlex
 import subprocess
+import threading
+import time
 import logging
 from pathlib import Path
 from datetime import datetime
+from typing import Callable, Optional
 from vi.config import config
+from vi.db import transaction
+from vi.metrics import registry
+
+logger = logging.getLogger(__name__)
 
 # Path to the SQLite database for alerts
 DB_PATH = Path.home() / '.vi' / 'logs' / 'alerts.sqlite'
 
 def init_alerts_db():
     """Ensure the alerts table exists."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''
-      CREATE TABLE IF NOT EXISTS alerts (
-        timestamp TEXT,
-        type TEXT,
-        process_name TEXT,
-        pid INTEGER,
-        remote_ip TEXT,
-        remote_port INTEGER,
-        severity TEXT
-      )
-    ''')
-    conn.commit()
-    conn.close()
+    with transaction(DB_PATH) as conn:
+        conn.execute('''
+          CREATE TABLE IF NOT EXISTS alerts (
+            timestamp TEXT,
+            type TEXT,
+            process_name TEXT,
+            pid INTEGER,
+            remote_ip TEXT,
+            remote_port INTEGER,
+            severity TEXT,
+            suppressed INTEGER DEFAULT 0,
+            last_seen TEXT
+          )
+        ''')
+        # Tables created before suppression lack the aggregation columns
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(alerts)')}
+        if 'suppressed' not in columns:
+            conn.execute('ALTER TABLE alerts ADD COLUMN suppressed INTEGER DEFAULT 0')
+        if 'last_seen' not in columns:
+            conn.execute('ALTER TABLE alerts ADD COLUMN last_seen TEXT')
+        # Time ranges, and lookups by IP, process and process + port in time order
+        conn.execute('CREATE INDEX IF NOT EXISTS alerts_ts ON alerts (timestamp)')
+        conn.execute('CREATE INDEX IF NOT EXISTS alerts_ip ON alerts (remote_ip, timestamp)')
+        conn.execute('CREATE INDEX IF NOT EXISTS alerts_proc ON alerts (process_name, timestamp)')
+        conn.execute('CREATE INDEX IF NOT EXISTS alerts_proc_port ON alerts (process_name, remote_port, timestamp)')
 
 def record_alert(conn_obj, anomaly_type, severity='medium'):
     """Persist one alert to SQLite."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''
-      INSERT INTO alerts (
-        timestamp, type, process_name, pid,
-        remote_ip, remote_port, severity
-      ) VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (
-      datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-      anomaly_type,
-      conn_obj.process_name,
-      conn_obj.pid,
-      conn_obj.remote_ip,
-      conn_obj.remote_port,
-      severity
-    ))
-    conn.commit()
-    conn.close()
-
-def send_notification(title: str, message: str, severity: str = 'medium'):
-    # Respect notification settings from config
-    # Debug: log notification invocation
-    logging.info(f"send_notification called with severity={severity}, config={config.notifications!r}")
+    with transaction(DB_PATH) as conn:
+        conn.execute('''
+          INSERT INTO alerts (
+            timestamp, type, process_name, pid,
+            remote_ip, remote_port, severity
+          ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+          datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+          anomaly_type,
+          conn_obj.process_name,
+          conn_obj.pid,
+          conn_obj.remote_ip,
+          conn_obj.remote_port,
+          severity
+        ))
+    registry.counter('vi_alerts_total', 'Alerts recorded', type=anomaly_type, severity=severity).inc()
+
+def record_suppressed(row: tuple, rowid: Optional[int] = None) -> int:
+    """
+    Persists the aggregated row for a key's suppressed repeats: (first timestamp,
+    type, process_name, pid, remote_ip, remote_port, severity, count, last
+    timestamp). Given the rowid of the row already written for this suppression
+    window, updates its count and last timestamp instead. Returns the rowid.
+    """
+    with transaction(DB_PATH) as conn:
+        if rowid is not None:
+            updated = conn.execute(
+                'UPDATE alerts SET suppressed = ?, last_seen = ? WHERE rowid = ?', (row[7], row[8], rowid)
+            ).rowcount
+            if updated:
+                return rowid
+        return conn.execute('''
+          INSERT INTO alerts (
+            timestamp, type, process_name, pid,
+            remote_ip, remote_port, severity, suppressed, last_seen
+          ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', row).lastrowid
+
+# Notifications are handed to a dispatcher thread, which coalesces everything queued
+# within coalesce_window seconds into one notification, sends at most rate_limit
+# notifications per minute (holding later alerts for the next summary instead of
+# dropping them) and launches the notifier without waiting for it.
+SEVERITY_RANK = {'low': 0, 'medium': 1, 'high': 2}
+
+# How a batch of alerts of one type is summarised: "37 new process/port pairs from 5 processes"
+SUMMARY_LABELS = {
+    'new_process': 'new processes',
+    'new_process_port': 'new process/port pairs',
+    'malicious_ip': 'malicious IP contacts',
+    'outlier': 'statistical outliers'
+}
+
+class Notification:
+    __slots__ = ('title', 'message', 'severity', 'anomaly_type', 'process_name')
+
+    def __init__(self, title: str, message: str, severity: str, anomaly_type: Optional[str], process_name: Optional[str]):
+        self.title = title
+        self.message = message
+        self.severity = severity
+        self.anomaly_type = anomaly_type
+        self.process_name = process_name
+
+def summarize(batch: list) -> tuple[str, str, str]:
+    """Returns (title, message, severity) for a batch of notifications."""
+    # Unknown severities rank as medium, as in send_notification
+    severity = max((n.severity for n in batch), key=lambda s: SEVERITY_RANK.get(s, 1))
+    if len(batch) == 1:
+        return batch[0].title, batch[0].message, severity
+    by_type: dict[str, list] = {}
+    for n in batch:
+        by_type.setdefault(n.anomaly_type or 'other', []).append(n)
+    parts = []
+    for anomaly_type, items in sorted(by_type.items(), key=lambda item: -len(item[1])):
+        label = SUMMARY_LABELS.get(anomaly_type, 'alerts' if anomaly_type == 'other' else f'{anomaly_type} alerts')
+        processes = {n.process_name for n in items if n.process_name}
+        part = f"{len(items)} {label}"
+        if processes:
+            part += f" from {len(processes)} process{'es' if len(processes) != 1 else ''}"
+        parts.append(part)
+    return f"Vi: {len(batch)} alerts", '; '.join(parts), severity
+
+def launch_notifier(title: str, message: str, severity: str):
+    """
+    Starts the configured notifier without waiting for it. notifier_args may use
+    {title}, {message} and {severity}.
+    """
+    notif_cfg = config.notifications
+    command = shlex.split(notif_cfg['notifier']) + [
+        arg.format(title=title, message=message, severity=severity) for arg in notif_cfg['notifier_args']
+    ]
+    return subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+class NotificationDispatcher(threading.Thread):
+    def __init__(self, notify: Callable = launch_notifier, coalesce_window: float = 2.0,
+                 rate_limit: float = 6, queue_size: int = 1000):
+        super().__init__(name='vi-notifier', daemon=True)
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.notify = notify
+        self.coalesce_window = coalesce_window
+        # Token bucket: rate_limit notifications per minute, bursting to rate_limit
+        self.rate = rate_limit / 60.0
+        self.capacity = max(rate_limit, 1.0)
+        self.tokens = self.capacity
+        self._refilled = time.monotonic()
+        self._children: list = []
+        self._stopped = threading.Event()
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def submit(self, notification: Notification) -> bool:
+        try:
+            self.queue.put_nowait(notification)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            registry.counter('vi_notifications_total', 'Notifications by outcome', outcome='dropped').inc()
+            return False
+
+    def run(self):
+        held: list = []
+        while True:
+            # Wait for the first alert, or with alerts held back by the rate limit, for the next token
+            timeout = max((1 - self._refill()) / self.rate, 0.05) if held else None
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                try:
+                    self._dispatch(held, force=True)
+                except Exception:
+                    self.failed += 1
+                    logger.exception(f"[NOTIFY] Could not dispatch {len(held)} alert(s)")
+                break
+            batch = held + ([item] if item is not None else [])
+            # Gather whatever else arrives within the window
+            deadline = time.monotonic() + self.coalesce_window
+            stopping = False
+            while True:
+                try:
+                    item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                held = self._dispatch(batch, force=stopping)
+            except Exception:
+                # One bad batch must not stop every later notification
+                held = []
+                self.failed += 1
+                logger.exception(f"[NOTIFY] Could not dispatch {len(batch)} alert(s)")
+            self._reap()
+            if stopping:
+                break
+
+    def _refill(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+        return self.tokens
+
+    def _dispatch(self, batch: list, force: bool = False) -> list:
+        # Returns the batch if the rate limit holds it back for the next summary;
+        # force (on shutdown) sends it regardless
+        if not batch:
+            return []
+        if self._refill() < 1 and not force:
+            return batch
+        self.tokens -= 1
+        title, message, severity = summarize(batch)
+        try:
+            child = self.notify(title, message, severity)
+            if child is not None:
+                self._children.append(child)
+            self.sent += 1
+            self.coalesced += len(batch) - 1
+            registry.counter('vi_notifications_total', 'Notifications by outcome', outcome='sent').inc()
+            registry.counter('vi_notifications_total', 'Notifications by outcome', outcome='coalesced').inc(len(batch) - 1)
+            logger.debug(f"[NOTIFY] Sent notification for {len(batch)} alert(s)")
+        except Exception as e:
+            self.failed += 1
+            registry.counter('vi_notifications_total', 'Notifications by outcome', outcome='failed').inc()
+            logger.error(f"[NOTIFY] Notifier failed for {len(batch)} alert(s): {e}")
+        return []
+
+    def _reap(self):
+        # Collect exited notifier processes so they do not linger as zombies
+        self._children = [child for child in self._children if child.poll() is None]
+
+    def stop(self, timeout: Optional[float] = None):
+        """Sends what is queued or held back as a final summary and stops the thread."""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self.queue.put(_STOP)
+        self.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            'queue_depth': self.queue.qsize(),
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'running_notifiers': len(self._children)
+        }
+
+_STOP = object()
+_dispatcher: Optional[NotificationDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+def start_dispatcher(notify: Callable = launch_notifier) -> NotificationDispatcher:
+    """Starts the process-wide dispatcher (configured under [notifications]) if not running."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            notif_cfg = config.notifications
+            _dispatcher = NotificationDispatcher(
+                notify=notify,
+                coalesce_window=notif_cfg['coalesce_window'],
+                rate_limit=notif_cfg['rate_limit'],
+                queue_size=notif_cfg['queue_size']
+            )
+            _dispatcher.start()
+            atexit.register(stop_dispatcher)
+        return _dispatcher
+
+def stop_dispatcher():
+    global _dispatcher
+    if _dispatcher is not None:
+        _dispatcher.stop(timeout=5)
+        _dispatcher = None
+
+def dispatcher_stats() -> dict:
+    return _dispatcher.stats() if _dispatcher is not None else {}
+
+def send_notification(title: str, message: str, severity: str = 'medium',
+                      anomaly_type: Optional[str] = None, process_name: Optional[str] = None) -> bool:
+    """
+    Queues a desktop notification if enabled and severity is at least
+    min_severity. Returns immediately; the dispatcher coalesces and sends it.
+    """
     notif_cfg = config.notifications
     if not notif_cfg['enable_desktop']:
-        logging.info("Notification skipped: desktop notifications disabled in config")
-        return
-    if severity != notif_cfg['min_severity']:
-        logging.info(f"Notification skipped: severity '{severity}' does not match min_severity '{notif_cfg['min_severity']}'")
-        return
-    notifier = notif_cfg['notifier']
-    logging.info(f"Dispatching notification via '{notifier}'")
-    # Fire a macOS banner notification via terminal-notifier
-    subprocess.run([
-        notifier,
-        '-title', title,
-        '-message', message
-    ])
\ No newline at end of file
+        return False
+    if SEVERITY_RANK.get(severity, 1) < SEVERITY_RANK[notif_cfg['min_severity']]:
+        logger.debug(f"[NOTIFY] Skipped {severity} alert below min_severity {notif_cfg['min_severity']}")
+        registry.counter('vi_notifications_total', 'Notifications by outcome', outcome='filtered').inc()
+        return False
+    return start_dispatcher().submit(Notification(title, message, severity, anomaly_type, process_name))
@@ -6,14 +6,19 @@ from vi.config import config
 import json
 import logging
 from pathlib import Path
-from datetime import datetime
+from typing import Optional
 
-# Define anomaly threshold from settings
-ANOMALY_STDDEV_THRESHOLD = config.anomaly['stddev_threshold']
+import numpy as np
+
+from vi.ipstore import KnownIPStore, get_known_ip_store
+from vi.linkage import LinkageIndex, get_linkage_index
+from vi.logs import preview
+from vi.stats import BaselineAccumulator, feature_matrix, get_baseline_accumulator
+
+logger = logging.getLogger(__name__)
 
 # Path to baseline data
 BASELINE_FILE = Path.home() / ".vi" / "config" / "baseline.json"
-LINKAGE_FILE = Path.home() / ".vi" / "config" / "linkage.json"
 BASELINE_FILE.parent.mkdir(parents=True, exist_ok=True)
 
 # Reads baseline.json and/or returns list of known IPs
@@ -24,78 +29,96 @@ def load_baseline():
                 return json.load(f)
         return {"known_ips": []}
     except Exception as e:
-        logging.warning(f"[WARN] Failed to  load baseline: {e}")
+        logger.warning(f"[WARN] Failed to  load baseline: {e}")
     return {"known_ips": []}
 
-# Reads linkage.json, deserializes its keys into (PID, IP, TS) tuples w/ timestamps 
-def load_linkage():
-    try:
-        if LINKAGE_FILE.exists():
-            with open(LINKAGE_FILE, "r") as f:
-                data = json.load(f)
-                return {
-                    # Keys are formatted as "pid:ip:ts", split on last two colons to get tuple
-                    tuple(key.rsplit(":", 2)): value
-                    for key, value in data.items()
-                }
-    except Exception as e:
-        logging.warning(f"[WARN] Failed to load linkage: {e}")
-    return {}
+# Returns the shared known-IP store, importing baseline.json on first use
+def load_known_ips() -> KnownIPStore:
+    return get_known_ip_store(BASELINE_FILE)
+
+# Returns the shared in-memory index of (PID, IP, day) links
+def load_linkage() -> LinkageIndex:
+    return get_linkage_index()
 
 # Writes baseline dict back into baseline.json
 def save_baseline(data):
     with open(BASELINE_FILE, "w") as f:
         json.dump(data, f, indent=4)
 
-# Serializes (PID, IP) w/ timestamps into linkage.json
-def save_linkage(data):
-    with open(LINKAGE_FILE, "w") as f:
-        serializable_data = {
-            f"{pid}:{ip}:{ts}": timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp
-            for (pid, ip, ts), timestamp in data.items()
-        }
-        json.dump(serializable_data, f, indent=4)
+# Exports the known-IP store to baseline.json (or another path) for inspection or transfer
+def export_baseline(path: Path = BASELINE_FILE):
+    load_known_ips().export_json(path)
+
+# Appends newly seen IPs to the known-IP log
+def save_known_ips(store: KnownIPStore):
+    try:
+        store.flush()
+    except Exception as e:
+        logger.warning(f"[WARN] Failed to save known IPs: {e}")
 
-# Logs outbound IPs & alerts for new ones
+# Persists links added since the last save to the linkage journal
+def save_linkage(data: LinkageIndex):
+    try:
+        data.flush()
+    except Exception as e:
+        logger.warning(f"[WARN] Failed to save linkage: {e}")
+
+# Scores a snapshot against the persisted baseline statistics in one vectorized pass.
+# Each connection's anomaly_score is its largest |z| over the features that have at
+# least anomaly.min_samples samples and a stddev of at least anomaly.stddev_threshold.
+# Returns a boolean mask of connections scoring at or above anomaly.zscore_threshold.
+def score_connections(connections, accumulator: Optional[BaselineAccumulator] = None) -> np.ndarray:
+    n = len(connections)
+    if n == 0 or not config.anomaly['enabled']:
+        for conn in connections:
+            conn.anomaly_score = 0.0
+        return np.zeros(n, dtype=bool)
+
+    accumulator = accumulator or get_baseline_accumulator()
+    matrix = feature_matrix(connections)
+    if accumulator.per_process:
+        names, inverse = np.unique([c.process_name for c in connections], return_inverse=True)
+        counts, means, stddevs = (a[inverse] for a in accumulator.arrays(list(names)))
+    else:
+        counts, means, stddevs = accumulator.arrays()
+
+    usable = (counts >= config.anomaly['min_samples']) & (stddevs >= config.anomaly['stddev_threshold'])
+    z = np.abs(matrix - means) / np.where(usable, stddevs, 1.0)
+    scores = np.round(np.where(usable, z, 0.0).max(axis=1), 4)
+
+    for conn, score in zip(connections, scores.tolist()):
+        conn.anomaly_score = score
+    return scores >= config.anomaly['zscore_threshold']
+
+# Logs outbound IPs & alerts for new ones; returns connections flagged as outliers
 def update_baseline(connections):
     from vi.connections import tracker
 
-    baseline = load_baseline()
-    known_ips = set(baseline.get("known_ips", []))
-    new_ips = set()
-
+    known_ips = load_known_ips()
     known_links = load_linkage()
 
-    logging.info(f"[DEBUG] Total connections received: {len(connections)}")
+    logger.debug(f"[DEBUG] Total connections received: {len(connections)}")
 
-    for conn in connections:
-        ip = getattr(conn, "remote_ip", None)
-        if ip:
-            logging.info(f"[DEBUG] Outbound connection to: {ip}")
-            if ip not in known_ips:
-                new_ips.add(ip)
-                logging.info(f"[!] New outbound IP detected: {ip} at {datetime.now()}")
+    remote_ips = {ip for ip in (getattr(conn, "remote_ip", None) for conn in connections) if ip}
+    candidates = sorted(remote_ips)
+    new_ips = [ip for ip, known in zip(candidates, known_ips.contains_many(candidates).tolist())
+               if not known and known_ips.add(ip)]
+    if new_ips:
+        logger.info(f"[BASELINE] {len(new_ips)} new outbound IP(s) detected: {preview(new_ips)}",
+                    extra={'new_ips': len(new_ips)})
 
     tracker.track_connections(connections, known_links)
 
-    # Compute anomaly_score for each connection based on duration
-    for conn in connections:
-        try:
-            if conn.duration_seconds is not None and conn.connection_count is not None:
-                mean_duration = sum(c.duration_seconds for c in connections if c.duration_seconds is not None) / len(connections)
-                stddev_duration = (sum((c.duration_seconds - mean_duration) ** 2 for c in connections if c.duration_seconds is not None) / len(connections)) ** 0.5
-                if stddev_duration > 0:
-                    z_score = (conn.duration_seconds - mean_duration) / stddev_duration
-                    conn.anomaly_score = round(abs(z_score), 4)
-                else:
-                    conn.anomaly_score = 0.0
-            else:
-                conn.anomaly_score = 0.0
-        except Exception as e:
-            logging.warning(f"[WARN] Failed to compute anomaly score for PID {getattr(conn, 'pid', 'unknown')}: {e}")
+    # Compute anomaly_score for each connection against the historical baseline
+    outliers = []
+    try:
+        flagged = score_connections(connections)
+        outliers = [conn for conn, is_outlier in zip(connections, flagged.tolist()) if is_outlier]
+        if outliers:
+            logger.info(f"[BASELINE] {len(outliers)} of {len(connections)} connection(s) exceed the z-score threshold")
+    except Exception as e:
+        logger.warning(f"[WARN] Failed to compute anomaly scores: {e}")
 
     save_linkage(known_links)
-
-    if new_ips:
-        updated_ips = sorted(known_ips.union(new_ips))
-        save_baseline({"known_ips": updated_ips})
\ No newline at end of file
+    save_known_ips(known_ips)
+    return outliers
\ No newline at end of file
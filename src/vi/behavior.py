@@ -1,29 +1,44 @@
-import sqlite3
 from pathlib import Path
 
+from vi.db import get_connection, transaction
+
 # Path to the SQLite database for behavioral baseline
 DB_PATH = Path.home() / '.vi' / 'logs' / 'behavior.sqlite'
 
+# In-memory copies of the seen tables, loaded once at startup
+_seen_names: set[str] = set()
+_seen_ports: set[tuple[str, int]] = set()
+_loaded = False
+
 def init_behavior_db():
     """Ensure the baseline tables exist."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    # Record seen process names
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS seen_process_names (
-            process_name TEXT PRIMARY KEY
-        )
-    ''')
-    # Record seen process_name + remote_port pairs
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS seen_process_ports (
-            process_name TEXT,
-            remote_port INTEGER,
-            PRIMARY KEY (process_name, remote_port)
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    with transaction(DB_PATH) as conn:
+        c = conn.cursor()
+        # Record seen process names
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS seen_process_names (
+                process_name TEXT PRIMARY KEY
+            )
+        ''')
+        # Record seen process_name + remote_port pairs
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS seen_process_ports (
+                process_name TEXT,
+                remote_port INTEGER,
+                PRIMARY KEY (process_name, remote_port)
+            )
+        ''')
+    load_seen()
+
+# Loads both seen tables into memory with one query each
+def load_seen():
+    global _loaded
+    conn = get_connection(DB_PATH)
+    _seen_names.clear()
+    _seen_names.update(name for (name,) in conn.execute('SELECT process_name FROM seen_process_names'))
+    _seen_ports.clear()
+    _seen_ports.update(conn.execute('SELECT process_name, remote_port FROM seen_process_ports'))
+    _loaded = True
 
 def check_behavior(connections):
     """
@@ -31,27 +46,31 @@ def check_behavior(connections):
       - A process name never seen before.
       - A process contacting a port it hasn't used before.
     Returns a list of (conn_obj, anomaly_type) tuples.
+    Membership is checked against in-memory sets; only novel entries are written.
     """
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    if not _loaded:
+        load_seen()
     anomalies = []
+    new_names = []
+    new_ports = []
     for co in connections:
         # New process name?
-        c.execute('SELECT 1 FROM seen_process_names WHERE process_name = ?', (co.process_name,))
-        if c.fetchone() is None:
+        if co.process_name not in _seen_names:
+            _seen_names.add(co.process_name)
+            new_names.append((co.process_name,))
             anomalies.append((co, 'new_process'))
-            c.execute('INSERT INTO seen_process_names (process_name) VALUES (?)', (co.process_name,))
         # New port for this process?
-        c.execute(
-            'SELECT 1 FROM seen_process_ports WHERE process_name = ? AND remote_port = ?',
-            (co.process_name, co.remote_port)
-        )
-        if c.fetchone() is None:
+        pair = (co.process_name, co.remote_port)
+        if pair not in _seen_ports:
+            _seen_ports.add(pair)
+            new_ports.append(pair)
             anomalies.append((co, 'new_process_port'))
-            c.execute(
-                'INSERT INTO seen_process_ports (process_name, remote_port) VALUES (?, ?)',
-                (co.process_name, co.remote_port)
+
+    if new_names or new_ports:
+        with transaction(DB_PATH) as conn:
+            conn.executemany('INSERT OR IGNORE INTO seen_process_names (process_name) VALUES (?)', new_names)
+            conn.executemany(
+                'INSERT OR IGNORE INTO seen_process_ports (process_name, remote_port) VALUES (?, ?)',
+                new_ports
             )
-    conn.commit()
-    conn.close()
-    return anomalies
\ No newline at end of file
+    return anomalies
@@ -0,0 +1,113 @@
+# Command line entry point: `python -m vi <command>` (or scripts/vi).
+#
+#   vi query connections --ip 93.184.216.34 --since 7d
+#   vi query alerts --process curl --since 2024-05-01 --until 2024-05-08 --format json
+#   vi query rollups --process Slack --port 443 --since 30d --limit 100
+#   vi query connections --since 1d --limit 100 --after '<cursor printed by the previous page>'
+#   vi query talkers --ip 93.184.216.34 --since 1w
+#   vi export --format npz
+
+import argparse
+import csv
+import json
+import sys
+from typing import Optional
+
+from vi import export, query
+
+# Columns printed per source in tsv/csv output; json prints every column
+DEFAULT_COLUMNS = {
+    'connections': ('timestamp', 'process_name', 'pid', 'user', 'remote_ip', 'remote_port', 'status', 'tag',
+                    'anomaly_score'),
+    'rollups': ('minute', 'process_name', 'remote_ip', 'remote_port', 'samples', 'mean_cpu_percent',
+                'mean_memory_rss', 'max_duration_seconds'),
+    'alerts': ('timestamp', 'type', 'severity', 'process_name', 'pid', 'remote_ip', 'remote_port', 'suppressed',
+               'last_seen'),
+    'talkers': ('process_name', 'pid', 'samples', 'first_seen', 'last_seen')
+}
+
+def _add_query_parser(subparsers):
+    parser = subparsers.add_parser('query', help='search connection, rollup and alert history')
+    parser.add_argument('source', choices=query.SOURCES + ('talkers',),
+                        help="what to search; 'talkers' lists the processes that contacted --ip")
+    parser.add_argument('--since', help='start of the time range: 7d, 12h, 30m, 2w or an ISO date/datetime')
+    parser.add_argument('--until', help='end of the time range (exclusive), same formats as --since')
+    parser.add_argument('--ip', dest='remote_ip', help='remote IP address')
+    parser.add_argument('--process', dest='process_name', help='exact process name')
+    parser.add_argument('--port', dest='remote_port', type=int, help='remote port')
+    parser.add_argument('--pid', type=int, help='process id (connections, alerts)')
+    parser.add_argument('--status', help='connection status, e.g. CLOSED (connections)')
+    parser.add_argument('--type', help='alert type, e.g. malicious_ip (alerts)')
+    parser.add_argument('--severity', choices=('low', 'medium', 'high'), help='alert severity (alerts)')
+    parser.add_argument('--limit', type=int, help='rows per page; prints a cursor for the next page to stderr')
+    parser.add_argument('--after', help='cursor from a previous page')
+    parser.add_argument('--format', choices=('tsv', 'csv', 'json'), default='tsv')
+    parser.add_argument('--columns', help='comma-separated columns to print (tsv/csv)')
+    parser.set_defaults(func=run_query)
+
+def _writer(fmt: str, columns: tuple):
+    if fmt == 'json':
+        return lambda row: print(json.dumps(row, default=str))
+    if fmt == 'csv':
+        out = csv.writer(sys.stdout)
+        out.writerow(columns)
+        return lambda row: out.writerow([row.get(c) for c in columns])
+    print('\t'.join(columns))
+    return lambda row: print('\t'.join('' if row.get(c) is None else str(row.get(c)) for c in columns))
+
+def run_query(args) -> int:
+    columns = tuple(args.columns.split(',')) if args.columns else DEFAULT_COLUMNS[args.source]
+    write = _writer(args.format, columns)
+
+    if args.source == 'talkers':
+        if not args.remote_ip:
+            print('talkers needs --ip', file=sys.stderr)
+            return 2
+        for row in query.talkers(args.remote_ip, since=args.since, until=args.until):
+            write(row)
+        return 0
+
+    # Only pass the filters given on the command line, so a source rejects ones it lacks
+    filters = {name: getattr(args, name)
+               for name in ('remote_ip', 'process_name', 'remote_port', 'pid', 'status', 'type', 'severity')
+               if getattr(args, name) is not None}
+    if args.limit is None:
+        for row in query.query(args.source, since=args.since, until=args.until, after=args.after, **filters):
+            write(row)
+        return 0
+    rows, cursor = query.page(args.source, limit=args.limit, after=args.after, since=args.since,
+                              until=args.until, **filters)
+    for row in rows:
+        write(row)
+    if cursor:
+        print(f"next page: --after '{cursor}'", file=sys.stderr)
+    return 0
+
+def _add_export_parser(subparsers):
+    parser = subparsers.add_parser('export', help='export new connection rows as training data')
+    parser.add_argument('--format', choices=export.FORMATS,
+                        help='csv, npz shards or parquet (default: parquet if pyarrow is installed, else npz)')
+    parser.add_argument('--output', help='output file (csv) or shard prefix (npz, parquet)')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='rows read and written at a time')
+    parser.add_argument('--full', action='store_true', help='ignore the high-water mark and export everything')
+    parser.set_defaults(func=run_export)
+
+def run_export(args) -> int:
+    result = export.export(args.format, args.output, chunk_size=args.chunk_size, full=args.full)
+    print(f"Exported {result['rows']} row(s) in {result['chunks']} chunk(s) to {result['output']}"
+          f" (up to {result['timestamp']})", file=sys.stderr)
+    return 0
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(prog='vi', description='Vi network monitor tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    _add_query_parser(subparsers)
+    _add_export_parser(subparsers)
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    except ValueError as e:
+        parser.error(str(e))
+    except BrokenPipeError:
+        # Output piped into head and the like
+        return 0
@@ -0,0 +1,269 @@
+# Socket enumeration backends for net_monitor. Each backend lists the connected
+# sockets of the host as Socket tuples, and net_monitor turns them into Connection
+# objects the same way whichever backend was used:
+#
+#   lsof    forks `lsof -i -n -P` and parses its output (macOS and Linux)
+#   psutil  psutil.net_connections(), or per-process connections where the
+#           system-wide call needs root (macOS)
+#   proc    reads /proc/net/tcp, tcp6 (and udp, udp6) directly and maps socket
+#           inodes to PIDs through /proc/<pid>/fd (Linux only)
+#
+# Addresses are normalised (no IPv6 brackets or zone ids, compressed form), so all
+# backends report the same sockets in the same form. Sockets whose owning process
+# cannot be seen (e.g. other users' processes without root) are skipped by all.
+
+import ipaddress
+import logging
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('auto', 'lsof', 'psutil', 'proc')
+
+class Socket(NamedTuple):
+    pid: int
+    # What the backend itself knows of the owner, used if the process table has gone
+    process_name: Optional[str]
+    user: Optional[str]
+    protocol: str  # 'tcp' or 'udp'
+    local_ip: str
+    local_port: int
+    remote_ip: str
+    remote_port: int
+
+@lru_cache(maxsize=65536)
+def normalize_ip(text: str) -> str:
+    """'[2001:DB8::0:1%en0]' -> '2001:db8::1'; IPv4 is returned as is."""
+    text = text.strip('[]').split('%', 1)[0]
+    try:
+        return ipaddress.ip_address(text).compressed
+    except ValueError:
+        return text
+
+def default_backend() -> str:
+    """proc where /proc/net is readable (Linux), otherwise lsof."""
+    return 'proc' if os.path.exists('/proc/net/tcp') else 'lsof'
+
+# --- lsof ---------------------------------------------------------------------
+
+def lsof_sockets(include_udp: bool = False) -> list[Socket]:
+    result = subprocess.run(
+        ['lsof', '-i', '-n', '-P'],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True
+    )
+    return parse_lsof(result.stdout, include_udp)
+
+def parse_lsof(output: str, include_udp: bool = False) -> list[Socket]:
+    sockets = []
+    for line in output.strip().split('\n'):
+        if 'ESTABLISHED' in line:
+            protocol = 'tcp'
+        elif include_udp and ' UDP ' in line:
+            protocol = 'udp'
+        else:
+            continue
+
+        parts = re.split(r'\s+', line)
+        if len(parts) < 9:
+            continue
+
+        name, pid, user, fd, type_, device, size_off, node, name_field = parts[:9]
+        if '->' not in name_field:
+            continue
+        try:
+            name = bytes(name, "utf-8").decode("unicode_escape")
+        except Exception:
+            name = name.encode('utf-8', errors='ignore').decode('utf-8', errors='ignore')
+
+        local, remote = name_field.split('->')
+        l_ip, l_port = local.rsplit(':', 1)
+        r_ip, r_port = remote.rsplit(':', 1)
+        sockets.append(Socket(int(pid), name, user, protocol, normalize_ip(l_ip), int(l_port),
+                              normalize_ip(r_ip), int(r_port)))
+    return sockets
+
+# --- psutil -------------------------------------------------------------------
+
+def _from_psutil(conn, pid: int, include_udp: bool) -> Optional[Socket]:
+    if not conn.raddr or pid is None:
+        return None
+    if conn.type == socket.SOCK_STREAM:
+        if conn.status != psutil.CONN_ESTABLISHED:
+            return None
+        protocol = 'tcp'
+    elif include_udp and conn.type == socket.SOCK_DGRAM:
+        protocol = 'udp'
+    else:
+        return None
+    return Socket(pid, None, None, protocol, normalize_ip(conn.laddr.ip), conn.laddr.port,
+                  normalize_ip(conn.raddr.ip), conn.raddr.port)
+
+def psutil_sockets(include_udp: bool = False) -> list[Socket]:
+    kind = 'inet' if include_udp else 'tcp'
+    try:
+        found = [_from_psutil(c, c.pid, include_udp) for c in psutil.net_connections(kind=kind)]
+    except psutil.AccessDenied:
+        # macOS only lists every process's sockets to root; fall back to the processes we may inspect
+        found = []
+        for proc in psutil.process_iter():
+            try:
+                connections = getattr(proc, 'net_connections', None) or proc.connections
+                found.extend(_from_psutil(c, proc.pid, include_udp) for c in connections(kind=kind))
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+    return [s for s in found if s is not None]
+
+# --- /proc/net ----------------------------------------------------------------
+
+TCP_ESTABLISHED = '01'
+
+@lru_cache(maxsize=65536)
+def _proc_ip(address: str, family: int) -> str:
+    # The address is hex, as native-endian 32-bit words (little-endian on x86 and ARM)
+    raw = bytes.fromhex(address)
+    if sys.byteorder == 'little':
+        raw = b''.join(raw[i:i + 4][::-1] for i in range(0, len(raw), 4))
+    return normalize_ip(socket.inet_ntop(family, raw))
+
+def parse_proc_net(text: str, protocol: str, family: int) -> list[tuple]:
+    """
+    Connected sockets of one /proc/net table as (inode, uid, local_ip, local_port,
+    remote_ip, remote_port): ESTABLISHED for TCP, any with a remote port for UDP.
+    """
+    rows = []
+    for line in text.splitlines()[1:]:
+        fields = line.split(None, 10)
+        if len(fields) < 10:
+            continue
+        local, remote, state = fields[1], fields[2], fields[3]
+        if protocol == 'tcp' and state != TCP_ESTABLISHED:
+            continue
+        l_addr, l_port = local.split(':')
+        r_addr, r_port = remote.split(':')
+        if r_port == '0000':
+            continue
+        rows.append((int(fields[9]), int(fields[7]), _proc_ip(l_addr, family), int(l_port, 16),
+                     _proc_ip(r_addr, family), int(r_port, 16)))
+    return rows
+
+class InodeMap:
+    """
+    Maps socket inodes to the PIDs holding them, from the /proc/<pid>/fd links.
+    Each refresh lists every process's fd directory but only reads the links of
+    fds it has not seen; an inode it cannot place triggers one full re-read, and
+    everything is re-read every full_rescan seconds to catch reused fd numbers.
+    """
+
+    def __init__(self, proc: str = '/proc', full_rescan: float = 60.0):
+        self.proc = proc
+        self.full_rescan = full_rescan
+        self._fds: dict[int, dict[str, Optional[int]]] = {}  # pid -> {fd: socket inode or None}
+        self._inodes: dict[int, list[int]] = {}  # inode -> pids, one entry per fd
+        self._unresolved: set[int] = set()  # Inodes still unplaced after the last full read
+        self._last_full = 0.0
+        self.full_reads = 0
+
+    def lookup(self, inodes) -> dict[int, list[int]]:
+        """Returns {inode: [pid, ...]} for the given socket inodes that a visible process holds."""
+        inodes = set(inodes)
+        full = time.monotonic() - self._last_full >= self.full_rescan
+        self.refresh(full)
+        if not full and inodes - self._inodes.keys() - self._unresolved:
+            full = True
+            self.refresh(full=True)
+        if full:
+            # Other users' processes stay unplaced without root; don't re-read for them every scan
+            self._unresolved = inodes - self._inodes.keys()
+        return {inode: self._inodes[inode] for inode in inodes if inode in self._inodes}
+
+    def refresh(self, full: bool = False):
+        if full:
+            self._fds.clear()
+            self._last_full = time.monotonic()
+            self.full_reads += 1
+        pids = {int(name) for name in os.listdir(self.proc) if name.isdigit()}
+        for pid in self._fds.keys() - pids:
+            del self._fds[pid]
+        for pid in pids:
+            fd_dir = f'{self.proc}/{pid}/fd'
+            try:
+                names = os.listdir(fd_dir)
+            except OSError:
+                # Exited, or not ours to read
+                self._fds.pop(pid, None)
+                continue
+            known = self._fds.setdefault(pid, {})
+            for name in known.keys() - set(names):
+                del known[name]
+            for name in names:
+                if name in known:
+                    continue
+                try:
+                    target = os.readlink(f'{fd_dir}/{name}')
+                except OSError:
+                    continue
+                known[name] = int(target[8:-1]) if target.startswith('socket:[') else None
+        self._inodes = {}
+        for pid, fds in self._fds.items():
+            for inode in fds.values():
+                if inode is not None:
+                    self._inodes.setdefault(inode, []).append(pid)
+
+PROC_TABLES = (('tcp', socket.AF_INET, 'tcp'), ('tcp6', socket.AF_INET6, 'tcp'),
+               ('udp', socket.AF_INET, 'udp'), ('udp6', socket.AF_INET6, 'udp'))
+
+_inode_map: Optional[InodeMap] = None
+
+def proc_sockets(include_udp: bool = False, proc: str = '/proc') -> list[Socket]:
+    global _inode_map
+    if _inode_map is None or _inode_map.proc != proc:
+        _inode_map = InodeMap(proc)
+    rows = []
+    for table, family, protocol in PROC_TABLES:
+        if protocol == 'udp' and not include_udp:
+            continue
+        try:
+            with open(f'{proc}/net/{table}') as f:
+                text = f.read()
+        except FileNotFoundError:
+            # No IPv6 on this host
+            continue
+        rows.extend((protocol,) + row for row in parse_proc_net(text, protocol, family))
+
+    owners = _inode_map.lookup(row[1] for row in rows)
+    sockets = []
+    for protocol, inode, uid, l_ip, l_port, r_ip, r_port in rows:
+        for pid in owners.get(inode, ()):
+            sockets.append(Socket(pid, None, _user_name(uid), protocol, l_ip, l_port, r_ip, r_port))
+    return sockets
+
+@lru_cache(maxsize=1024)
+def _user_name(uid: int) -> str:
+    import pwd
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return str(uid)
+
+_BACKENDS = {'lsof': lsof_sockets, 'psutil': psutil_sockets, 'proc': proc_sockets}
+
+def list_sockets(backend: str = 'auto', include_udp: bool = False) -> list[Socket]:
+    """Connected sockets from the chosen backend ('auto' picks default_backend())."""
+    if backend == 'auto':
+        backend = default_backend()
+    try:
+        collect = _BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown collector backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    return collect(include_udp)
@@ -14,15 +14,42 @@ class Config:
         # Intel defaults
         self.intel = {
             'abuseipdb_api_key': None,
+            'api_url': 'https://api.abuseipdb.com/api/v2/check',
             'cache_ttl': 86400,
-            'threshold_score': 50
+            'negative_cache_ttl': 300,  # Seconds before a failed lookup is retried
+            'threshold_score': 50,
+            'timeout': 5.0,  # Per-request timeout in seconds
+            'max_workers': 8,  # Concurrent lookups per snapshot
+            'max_retries': 2,  # Retries for timeouts and server errors
+            'backoff_base': 0.5,  # Seconds; doubles with each retry
+            'memory_cache_size': 10000,  # IPs kept in the in-process cache
+            'write_batch_size': 50,  # Fetched verdicts buffered before writing to SQLite
+            'write_interval': 30  # Seconds before buffered verdicts are written regardless
         }
 
         # Notification defaults
         self.notifications = {
             'enable_desktop': True,
             'notifier': 'terminal-notifier',
-            'min_severity': 'medium'
+            # Arguments after the notifier command; {title}, {message} and {severity} are filled in
+            'notifier_args': ['-title', '{title}', '-message', '{message}'],
+            'min_severity': 'medium',  # Alerts below this severity are not notified
+            'coalesce_window': 2.0,  # Seconds of alerts gathered into one notification
+            'rate_limit': 6,  # Notifications per minute; later alerts wait for the next summary
+            'queue_size': 1000  # Alerts waiting for the dispatcher before new ones are dropped
+        }
+
+        # Alert suppression defaults: repeats of an alert are suppressed for ttl seconds
+        self.suppression = {
+            'ttl': {
+                'malicious_ip': 86400,
+                'new_process': 604800,
+                'new_process_port': 604800,
+                'outlier': 3600
+            },
+            'default_ttl': 3600,  # For anomaly types not listed in ttl
+            'max_entries': 10000,  # Keys held before the least recently seen are evicted
+            'flush_interval': 300  # Seconds between writes of suppressed counts and keys
         }
 
         # Behavior toggles defaults
@@ -35,7 +62,98 @@ class Config:
         self.anomaly = {
             'enabled': True,
             'deviation_threshold': 3.0,  # Stddevs from mean to trigger anomaly flag
-            'stddev_threshold': 2.0  # Minimum stddev to allow anomaly detection on feature
+            'zscore_threshold': 3.0,  # Same as deviation_threshold; the name used in settings.toml
+            'stddev_threshold': 2.0,  # Minimum stddev to allow anomaly detection on feature
+            'min_samples': 30  # Baseline samples required before a feature is used for detection
+        }
+
+        # Streaming baseline statistics defaults
+        self.baseline = {
+            'mode': 'cumulative',  # 'cumulative', 'ewma' or 'window'
+            'per_process': False,  # Also keep statistics per process_name
+            'window_snapshots': 360,  # Snapshots covered in 'window' mode
+            'ewma_alpha': 0.05,  # Weight of each snapshot in 'ewma' mode
+            'persist_interval': 300  # Seconds between writes to baseline_stats
+        }
+
+        # Scan scheduler defaults
+        self.scheduler = {
+            'adaptive': False,  # Adapt the interval to churn between min_interval and max_interval
+            'min_interval': 2.0,  # Seconds; shortest interval while flows are opening
+            'max_interval': 60.0,  # Seconds; longest interval while idle
+            'churn_threshold': 0.05,  # Fraction of active flows opened/closed that speeds scans up
+            'max_duty_cycle': 0.5  # Largest fraction of the interval a scan may take
+        }
+
+        # Pipeline defaults
+        self.pipeline = {
+            'enabled': True,  # Run enrichment, detection and persistence on their own threads
+            'queue_size': 2,  # Snapshots waiting in front of each stage
+            'enrich_workers': 2  # Snapshots enriched (ML + intel) concurrently
+        }
+
+        # Metrics defaults
+        self.metrics = {
+            'enabled': True,
+            'port': 9464,  # Prometheus endpoint on 127.0.0.1; 0 disables it
+            'socket_path': '',  # Unix socket serving the same endpoint; empty disables it
+            'dump_interval': 60  # Seconds between JSON dumps to ~/.vi/logs/metrics.json; 0 disables them
+        }
+
+        # Flow tracking defaults
+        self.flows = {
+            'drift_threshold': 0.5,  # Relative change in cpu/memory/connection count that triggers re-enrichment
+            'refresh_interval': 3600,  # Seconds after which a still-open flow is re-enriched regardless
+            'persist': 'changes'  # Store 'changes' (opened, drifted, closed flows) or 'all' flows every scan
+        }
+
+        # Connection storage defaults
+        self.storage = {
+            'queue_size': 8,  # Snapshots waiting for the background writer
+            'batch_rows': 5000,  # Rows per committed batch
+            'flush_interval': 5.0,  # Seconds before pending rows are committed regardless
+            'overflow': 'drop'  # 'drop' snapshots or 'block' the scan when the writer falls behind
+        }
+
+        # Logging defaults
+        self.logging = {
+            'level': 'INFO',
+            'levels': {},  # Per-subsystem levels keyed by logger name, e.g. {'vi.net_monitor': 'WARNING'}
+            'format': 'json',  # 'json' (one object per line) or 'text'
+            'max_bytes': 10 * 1024 * 1024,  # vi.log is rotated past this size
+            'backup_count': 5,
+            'rate_limit': 5.0,  # Lines per second per call site once the burst is spent; 0 disables limiting
+            'burst': 50,
+            'debug_sample_rate': 1.0,  # Share of DEBUG records kept
+            'queue_size': 10000  # Records waiting for the writer thread before new ones are dropped
+        }
+
+        # Retention defaults for connections.sqlite
+        self.retention = {
+            'enabled': True,
+            'raw_days': 7,  # Daily partitions of raw rows kept before being dropped
+            'rollup_days': 365,  # Per-minute rollups kept
+            'interval': 3600  # Seconds between rollup and retention passes
+        }
+
+        # Socket enumeration defaults
+        self.collector = {
+            'backend': 'auto',  # 'lsof', 'psutil', 'proc' (Linux) or 'auto' (proc where available, else lsof)
+            'include_udp': False  # Also report connected UDP sockets (status CONNECTED)
+        }
+
+        # Columnar feature store defaults (appended by the connection writer)
+        self.features = {
+            'enabled': True,
+            'path': '~/.vi/data/features',
+            'segment_rows': 1000000,  # Rows per segment before a new one starts
+            'keep_days': 365  # Segments whose newest row is older than this are deleted
+        }
+
+        # ML inference defaults
+        self.ml = {
+            'backend': 'numpy',  # 'numpy' (exported weights) or 'keras'
+            'weights_path': '~/.vi/models/dummy_model.npz'
         }
 
         # Load overrides from settings.toml
@@ -57,6 +175,19 @@ class Config:
             self.intel['abuseipdb_api_key'] = intel_cfg.get('abuseipdb_api_key', self.intel['abuseipdb_api_key'])
             self.intel['cache_ttl'] = int(intel_cfg.get('cache_ttl', self.intel['cache_ttl']))
             self.intel['threshold_score'] = int(intel_cfg.get('threshold_score', self.intel['threshold_score']))
+            self.intel['api_url'] = intel_cfg.get('api_url', self.intel['api_url'])
+            self.intel['negative_cache_ttl'] = int(
+                intel_cfg.get('negative_cache_ttl', self.intel['negative_cache_ttl'])
+            )
+            self.intel['timeout'] = float(intel_cfg.get('timeout', self.intel['timeout']))
+            self.intel['max_workers'] = int(intel_cfg.get('max_workers', self.intel['max_workers']))
+            self.intel['max_retries'] = int(intel_cfg.get('max_retries', self.intel['max_retries']))
+            self.intel['backoff_base'] = float(intel_cfg.get('backoff_base', self.intel['backoff_base']))
+            self.intel['memory_cache_size'] = int(
+                intel_cfg.get('memory_cache_size', self.intel['memory_cache_size'])
+            )
+            self.intel['write_batch_size'] = int(intel_cfg.get('write_batch_size', self.intel['write_batch_size']))
+            self.intel['write_interval'] = int(intel_cfg.get('write_interval', self.intel['write_interval']))
 
             # Notification overrides from settings.toml
             notif_cfg = data.get('notifications', {})
@@ -66,9 +197,29 @@ class Config:
             self.notifications['notifier'] = notif_cfg.get(
                 'notifier', self.notifications['notifier']
             )
+            self.notifications['notifier_args'] = list(
+                notif_cfg.get('notifier_args', self.notifications['notifier_args'])
+            )
             self.notifications['min_severity'] = notif_cfg.get(
                 'min_severity', self.notifications['min_severity']
             )
+            self.notifications['coalesce_window'] = float(
+                notif_cfg.get('coalesce_window', self.notifications['coalesce_window'])
+            )
+            self.notifications['rate_limit'] = float(notif_cfg.get('rate_limit', self.notifications['rate_limit']))
+            self.notifications['queue_size'] = int(notif_cfg.get('queue_size', self.notifications['queue_size']))
+
+            # Alert suppression overrides from settings.toml
+            suppression_cfg = data.get('suppression', {})
+            self.suppression['ttl'] = {
+                **self.suppression['ttl'],
+                **{name: int(ttl) for name, ttl in suppression_cfg.get('ttl', {}).items()}
+            }
+            self.suppression['default_ttl'] = int(suppression_cfg.get('default_ttl', self.suppression['default_ttl']))
+            self.suppression['max_entries'] = int(suppression_cfg.get('max_entries', self.suppression['max_entries']))
+            self.suppression['flush_interval'] = int(
+                suppression_cfg.get('flush_interval', self.suppression['flush_interval'])
+            )
 
             # Behavior toggles overrides from settings.toml
             beh = data.get('behavior', {})
@@ -88,6 +239,109 @@ class Config:
             self.anomaly['stddev_threshold'] = float(
                 anomaly_cfg.get('stddev_threshold', self.anomaly['stddev_threshold'])
             )
+
+            self.anomaly['zscore_threshold'] = float(
+                anomaly_cfg.get('zscore_threshold', self.anomaly['deviation_threshold'])
+            )
+            self.anomaly['min_samples'] = int(anomaly_cfg.get('min_samples', self.anomaly['min_samples']))
+
+            # Baseline overrides from settings.toml
+            baseline_cfg = data.get('baseline', {})
+            self.baseline['mode'] = baseline_cfg.get('mode', self.baseline['mode'])
+            self.baseline['per_process'] = bool(baseline_cfg.get('per_process', self.baseline['per_process']))
+            self.baseline['window_snapshots'] = int(
+                baseline_cfg.get('window_snapshots', self.baseline['window_snapshots'])
+            )
+            self.baseline['ewma_alpha'] = float(baseline_cfg.get('ewma_alpha', self.baseline['ewma_alpha']))
+            self.baseline['persist_interval'] = int(
+                baseline_cfg.get('persist_interval', self.baseline['persist_interval'])
+            )
+
+            # Scheduler overrides from settings.toml
+            sched_cfg = data.get('scheduler', {})
+            self.scheduler['adaptive'] = bool(sched_cfg.get('adaptive', self.scheduler['adaptive']))
+            self.scheduler['min_interval'] = float(sched_cfg.get('min_interval', self.scheduler['min_interval']))
+            self.scheduler['max_interval'] = float(sched_cfg.get('max_interval', self.scheduler['max_interval']))
+            self.scheduler['churn_threshold'] = float(
+                sched_cfg.get('churn_threshold', self.scheduler['churn_threshold'])
+            )
+            self.scheduler['max_duty_cycle'] = float(
+                sched_cfg.get('max_duty_cycle', self.scheduler['max_duty_cycle'])
+            )
+
+            # Pipeline overrides from settings.toml
+            pipeline_cfg = data.get('pipeline', {})
+            self.pipeline['enabled'] = bool(pipeline_cfg.get('enabled', self.pipeline['enabled']))
+            self.pipeline['queue_size'] = int(pipeline_cfg.get('queue_size', self.pipeline['queue_size']))
+            self.pipeline['enrich_workers'] = int(
+                pipeline_cfg.get('enrich_workers', self.pipeline['enrich_workers'])
+            )
+
+            # Metrics overrides from settings.toml
+            metrics_cfg = data.get('metrics', {})
+            self.metrics['enabled'] = bool(metrics_cfg.get('enabled', self.metrics['enabled']))
+            self.metrics['port'] = int(metrics_cfg.get('port', self.metrics['port']))
+            self.metrics['socket_path'] = metrics_cfg.get('socket_path', self.metrics['socket_path'])
+            self.metrics['dump_interval'] = int(metrics_cfg.get('dump_interval', self.metrics['dump_interval']))
+
+            # Flow tracking overrides from settings.toml
+            flows_cfg = data.get('flows', {})
+            self.flows['drift_threshold'] = float(
+                flows_cfg.get('drift_threshold', self.flows['drift_threshold'])
+            )
+            self.flows['refresh_interval'] = int(
+                flows_cfg.get('refresh_interval', self.flows['refresh_interval'])
+            )
+            self.flows['persist'] = flows_cfg.get('persist', self.flows['persist'])
+
+            # Storage overrides from settings.toml
+            storage_cfg = data.get('storage', {})
+            self.storage['queue_size'] = int(storage_cfg.get('queue_size', self.storage['queue_size']))
+            self.storage['batch_rows'] = int(storage_cfg.get('batch_rows', self.storage['batch_rows']))
+            self.storage['flush_interval'] = float(
+                storage_cfg.get('flush_interval', self.storage['flush_interval'])
+            )
+            self.storage['overflow'] = storage_cfg.get('overflow', self.storage['overflow'])
+
+            # Retention overrides from settings.toml
+            retention_cfg = data.get('retention', {})
+            self.retention['enabled'] = bool(retention_cfg.get('enabled', self.retention['enabled']))
+            self.retention['raw_days'] = int(retention_cfg.get('raw_days', self.retention['raw_days']))
+            self.retention['rollup_days'] = int(retention_cfg.get('rollup_days', self.retention['rollup_days']))
+            self.retention['interval'] = int(retention_cfg.get('interval', self.retention['interval']))
+
+            # Collector overrides from settings.toml
+            collector_cfg = data.get('collector', {})
+            self.collector['backend'] = collector_cfg.get('backend', self.collector['backend'])
+            self.collector['include_udp'] = bool(collector_cfg.get('include_udp', self.collector['include_udp']))
+
+            # Feature store overrides from settings.toml
+            features_cfg = data.get('features', {})
+            self.features['enabled'] = bool(features_cfg.get('enabled', self.features['enabled']))
+            self.features['path'] = features_cfg.get('path', self.features['path'])
+            self.features['segment_rows'] = int(features_cfg.get('segment_rows', self.features['segment_rows']))
+            self.features['keep_days'] = int(features_cfg.get('keep_days', self.features['keep_days']))
+
+            # Logging overrides from settings.toml
+            logging_cfg = data.get('logging', {})
+            self.logging['level'] = str(logging_cfg.get('level', self.logging['level'])).upper()
+            self.logging['levels'] = {
+                name: str(level).upper() for name, level in logging_cfg.get('levels', self.logging['levels']).items()
+            }
+            self.logging['format'] = logging_cfg.get('format', self.logging['format'])
+            self.logging['max_bytes'] = int(logging_cfg.get('max_bytes', self.logging['max_bytes']))
+            self.logging['backup_count'] = int(logging_cfg.get('backup_count', self.logging['backup_count']))
+            self.logging['rate_limit'] = float(logging_cfg.get('rate_limit', self.logging['rate_limit']))
+            self.logging['burst'] = int(logging_cfg.get('burst', self.logging['burst']))
+            self.logging['debug_sample_rate'] = float(
+                logging_cfg.get('debug_sample_rate', self.logging['debug_sample_rate'])
+            )
+            self.logging['queue_size'] = int(logging_cfg.get('queue_size', self.logging['queue_size']))
+
+            # ML overrides from settings.toml
+            ml_cfg = data.get('ml', {})
+            self.ml['backend'] = ml_cfg.get('backend', self.ml['backend'])
+            self.ml['weights_path'] = ml_cfg.get('weights_path', self.ml['weights_path'])
         
         # Validate loaded configuration
         self._validate()
@@ -106,6 +360,24 @@ class Config:
             raise ValueError(f"intel.cache_ttl must be a positive integer (got {self.intel['cache_ttl']!r})")
         if not isinstance(self.intel['threshold_score'], int) or not (0 <= self.intel['threshold_score'] <= 100):
             raise ValueError(f"intel.threshold_score must be between 0 and 100 (got {self.intel['threshold_score']!r})")
+        if not isinstance(self.intel['api_url'], str):
+            raise ValueError(f"intel.api_url must be a string (got {self.intel['api_url']!r})")
+        if self.intel['negative_cache_ttl'] <= 0:
+            raise ValueError(f"intel.negative_cache_ttl must be a positive integer (got {self.intel['negative_cache_ttl']!r})")
+        if self.intel['timeout'] <= 0:
+            raise ValueError(f"intel.timeout must be a positive number (got {self.intel['timeout']!r})")
+        if self.intel['max_workers'] <= 0:
+            raise ValueError(f"intel.max_workers must be a positive integer (got {self.intel['max_workers']!r})")
+        if self.intel['max_retries'] < 0:
+            raise ValueError(f"intel.max_retries must be a non-negative integer (got {self.intel['max_retries']!r})")
+        if self.intel['backoff_base'] < 0:
+            raise ValueError(f"intel.backoff_base must be a non-negative number (got {self.intel['backoff_base']!r})")
+        if self.intel['memory_cache_size'] <= 0:
+            raise ValueError(f"intel.memory_cache_size must be a positive integer (got {self.intel['memory_cache_size']!r})")
+        if self.intel['write_batch_size'] <= 0:
+            raise ValueError(f"intel.write_batch_size must be a positive integer (got {self.intel['write_batch_size']!r})")
+        if self.intel['write_interval'] < 0:
+            raise ValueError(f"intel.write_interval must be a non-negative integer (got {self.intel['write_interval']!r})")
         
         # Validate notifications settings
         if not isinstance(self.notifications['enable_desktop'], bool):
@@ -114,6 +386,25 @@ class Config:
             raise ValueError(f"notifications.notifier must be a string (got {self.notifications['notifier']!r})")
         if self.notifications['min_severity'] not in {'low', 'medium', 'high'}:
             raise ValueError(f"notifications.min_severity must be 'low', 'medium', or 'high' (got {self.notifications['min_severity']!r})")
+        if not all(isinstance(arg, str) for arg in self.notifications['notifier_args']):
+            raise ValueError(f"notifications.notifier_args must be a list of strings (got {self.notifications['notifier_args']!r})")
+        if self.notifications['coalesce_window'] < 0:
+            raise ValueError(f"notifications.coalesce_window must be a non-negative number (got {self.notifications['coalesce_window']!r})")
+        if self.notifications['rate_limit'] <= 0:
+            raise ValueError(f"notifications.rate_limit must be a positive number (got {self.notifications['rate_limit']!r})")
+        if self.notifications['queue_size'] <= 0:
+            raise ValueError(f"notifications.queue_size must be a positive integer (got {self.notifications['queue_size']!r})")
+
+        # Validate alert suppression settings
+        for name, ttl in self.suppression['ttl'].items():
+            if ttl < 0:
+                raise ValueError(f"suppression.ttl.{name} must be a non-negative integer (got {ttl!r})")
+        if self.suppression['default_ttl'] < 0:
+            raise ValueError(f"suppression.default_ttl must be a non-negative integer (got {self.suppression['default_ttl']!r})")
+        if self.suppression['max_entries'] <= 0:
+            raise ValueError(f"suppression.max_entries must be a positive integer (got {self.suppression['max_entries']!r})")
+        if self.suppression['flush_interval'] <= 0:
+            raise ValueError(f"suppression.flush_interval must be a positive integer (got {self.suppression['flush_interval']!r})")
 
         # Validate behavior toggles
         if not isinstance(self.behavior['alert_new_process'], bool):
@@ -129,5 +420,116 @@ class Config:
         if not isinstance(self.anomaly['stddev_threshold'], (float, int)) or self.anomaly['stddev_threshold'] <= 0:
             raise ValueError(f"anomaly.stddev_threshold must be a positive number (got {self.anomaly['stddev_threshold']!r})")
 
+        if self.anomaly['zscore_threshold'] <= 0:
+            raise ValueError(f"anomaly.zscore_threshold must be a positive number (got {self.anomaly['zscore_threshold']!r})")
+        if not isinstance(self.anomaly['min_samples'], int) or self.anomaly['min_samples'] < 0:
+            raise ValueError(f"anomaly.min_samples must be a non-negative integer (got {self.anomaly['min_samples']!r})")
+
+        # Validate baseline settings
+        if self.baseline['mode'] not in {'cumulative', 'ewma', 'window'}:
+            raise ValueError(f"baseline.mode must be 'cumulative', 'ewma' or 'window' (got {self.baseline['mode']!r})")
+        if self.baseline['window_snapshots'] <= 0:
+            raise ValueError(f"baseline.window_snapshots must be a positive integer (got {self.baseline['window_snapshots']!r})")
+        if not (0 < self.baseline['ewma_alpha'] <= 1):
+            raise ValueError(f"baseline.ewma_alpha must be in (0, 1] (got {self.baseline['ewma_alpha']!r})")
+        if self.baseline['persist_interval'] <= 0:
+            raise ValueError(f"baseline.persist_interval must be a positive integer (got {self.baseline['persist_interval']!r})")
+
+        # Validate scheduler settings
+        if self.scheduler['min_interval'] <= 0:
+            raise ValueError(f"scheduler.min_interval must be a positive number (got {self.scheduler['min_interval']!r})")
+        if self.scheduler['adaptive'] and not (
+            self.scheduler['min_interval'] <= self.scan_interval <= self.scheduler['max_interval']
+        ):
+            raise ValueError(
+                f"scheduler.min_interval <= scan_interval <= scheduler.max_interval must hold when adaptive "
+                f"(got {self.scheduler['min_interval']!r}, {self.scan_interval!r}, {self.scheduler['max_interval']!r})"
+            )
+        if self.scheduler['churn_threshold'] < 0:
+            raise ValueError(f"scheduler.churn_threshold must be a non-negative number (got {self.scheduler['churn_threshold']!r})")
+        if not (0 < self.scheduler['max_duty_cycle'] <= 1):
+            raise ValueError(f"scheduler.max_duty_cycle must be in (0, 1] (got {self.scheduler['max_duty_cycle']!r})")
+
+        # Validate pipeline settings
+        if self.pipeline['queue_size'] <= 0:
+            raise ValueError(f"pipeline.queue_size must be a positive integer (got {self.pipeline['queue_size']!r})")
+        if self.pipeline['enrich_workers'] <= 0:
+            raise ValueError(f"pipeline.enrich_workers must be a positive integer (got {self.pipeline['enrich_workers']!r})")
+
+        # Validate metrics settings
+        if not (0 <= self.metrics['port'] <= 65535):
+            raise ValueError(f"metrics.port must be between 0 and 65535 (got {self.metrics['port']!r})")
+        if not isinstance(self.metrics['socket_path'], str):
+            raise ValueError(f"metrics.socket_path must be a string (got {self.metrics['socket_path']!r})")
+        if self.metrics['dump_interval'] < 0:
+            raise ValueError(f"metrics.dump_interval must be a non-negative integer (got {self.metrics['dump_interval']!r})")
+
+        # Validate flow tracking settings
+        if self.flows['drift_threshold'] < 0:
+            raise ValueError(f"flows.drift_threshold must be a non-negative number (got {self.flows['drift_threshold']!r})")
+        if self.flows['refresh_interval'] <= 0:
+            raise ValueError(f"flows.refresh_interval must be a positive integer (got {self.flows['refresh_interval']!r})")
+        if self.flows['persist'] not in {'changes', 'all'}:
+            raise ValueError(f"flows.persist must be 'changes' or 'all' (got {self.flows['persist']!r})")
+
+        # Validate storage settings
+        if self.storage['queue_size'] <= 0:
+            raise ValueError(f"storage.queue_size must be a positive integer (got {self.storage['queue_size']!r})")
+        if self.storage['batch_rows'] <= 0:
+            raise ValueError(f"storage.batch_rows must be a positive integer (got {self.storage['batch_rows']!r})")
+        if self.storage['flush_interval'] <= 0:
+            raise ValueError(f"storage.flush_interval must be a positive number (got {self.storage['flush_interval']!r})")
+        if self.storage['overflow'] not in {'drop', 'block'}:
+            raise ValueError(f"storage.overflow must be 'drop' or 'block' (got {self.storage['overflow']!r})")
+
+        # Validate retention settings
+        # The connections view unions one SELECT per partition; SQLite allows 500
+        if not (1 <= self.retention['raw_days'] <= 400):
+            raise ValueError(f"retention.raw_days must be between 1 and 400 (got {self.retention['raw_days']!r})")
+        if self.retention['rollup_days'] < self.retention['raw_days']:
+            raise ValueError(f"retention.rollup_days must be at least retention.raw_days (got {self.retention['rollup_days']!r})")
+        if self.retention['interval'] <= 0:
+            raise ValueError(f"retention.interval must be a positive integer (got {self.retention['interval']!r})")
+
+        # Validate collector settings
+        if self.collector['backend'] not in {'auto', 'lsof', 'psutil', 'proc'}:
+            raise ValueError(f"collector.backend must be 'auto', 'lsof', 'psutil' or 'proc' (got {self.collector['backend']!r})")
+        if self.collector['backend'] == 'proc' and not Path('/proc/net/tcp').exists():
+            raise ValueError("collector.backend 'proc' needs Linux /proc/net; use 'lsof' or 'psutil'")
+
+        # Validate feature store settings
+        if self.features['segment_rows'] < 1000:
+            raise ValueError(f"features.segment_rows must be at least 1000 (got {self.features['segment_rows']!r})")
+        if self.features['keep_days'] <= 0:
+            raise ValueError(f"features.keep_days must be a positive integer (got {self.features['keep_days']!r})")
+
+        # Validate logging settings
+        log_levels = {'DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'}
+        if self.logging['level'] not in log_levels:
+            raise ValueError(f"logging.level must be one of {sorted(log_levels)} (got {self.logging['level']!r})")
+        for name, level in self.logging['levels'].items():
+            if level not in log_levels:
+                raise ValueError(f"logging.levels.{name} must be one of {sorted(log_levels)} (got {level!r})")
+        if self.logging['format'] not in {'json', 'text'}:
+            raise ValueError(f"logging.format must be 'json' or 'text' (got {self.logging['format']!r})")
+        if self.logging['max_bytes'] < 0:
+            raise ValueError(f"logging.max_bytes must be a non-negative integer (got {self.logging['max_bytes']!r})")
+        if self.logging['backup_count'] < 0:
+            raise ValueError(f"logging.backup_count must be a non-negative integer (got {self.logging['backup_count']!r})")
+        if self.logging['rate_limit'] < 0:
+            raise ValueError(f"logging.rate_limit must be a non-negative number (got {self.logging['rate_limit']!r})")
+        if self.logging['burst'] < 1:
+            raise ValueError(f"logging.burst must be a positive integer (got {self.logging['burst']!r})")
+        if not (0 < self.logging['debug_sample_rate'] <= 1):
+            raise ValueError(f"logging.debug_sample_rate must be in (0, 1] (got {self.logging['debug_sample_rate']!r})")
+        if self.logging['queue_size'] <= 0:
+            raise ValueError(f"logging.queue_size must be a positive integer (got {self.logging['queue_size']!r})")
+
+        # Validate ML settings
+        if self.ml['backend'] not in {'numpy', 'keras'}:
+            raise ValueError(f"ml.backend must be 'numpy' or 'keras' (got {self.ml['backend']!r})")
+        if not isinstance(self.ml['weights_path'], str):
+            raise ValueError(f"ml.weights_path must be a string (got {self.ml['weights_path']!r})")
+
 # Singleton instance
 config = Config()
\ No newline at end of file
@@ -3,7 +3,8 @@ from datetime import datetime
 class Connection:
     def __init__(self, pid, process_name, user, local_ip, local_port, remote_ip, remote_port, status,
                  cpu_percent=None, memory_rss=None, timestamp=None, tag=None,
-                 connection_count=None, duration_seconds=None, is_remote_ipv6=None, anomaly_score=None):
+                 connection_count=None, duration_seconds=None, is_remote_ipv6=None, anomaly_score=None,
+                 protocol=None):
         self.pid = int(pid)
         self.process_name = process_name
         self.user = user
@@ -20,6 +21,8 @@ class Connection:
         self.duration_seconds = duration_seconds if duration_seconds is not None else 0.0
         self.is_remote_ipv6 = is_remote_ipv6 if is_remote_ipv6 is not None else False
         self.anomaly_score = anomaly_score if anomaly_score is not None else 0.0
+        # 'tcp' or 'udp'; not stored, but keeps a TCP and a UDP socket on the same ports apart
+        self.protocol = protocol or 'tcp'
 
     def __repr__(self):
         return (f"<Connection {self.process_name} (PID {self.pid}) "
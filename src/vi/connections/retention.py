@@ -0,0 +1,197 @@
+# Retention for connections.sqlite. A background job folds new rows of each daily
+# partition into per-minute aggregates per (process_name, remote_ip, remote_port),
+# drops partitions older than raw_days once they are fully rolled up, and deletes
+# rollups older than rollup_days. Raw storage therefore stays at about raw_days of
+# rows and rollups at rollup_days of minutes, however long the host runs. Rollups
+# commit in slices of ROLLUP_SLICE rows, so the connection writer never waits on
+# retention for longer than one slice, even on the first pass over a large database.
+
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from vi.connections.storage import (
+    DB_PATH, forget_partition, list_partitions, partition_day, refresh_view
+)
+from vi.db import close_connections, get_connection, transaction
+from vi.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Folds rows past the partition's last rolled rowid into the minute aggregates.
+# Means are merged weighted by sample count, so rolling up in several passes gives
+# the same result as one pass over the whole day.
+ROLLUP_SQL = '''
+    INSERT INTO connection_rollups (
+        minute, process_name, remote_ip, remote_port,
+        samples, mean_cpu_percent, mean_memory_rss, max_duration_seconds
+    )
+    SELECT
+        COALESCE(substr(timestamp, 1, 16), :day || ' 00:00'),
+        COALESCE(process_name, ''), COALESCE(remote_ip, ''), COALESCE(remote_port, 0),
+        COUNT(*), AVG(cpu_percent), AVG(memory_rss), MAX(duration_seconds)
+    FROM {table}
+    WHERE rowid > :after AND rowid <= :until
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (minute, process_name, remote_ip, remote_port) DO UPDATE SET
+        mean_cpu_percent = (mean_cpu_percent * samples + excluded.mean_cpu_percent * excluded.samples)
+                           / (samples + excluded.samples),
+        mean_memory_rss = (mean_memory_rss * samples + excluded.mean_memory_rss * excluded.samples)
+                          / (samples + excluded.samples),
+        max_duration_seconds = MAX(max_duration_seconds, excluded.max_duration_seconds),
+        samples = samples + excluded.samples
+'''
+
+# Rows rolled up per transaction, and the pause after each one. SQLite's busy
+# handler polls rather than queues, so without the pause the writer could keep
+# missing the moment between two slices.
+ROLLUP_SLICE = 20000
+ROLLUP_PAUSE = 0.1
+
+def rollup_partition(db_conn, table: str, limit: Optional[int] = None, until: Optional[int] = None) -> int:
+    """
+    Rolls up rows added to table since its last rollup, at most limit of them and
+    none past rowid until; returns how many.
+    """
+    if until is None:
+        until = db_conn.execute(f'SELECT MAX(rowid) FROM {table}').fetchone()[0] or 0
+    row = db_conn.execute('SELECT rolled_rowid FROM partition_rollups WHERE partition = ?', (table,)).fetchone()
+    after = row[0] if row else 0
+    if limit is not None:
+        until = min(until, after + limit)
+    if until <= after:
+        return 0
+    db_conn.execute(ROLLUP_SQL.format(table=table), {'day': partition_day(table), 'after': after, 'until': until})
+    db_conn.execute('''
+        INSERT INTO partition_rollups (partition, rolled_rowid, last_rolled_up) VALUES (?, ?, ?)
+        ON CONFLICT (partition) DO UPDATE SET
+            rolled_rowid = excluded.rolled_rowid,
+            last_rolled_up = excluded.last_rolled_up
+    ''', (table, until, datetime.now().isoformat(timespec='seconds')))
+    # Rowids only grow (rows are never deleted from a partition), so this is the row count
+    return until - after
+
+def run_retention(raw_days: int = 7, rollup_days: int = 365, now: Optional[datetime] = None,
+                  slice_rows: int = ROLLUP_SLICE) -> dict:
+    """
+    One rollup and retention pass. Partitions are rolled up slice_rows rows per
+    transaction; those older than raw_days are then dropped, together with the
+    view swap, in one short transaction. Returns counts for the pass.
+    """
+    now = now or datetime.now()
+    raw_cutoff = (now - timedelta(days=raw_days)).strftime('%Y-%m-%d')
+    rollup_cutoff = (now - timedelta(days=rollup_days)).strftime('%Y-%m-%d')
+    rolled_rows, dropped = 0, []
+    db_conn = get_connection(DB_PATH)
+    for table in list_partitions(db_conn):
+        # Rows the writer adds meanwhile are left for the next pass, rather than chased
+        end = db_conn.execute(f'SELECT MAX(rowid) FROM {table}').fetchone()[0] or 0
+        while True:
+            # Each slice commits on its own, releasing the write lock in between
+            with transaction(DB_PATH) as db_conn:
+                rolled = rollup_partition(db_conn, table, limit=slice_rows, until=end)
+            rolled_rows += rolled
+            if rolled < slice_rows:
+                break
+            time.sleep(ROLLUP_PAUSE)
+
+    with transaction(DB_PATH) as db_conn:
+        # Drops and the view swap commit together, so readers never see the view dangling
+        if not db_conn.in_transaction:
+            db_conn.execute('BEGIN IMMEDIATE')
+        for table in list_partitions(db_conn):
+            if partition_day(table) >= raw_cutoff:
+                continue
+            # Rows written since its slices (normally none, the day being over)
+            rolled_rows += rollup_partition(db_conn, table)
+            db_conn.execute(f'DROP TABLE {table}')
+            db_conn.execute('DELETE FROM partition_rollups WHERE partition = ?', (table,))
+            dropped.append(table)
+        if dropped:
+            refresh_view(db_conn)
+    with transaction(DB_PATH) as db_conn:
+        deleted_rollups = db_conn.execute('DELETE FROM connection_rollups WHERE minute < ?',
+                                          (rollup_cutoff,)).rowcount
+    for table in dropped:
+        forget_partition(table)
+    if dropped or deleted_rollups:
+        # Hand the freed pages back (a no-op on databases created without auto_vacuum)
+        with transaction(DB_PATH) as db_conn:
+            db_conn.execute('PRAGMA incremental_vacuum').fetchall()
+    return {'rolled_rows': rolled_rows, 'dropped_partitions': len(dropped), 'deleted_rollups': deleted_rollups}
+
+class RetentionJob(threading.Thread):
+    """Runs run_retention() at start-up and then every interval seconds."""
+
+    def __init__(self, raw_days: int = 7, rollup_days: int = 365, interval: float = 3600):
+        super().__init__(name='vi-retention', daemon=True)
+        self.raw_days = raw_days
+        self.rollup_days = rollup_days
+        self.interval = interval
+        self.runs = 0
+        self.errors = 0
+        self.rolled_rows = 0
+        self.dropped_partitions = 0
+        self.deleted_rollups = 0
+        self.last_duration = 0.0
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            started = time.monotonic()
+            try:
+                with timed('retention'):
+                    result = run_retention(self.raw_days, self.rollup_days)
+                self.runs += 1
+                self.rolled_rows += result['rolled_rows']
+                self.dropped_partitions += result['dropped_partitions']
+                self.deleted_rollups += result['deleted_rollups']
+                logger.info(
+                    f"[RETENTION] Rolled up {result['rolled_rows']} row(s), dropped "
+                    f"{result['dropped_partitions']} partition(s) and {result['deleted_rollups']} rollup row(s)",
+                    extra=result
+                )
+            except Exception:
+                self.errors += 1
+                logger.exception("[RETENTION] Rollup and retention pass failed")
+            self.last_duration = time.monotonic() - started
+            self._stopped.wait(self.interval)
+        close_connections()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopped.set()
+        self.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            'runs': self.runs,
+            'errors': self.errors,
+            'rolled_rows': self.rolled_rows,
+            'dropped_partitions': self.dropped_partitions,
+            'deleted_rollups': self.deleted_rollups,
+            'last_duration': round(self.last_duration, 3)
+        }
+
+_job: Optional[RetentionJob] = None
+
+def start_retention(**kwargs) -> RetentionJob:
+    """Starts the process-wide retention job; it is stopped at interpreter exit."""
+    global _job
+    if _job is None:
+        _job = RetentionJob(**kwargs)
+        _job.start()
+        atexit.register(stop_retention)
+    return _job
+
+def stop_retention():
+    global _job
+    if _job is not None:
+        _job.stop()
+        _job = None
+
+def retention_stats() -> dict:
+    """Counters of the retention job, or an empty dict if none is running."""
+    return _job.stats() if _job is not None else {}
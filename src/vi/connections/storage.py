@@ -1,134 +1,419 @@
-import sqlite3
+import atexit
+import queue
+import re
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
+from typing import Optional
 import logging
+from vi.db import close_connections, get_connection, transaction
+from vi.metrics import timed
+
 logger = logging.getLogger(__name__)
-if not logger.handlers:
-    handler = logging.FileHandler(Path.home() / '.vi' / 'logs' / 'vi.stdout.log')
-    formatter = logging.Formatter('[%(asctime)s] %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
-    logger.setLevel(logging.DEBUG)
 
 # Path to the SQLite database for connection logs
 DB_PATH = Path.home() / '.vi' / 'logs' / 'connections.sqlite'
 
 def init_baseline_table():
-    """Ensure the baseline_stats table exists."""
-    db_conn = sqlite3.connect(DB_PATH)
-    c = db_conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS baseline_stats (
-            feature_name TEXT PRIMARY KEY,
-            mean REAL,
-            stddev REAL,
-            last_updated TEXT
+    """Ensure the baseline_stats tables exist with sample counts."""
+    with transaction(DB_PATH) as db_conn:
+        db_conn.execute('''
+            CREATE TABLE IF NOT EXISTS baseline_stats (
+                feature_name TEXT PRIMARY KEY,
+                mean REAL,
+                stddev REAL,
+                last_updated TEXT,
+                sample_count INTEGER,
+                m2 REAL
+            )
+        ''')
+        # Tables created before streaming stats lack the accumulator columns
+        columns = {row[1] for row in db_conn.execute('PRAGMA table_info(baseline_stats)')}
+        if 'sample_count' not in columns:
+            db_conn.execute('ALTER TABLE baseline_stats ADD COLUMN sample_count INTEGER')
+        if 'm2' not in columns:
+            db_conn.execute('ALTER TABLE baseline_stats ADD COLUMN m2 REAL')
+        db_conn.execute('''
+            CREATE TABLE IF NOT EXISTS process_baseline_stats (
+                process_name TEXT,
+                feature_name TEXT,
+                mean REAL,
+                stddev REAL,
+                sample_count INTEGER,
+                m2 REAL,
+                last_updated TEXT,
+                PRIMARY KEY (process_name, feature_name)
+            )
+        ''')
+
+# Raw rows are partitioned into one table per day (connections_YYYYMMDD), so expired
+# days are dropped whole instead of deleted row by row. Readers query the
+# `connections` view, which unions every partition still on disk.
+PARTITION_PREFIX = 'connections_'
+PARTITION_GLOB = PARTITION_PREFIX + '[0-9]' * 8
+
+CONNECTION_COLUMNS = (
+    'timestamp', 'pid', 'user', 'process_name',
+    'local_ip', 'local_port', 'remote_ip', 'remote_port',
+    'cpu_percent', 'memory_rss', 'connection_count', 'duration_seconds',
+    'is_remote_ipv6', 'status', 'tag', 'anomaly_score'
+)
+
+CONNECTION_SCHEMA = '''
+    timestamp TEXT,
+    pid INTEGER,
+    user TEXT,
+    process_name TEXT,
+    local_ip TEXT,
+    local_port INTEGER,
+    remote_ip TEXT,
+    remote_port INTEGER,
+    cpu_percent REAL,
+    memory_rss INTEGER,
+    connection_count INTEGER,
+    duration_seconds REAL,
+    is_remote_ipv6 INTEGER,
+    status TEXT,
+    tag TEXT,
+    anomaly_score REAL
+'''
+
+_DAY_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+# Partitions known to exist, so inserts skip the CREATE TABLE round trip
+_partitions: set[str] = set()
+
+def partition_name(day: str) -> str:
+    """'2024-05-01' -> 'connections_20240501'"""
+    return PARTITION_PREFIX + day.replace('-', '')
+
+def partition_day(table: str) -> str:
+    """'connections_20240501' -> '2024-05-01'"""
+    digits = table[len(PARTITION_PREFIX):]
+    return f"{digits[:4]}-{digits[4:6]}-{digits[6:]}"
+
+def list_partitions(db_conn) -> list[str]:
+    return [row[0] for row in db_conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ? ORDER BY name", (PARTITION_GLOB,)
+    )]
+
+# Indexes on every partition: time ranges, and lookups by IP, process and process +
+# port, each ending in timestamp so matches come back in time order without a sort.
+# The remote_ip index also carries process_name and pid, so "which processes talked
+# to this IP" is answered from the index alone.
+PARTITION_INDEXES = {
+    'ts': 'timestamp',
+    'ip': 'remote_ip, timestamp, process_name, pid',
+    'proc': 'process_name, timestamp',
+    'proc_port': 'process_name, remote_port, timestamp'
+}
+
+def create_partition(db_conn, table: str):
+    """Creates a partition table and its indexes if missing."""
+    db_conn.execute(f'CREATE TABLE IF NOT EXISTS {table} ({CONNECTION_SCHEMA})')
+    for suffix, columns in PARTITION_INDEXES.items():
+        db_conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_{suffix} ON {table} ({columns})')
+
+def refresh_view(db_conn):
+    """Recreates the `connections` view over the current partitions (creating today's if there are none)."""
+    tables = list_partitions(db_conn)
+    if not tables:
+        tables = [partition_name(datetime.now().strftime('%Y-%m-%d'))]
+        create_partition(db_conn, tables[0])
+    db_conn.execute('DROP VIEW IF EXISTS connections')
+    db_conn.execute('CREATE VIEW connections AS ' + ' UNION ALL '.join(f'SELECT * FROM {t}' for t in tables))
+
+def ensure_partition(db_conn, day: str) -> str:
+    """Returns the partition table for day, creating it (and updating the view) on first use."""
+    table = partition_name(day)
+    if table not in _partitions:
+        # Create the table and swap the view inside the caller's transaction, so
+        # readers never see the view missing. IMMEDIATE takes the write lock up
+        # front: upgrading a read of the schema fails at once, without waiting for
+        # busy_timeout, if another connection committed in between.
+        if not db_conn.in_transaction:
+            db_conn.execute('BEGIN IMMEDIATE')
+        create_partition(db_conn, table)
+        refresh_view(db_conn)
+        _partitions.add(table)
+    return table
+
+def forget_partition(table: str):
+    """Called after a partition is dropped, so a late row for that day recreates it."""
+    _partitions.discard(table)
+
+def _migrate_legacy_table(db_conn):
+    # Databases from before partitioning hold every row in a single `connections` table
+    columns = ', '.join(CONNECTION_COLUMNS)
+    days = [row[0] for row in db_conn.execute('SELECT DISTINCT substr(timestamp, 1, 10) FROM connections')]
+    today = datetime.now().strftime('%Y-%m-%d')
+    for day in days:
+        table = partition_name(day if day and _DAY_RE.fullmatch(day) else today)
+        # Indexes are added by init_db once the rows are in
+        db_conn.execute(f'CREATE TABLE IF NOT EXISTS {table} ({CONNECTION_SCHEMA})')
+        if day is None:
+            db_conn.execute(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM connections '
+                            f'WHERE timestamp IS NULL')
+        else:
+            db_conn.execute(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM connections '
+                            f'WHERE substr(timestamp, 1, 10) = ?', (day,))
+    db_conn.execute('DROP TABLE connections')
+    logger.info(f"[DB] Split the connections table into {len(days)} daily partition(s)")
+
+def init_rollup_tables():
+    """Ensure the per-minute rollup table and the rollup progress table exist."""
+    with transaction(DB_PATH) as db_conn:
+        db_conn.execute('''
+            CREATE TABLE IF NOT EXISTS connection_rollups (
+                minute TEXT,
+                process_name TEXT,
+                remote_ip TEXT,
+                remote_port INTEGER,
+                samples INTEGER,
+                mean_cpu_percent REAL,
+                mean_memory_rss REAL,
+                max_duration_seconds REAL,
+                PRIMARY KEY (minute, process_name, remote_ip, remote_port)
+            )
+        ''')
+        # The primary key serves time ranges; these serve IP, process and process + port lookups
+        db_conn.execute('CREATE INDEX IF NOT EXISTS connection_rollups_ip ON connection_rollups (remote_ip, minute)')
+        db_conn.execute('CREATE INDEX IF NOT EXISTS connection_rollups_proc ON connection_rollups (process_name, minute)')
+        db_conn.execute(
+            'CREATE INDEX IF NOT EXISTS connection_rollups_proc_port '
+            'ON connection_rollups (process_name, remote_port, minute)'
         )
-    ''')
-    db_conn.commit()
-    db_conn.close()
+        # Highest rowid of each partition already folded into connection_rollups
+        db_conn.execute('''
+            CREATE TABLE IF NOT EXISTS partition_rollups (
+                partition TEXT PRIMARY KEY,
+                rolled_rowid INTEGER,
+                last_rolled_up TEXT
+            )
+        ''')
 
 def init_db():
-    """Initialize the SQLite database and ensure the connections table exists."""
-    db_conn = sqlite3.connect(DB_PATH)
-    c = db_conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS connections (
-            timestamp TEXT,
-            pid INTEGER,
-            user TEXT,
-            process_name TEXT,
-            local_ip TEXT,
-            local_port INTEGER,
-            remote_ip TEXT,
-            remote_port INTEGER,
-            cpu_percent REAL,
-            memory_rss INTEGER,
-            connection_count INTEGER,
-            duration_seconds REAL,
-            is_remote_ipv6 INTEGER,
-            status TEXT,
-            tag TEXT,
-            anomaly_score REAL
-        )
-    ''')
-    db_conn.commit()
-    db_conn.close()
+    """Initialize the SQLite database: daily connection partitions, the connections view and rollups."""
+    db_conn = get_connection(DB_PATH)
+    # Only takes effect on a new database; lets space freed by dropped partitions be returned
+    db_conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+    with transaction(DB_PATH) as db_conn:
+        # The view is swapped in the same transaction, so concurrent readers never miss it
+        if not db_conn.in_transaction:
+            db_conn.execute('BEGIN IMMEDIATE')
+        legacy = db_conn.execute("SELECT type FROM sqlite_master WHERE name = 'connections'").fetchone()
+        if legacy and legacy[0] == 'table':
+            _migrate_legacy_table(db_conn)
+        # Partitions from before indexing get their indexes here
+        for table in list_partitions(db_conn):
+            create_partition(db_conn, table)
+        refresh_view(db_conn)
+        _partitions.update(list_partitions(db_conn))
+    init_rollup_tables()
     init_baseline_table()
 
+INSERT_SQL = f'''
+    INSERT INTO {{table}} ({', '.join(CONNECTION_COLUMNS)})
+    VALUES ({', '.join('?' * len(CONNECTION_COLUMNS))})
+'''
+
+def connection_row(conn_obj) -> tuple:
+    """Flattens a Connection into the order of CONNECTION_COLUMNS."""
+    return (
+        conn_obj.timestamp,
+        conn_obj.pid,
+        conn_obj.user,
+        conn_obj.process_name,
+        conn_obj.local_ip,
+        conn_obj.local_port,
+        conn_obj.remote_ip,
+        conn_obj.remote_port,
+        conn_obj.cpu_percent,
+        conn_obj.memory_rss,
+        conn_obj.connection_count,
+        conn_obj.duration_seconds,
+        conn_obj.is_remote_ipv6,
+        conn_obj.status,
+        conn_obj.tag,
+        conn_obj.anomaly_score
+    )
+
+# Timestamps arrive as datetimes from the flow table or as ISO strings
+def _row_day(timestamp, today: str) -> str:
+    if isinstance(timestamp, datetime):
+        return timestamp.date().isoformat()
+    if isinstance(timestamp, str) and _DAY_RE.match(timestamp):
+        return timestamp[:10]
+    return today
+
+def insert_rows(rows: list[tuple]):
+    """Insert pre-flattened rows into their daily partitions in a single transaction."""
+    if not rows:
+        return
+    today = datetime.now().strftime('%Y-%m-%d')
+    by_day: dict[str, list[tuple]] = {}
+    # Rows of one snapshot share a timestamp, so only a change of timestamp is parsed
+    last_timestamp, day = object(), today
+    for row in rows:
+        if row[0] != last_timestamp:
+            last_timestamp = row[0]
+            day = _row_day(last_timestamp, today)
+        by_day.setdefault(day, []).append(row)
+    try:
+        with transaction(DB_PATH) as db_conn:
+            for day, day_rows in by_day.items():
+                db_conn.executemany(INSERT_SQL.format(table=ensure_partition(db_conn, day)), day_rows)
+    except Exception:
+        # A rolled-back CREATE TABLE must not stay cached as existing
+        _partitions.clear()
+        raise
+
 def insert_connections(connections):
     """Insert a list of Connection objects into the connections table."""
     if not connections:
         return
     logger.debug(f"[DB] Inserting {len(connections)} connection(s) into the database.")
-    db_conn = sqlite3.connect(DB_PATH)
-    c = db_conn.cursor()
-    for conn_obj in connections:
+    insert_rows([connection_row(conn_obj) for conn_obj in connections])
+
+class ConnectionWriter(threading.Thread):
+    """
+    Background writer for connection snapshots. The scan loop hands off rows
+    through a bounded queue; the writer groups them into batched transactions,
+    committing once batch_rows are pending or flush_interval seconds have passed.
+    When the queue is full, snapshots are either dropped (and counted) or the
+    caller blocks until the writer catches up, depending on overflow.
+    """
+
+    def __init__(self, queue_size: int = 8, batch_rows: int = 5000,
+                 flush_interval: float = 5.0, overflow: str = 'drop'):
+        super().__init__(name='vi-connection-writer', daemon=True)
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.rows_written = 0
+        self.batches_committed = 0
+        self.snapshots_dropped = 0
+        self.rows_dropped = 0
+        self.write_errors = 0
+        # Called with each committed batch of rows, on the writer thread
+        self.listeners: list = []
+        self._stopped = threading.Event()
+
+    def submit(self, connections) -> bool:
+        """Queues a snapshot for writing. Returns False if it was dropped."""
+        if not connections:
+            return True
+        # Flatten now: Connection objects may be modified after the scan hands them off
+        rows = [connection_row(conn_obj) for conn_obj in connections]
         try:
-            logger.debug(f"Inserting connection PID {conn_obj.pid} - CPU: {conn_obj.cpu_percent}%, Mem: {conn_obj.memory_rss} MB, Tag: {conn_obj.tag}")
-            c.execute('''
-                INSERT INTO connections (
-                    timestamp, pid, user, process_name,
-                    local_ip, local_port, remote_ip, remote_port,
-                    cpu_percent, memory_rss, connection_count, duration_seconds,
-                    is_remote_ipv6, status, tag, anomaly_score
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                conn_obj.timestamp,
-                conn_obj.pid,
-                conn_obj.user,
-                conn_obj.process_name,
-                conn_obj.local_ip,
-                conn_obj.local_port,
-                conn_obj.remote_ip,
-                conn_obj.remote_port,
-                conn_obj.cpu_percent,
-                conn_obj.memory_rss,
-                conn_obj.connection_count,
-                conn_obj.duration_seconds,
-                conn_obj.is_remote_ipv6,
-                conn_obj.status,
-                conn_obj.tag,
-                conn_obj.anomaly_score
-            ))
-            print(f"Inserted connection: {conn_obj}")
-        except Exception as e:
-            print(f"Error inserting connection {conn_obj}: {e}")
-    db_conn.commit()
-    db_conn.close()
-def compute_and_store_baseline_stats():
-    """Compute mean and stddev for relevant features and store them in baseline_stats table."""
-    import numpy as np
+            if self.overflow == 'block':
+                self.queue.put(rows)
+            else:
+                self.queue.put_nowait(rows)
+            return True
+        except queue.Full:
+            self.snapshots_dropped += 1
+            self.rows_dropped += len(rows)
+            logger.warning(f"[DB] Writer queue full; dropped snapshot of {len(rows)} row(s) "
+                           f"({self.snapshots_dropped} snapshot(s) dropped so far)")
+            return False
 
-    db_conn = sqlite3.connect(DB_PATH)
-    c = db_conn.cursor()
+    def run(self):
+        pending: list[tuple] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self.queue.get(timeout=max(deadline - time.monotonic(), 0.0))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._flush(pending)
+                break
+            if item:
+                pending.extend(item)
+            if len(pending) >= self.batch_rows or time.monotonic() >= deadline:
+                self._flush(pending)
+                pending = []
+                deadline = time.monotonic() + self.flush_interval
+        close_connections()
 
-    features = ['cpu_percent', 'memory_rss', 'connection_count', 'duration_seconds']
-    for feature in features:
+    def _flush(self, rows: list[tuple]):
+        if not rows:
+            return
         try:
-            c.execute(f"SELECT {feature} FROM connections WHERE {feature} IS NOT NULL")
-            values = [row[0] for row in c.fetchall() if row[0] is not None]
-            if not values:
-                logger.warning(f"[BASELINE] No data for feature: {feature}")
-                continue
-
-            mean_val = np.mean(values)
-            stddev_val = np.std(values)
-            last_updated = datetime.now().isoformat()
-
-            c.execute('''
-                INSERT INTO baseline_stats (feature_name, mean, stddev, last_updated)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(feature_name) DO UPDATE SET
-                    mean=excluded.mean,
-                    stddev=excluded.stddev,
-                    last_updated=excluded.last_updated
-            ''', (feature, mean_val, stddev_val, last_updated))
-
-            logger.debug(f"[BASELINE] Stats updated for {feature}: mean={mean_val:.2f}, stddev={stddev_val:.2f}")
-
-        except Exception as e:
-            logger.error(f"[BASELINE] Failed to compute stats for {feature}: {e}")
-
-    db_conn.commit()
-    db_conn.close()
\ No newline at end of file
+            with timed('sqlite_commit'):
+                insert_rows(rows)
+            self.rows_written += len(rows)
+            self.batches_committed += 1
+            logger.debug(f"[DB] Committed {len(rows)} connection row(s)")
+        except Exception:
+            self.write_errors += 1
+            logger.exception(f"[DB] Failed to write {len(rows)} connection row(s)")
+            return
+        for listener in self.listeners:
+            try:
+                listener(rows)
+            except Exception:
+                logger.exception(f"[DB] Listener {getattr(listener, '__qualname__', listener)} failed")
+
+    def add_listener(self, callback):
+        """Registers callback(rows) to receive every batch after it is committed."""
+        self.listeners.append(callback)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Flushes everything queued so far and stops the thread."""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self.queue.put(_STOP)
+        self.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            'queue_depth': self.queue.qsize(),
+            'rows_written': self.rows_written,
+            'batches_committed': self.batches_committed,
+            'snapshots_dropped': self.snapshots_dropped,
+            'rows_dropped': self.rows_dropped,
+            'write_errors': self.write_errors
+        }
+
+_STOP = object()
+_writer: Optional[ConnectionWriter] = None
+
+def start_writer(**kwargs) -> ConnectionWriter:
+    """
+    Starts the process-wide background writer. The daemon flushes it on shutdown,
+    with an atexit hook as fallback; rows still queued are lost on SIGKILL.
+    """
+    global _writer
+    if _writer is None:
+        _writer = ConnectionWriter(**kwargs)
+        _writer.start()
+        atexit.register(stop_writer)
+    return _writer
+
+def stop_writer():
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+
+def writer_stats() -> dict:
+    """Counters of the background writer, or an empty dict if none is running."""
+    return _writer.stats() if _writer is not None else {}
+
+def submit_connections(connections) -> bool:
+    """Hands a snapshot to the background writer, or inserts it inline if none is running."""
+    if _writer is None:
+        insert_connections(connections)
+        return True
+    return _writer.submit(connections)
+
+def compute_and_store_baseline_stats():
+    """Persist the streaming baseline accumulators to the baseline_stats table."""
+    from vi.stats import get_baseline_accumulator
+
+    get_baseline_accumulator().persist()
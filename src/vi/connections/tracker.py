@@ -2,22 +2,26 @@
 
 # Maintains map of which PID contacted which IP
 import logging
-from datetime import datetime
+from typing import Optional
 from vi.connections import Connection
+from vi.linkage import LinkageIndex, get_linkage_index, link_day
+from vi.logs import preview
+
+logger = logging.getLogger(__name__)
 
 # This function is only responsible for tracking and alerting, not for DB insertion logic
 # Iterates Connections and builds a key, alerts for new and known links
-def track_connections(connections: list[Connection], known_links: dict):
-    logging.info("[TRACKER] Tracking process-IP linkage...")
-    logging.debug(f"[TRACKER] Known links before processing: {known_links}")
-
-    for conn in connections:
-        logging.debug(f"[TRACKER] Processing connection with timestamp: {conn.timestamp}")
-        key = (conn.pid, conn.remote_ip, conn.timestamp)
+def track_connections(connections: list[Connection], known_links: Optional[LinkageIndex] = None):
+    if known_links is None:
+        known_links = get_linkage_index()
+    known_before = len(known_links)
 
-        # Alerting logic: track if a (PID, IP, timestamp) combination has been seen before
-        if key not in known_links:
-            known_links[key] = datetime.now()
-            logging.info(f"[NEW LINK] PID {conn.pid} ({conn.process_name}) -> {conn.remote_ip}")
-        else:
-            logging.debug(f"[KNOWN LINK] PID {conn.pid} -> {conn.remote_ip}")
\ No newline at end of file
+    # Alerting logic: track if a (PID, IP, day) combination has been seen before
+    new_links = [conn for conn in connections
+                 if known_links.add(conn.pid, conn.remote_ip, link_day(conn.timestamp))]
+    if new_links:
+        logger.info(
+            f"[TRACKER] {len(new_links)} new process-IP link(s): "
+            f"{preview(f'PID {c.pid} ({c.process_name}) -> {c.remote_ip}' for c in new_links)}",
+            extra={'new_links': len(new_links), 'known_links': known_before}
+        )
\ No newline at end of file
@@ -6,25 +6,40 @@ import os
 sys.path.append(os.path.expanduser("~/.vi/src"))
 
 # Standard Library
-import sys, os, time, logging, warnings
+import sys, os, time, logging, signal, warnings
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Tuple
 
 # Third-Party
 from urllib3.exceptions import NotOpenSSLWarning
 
 # Internal Imports
-from vi.connections import tracker
-from vi.alerts import init_alerts_db, record_alert, send_notification
-from vi.baseline import update_baseline, load_linkage
-from vi.behavior import init_behavior_db, check_behavior
+from vi.alerts import (
+    DB_PATH as ALERTS_DB_PATH, dispatcher_stats, init_alerts_db, record_alert, send_notification, stop_dispatcher
+)
+from vi.baseline import update_baseline, load_known_ips
+from vi.behavior import DB_PATH as BEHAVIOR_DB_PATH, init_behavior_db, check_behavior
 from vi.config import config
-from vi.connections.storage import init_db, insert_connections
+from vi.connections.retention import retention_stats, start_retention
+from vi.connections.storage import (
+    init_db, start_writer, stop_writer, submit_connections, writer_stats, compute_and_store_baseline_stats
+)
+from vi.db import transaction
+from vi.feature_store import get_feature_store
+from vi.flows import FlowDelta, get_flow_table
 from vi.net_monitor import get_active_connections
+from vi.pipeline import Pipeline
+from vi import logs, metrics
+from vi.metrics import registry, timed
+from vi.scheduler import ScanScheduler
 from vi.system import log_boot_time, log_active_processes
-from vi.intel import init_intel_db, get_ip_reputation
-from ml.inference import predict_connection
+from vi.intel import flush_reputation_cache, init_intel_db, reputation_cache_stats, resolve_reputations
+from vi.stats import get_baseline_accumulator
+from vi.suppression import get_suppression_store
+from ml.inference import predict_connections
+
+# Named explicitly: launchd runs this file as __main__
+logger = logging.getLogger('vi.daemon')
 
 # Suppress urllib3 LibreSSL compatibility warnings
 warnings.filterwarnings("ignore", category=NotOpenSSLWarning)
@@ -36,26 +51,12 @@ log_file.parent.mkdir(parents=True, exist_ok=True)
 ANOMALY_SEVERITY = {
     'new_process': 'low',
     'new_process_port': 'medium',
+    'outlier': 'low',
     'malicious_ip': 'high'
 }
 
-_ALERT_HISTORY = {}
-
 def configure_logging():
-    try:
-        logging.basicConfig(
-            filename=log_file,
-            level=logging.DEBUG,
-            format='%(asctime)s [%(levelname)s] %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-    except Exception:
-        logging.basicConfig(
-            level=logging.DEBUG,
-            format='%(asctime)s [%(levelname)s] %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        logging.warning("[LOGGING] Failed to write to file; logging to stdout instead.")
+    logs.configure_logging(**config.logging, path=log_file)
 
 def initialize_databases():
     init_db()
@@ -63,151 +64,312 @@ def initialize_databases():
     init_behavior_db()
     init_alerts_db()
 
+# Stage 1 (enrichment): ML tags and IP reputation for the connections that need them,
+# i.e. opened or drifted flows. Safe to run for several snapshots at once.
+def enrich_snapshot(delta: FlowDelta) -> FlowDelta:
+    connections = delta.changed
+    # Apply ML tagging to the whole snapshot in a single forward pass
+    try:
+        with timed('ml'):
+            tags, _ = predict_connections(connections)
+        for conn_obj, tag in zip(connections, tags):
+            conn_obj.tag = tag
+        logger.debug(
+            f"[ML] Tagged {len(tags)} connection(s): {tags.count('suspicious')} suspicious, "
+            f"{tags.count('error')} with invalid features"
+        )
+    except Exception:
+        logger.exception("[ML] Batch prediction failed")
+        for conn_obj in connections:
+            conn_obj.tag = "error"
+
+    # Assess IP reputation once per distinct IP in the snapshot
+    try:
+        with timed('intel'):
+            reputations = resolve_reputations(c.remote_ip for c in connections)
+    except Exception:
+        logger.exception("[INTEL] Failed to resolve IP reputations")
+        reputations = {}
+
+    for conn_obj in connections:
+        rep = reputations.get(conn_obj.remote_ip)
+        if rep is not None:
+            conn_obj.reputation_score = rep['score']
+            conn_obj.is_malicious = rep['is_malicious']
+        else:
+            conn_obj.reputation_score = 0.0
+            conn_obj.is_malicious = False
+    return delta
+
+# Stage 2 (detection): alerts, behavior checks, known IPs/linkage and baseline scoring.
+# Stateful, so snapshots pass through it one at a time and in order, which also
+# keeps alerts in snapshot order.
+def detect_snapshot(delta: FlowDelta) -> FlowDelta:
+    connections = delta.changed
+    # Unchanged and closed flows take the enrichment of their last enriched observation
+    delta.inherit_enrichment()
+
+    # Repeats of an alert within its type's TTL are counted instead of re-alerting
+    suppression = get_suppression_store()
+    with transaction(BEHAVIOR_DB_PATH, ALERTS_DB_PATH):
+        # Alert and log if IP is flagged as malicious
+        for conn_obj in connections:
+            try:
+                if getattr(conn_obj, "is_malicious", False):
+                    severity = ANOMALY_SEVERITY['malicious_ip']
+                    key = ('malicious_ip', conn_obj.remote_ip)
+                    if suppression.check(key, conn_obj, severity):
+                        logger.warning(f"Malicious IP detected: {conn_obj.remote_ip} (score={getattr(conn_obj, 'reputation_score', 0.0)})")
+                        record_alert(conn_obj, 'malicious_ip', severity=severity)
+                        send_notification("Vi Alert", f"Malicious IP detected: {conn_obj.remote_ip} (score={getattr(conn_obj, 'reputation_score', 0.0)})",
+                                          severity=severity, anomaly_type='malicious_ip', process_name=conn_obj.process_name)
+            except Exception:
+                logger.exception(f"[ALERT] Failed while handling malicious IP alert for {conn_obj.remote_ip}")
+
+        # Run behavioral anomaly checks
+        try:
+            with timed('behavior'):
+                anomalies = check_behavior(connections)
+            for co, anomaly in anomalies:
+                if anomaly == 'new_process' and not config.behavior['alert_new_process']:
+                    continue
+                if anomaly == 'new_process_port' and not config.behavior['alert_new_process_port']:
+                    continue
+                severity = ANOMALY_SEVERITY.get(anomaly, 'medium')
+                key = (anomaly, co.process_name, co.remote_port)
+                if suppression.check(key, co, severity):
+                    logger.warning(f"Behavioral anomaly [{anomaly}] detected: {co.process_name} (PID {co.pid}) → remote port {co.remote_port}")
+                    record_alert(co, anomaly, severity=severity)
+                    send_notification("Vi Alert", f"Behavioral anomaly [{anomaly}] detected: {co.process_name} (PID {co.pid}) → remote port {co.remote_port}",
+                                      severity=severity, anomaly_type=anomaly, process_name=co.process_name)
+        except Exception:
+            logger.exception("[BEHAVIOR] Exception occurred while checking for behavioral anomalies")
+
+        # Update known IPs and linkage, and score the snapshot against the baseline
+        outliers = []
+        try:
+            with timed('baseline'):
+                outliers = update_baseline(connections)
+        except Exception:
+            logger.exception("[BASELINE] Failed to update baseline or track connection linkage")
+
+        for co in outliers:
+            severity = ANOMALY_SEVERITY['outlier']
+            key = ('outlier', co.process_name, co.remote_ip, co.remote_port)
+            if suppression.check(key, co, severity):
+                logger.warning(f"Statistical outlier detected: {co.process_name} (PID {co.pid}) → {co.remote_ip}:{co.remote_port} (z={co.anomaly_score})")
+                try:
+                    record_alert(co, 'outlier', severity=severity)
+                except Exception:
+                    logger.exception(f"[ALERT] Failed to record outlier alert for {co.process_name}")
+
+        # Write aggregated rows for suppressed repeats and save the suppression keys
+        try:
+            suppression.maybe_flush()
+        except Exception:
+            logger.exception("[ALERT] Failed to flush alert suppression state")
+
+    # Fold the snapshot into the streaming baseline statistics after it has been scored.
+    # Every open flow goes in, whatever flows.persist stores: changed flows alone are
+    # mostly just-opened ones with a duration of 0, and would teach the baseline that
+    # any long-lived flow is an outlier.
+    try:
+        with timed('baseline_stats'):
+            get_baseline_accumulator().update(delta.active)
+    except Exception:
+        logger.exception("[BASELINE] Failed to update streaming baseline stats")
+    return delta
+
+# Rows kept for a snapshot: changed flows, or every open flow when flows.persist is 'all'
+def _stored(delta: FlowDelta) -> list:
+    return delta.active if config.flows['persist'] == 'all' else delta.changed
+
+_last_stats_time = datetime.now()
+
+# Stage 3 (persistence): hands the rows, including final CLOSED records, to the
+# background SQLite writer and periodically persists the baseline statistics
+def persist_snapshot(delta: FlowDelta) -> FlowDelta:
+    global _last_stats_time
+    if config.enable_sqlite_logging:
+        try:
+            with timed('sqlite'):
+                submit_connections(_stored(delta) + delta.closed)
+        except Exception:
+            logger.exception("[SQLITE] Failed to queue connections for the database")
+
+    if (datetime.now() - _last_stats_time).total_seconds() >= config.baseline['persist_interval']:
+        try:
+            compute_and_store_baseline_stats()
+            _last_stats_time = datetime.now()
+            logger.info("[BASELINE] Baseline stats stored")
+        except Exception:
+            logger.exception("[BASELINE] Failed to store baseline stats")
+    return delta
+
+# Runs every stage for one snapshot on the calling thread
+def process_snapshot(delta: FlowDelta) -> FlowDelta:
+    return persist_snapshot(detect_snapshot(enrich_snapshot(delta)))
+
+# Buckets for the number of connections seen per scan
+SCAN_SIZE_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+
+# Copies cache, queue and scheduler state into gauges whenever metrics are read
+def register_metric_collectors(scheduler, flow_table, pipeline=None):
+    def collect():
+        for key, value in reputation_cache_stats().items():
+            registry.gauge(f'vi_intel_cache_{key}', 'In-memory intel cache statistics').set(value)
+        for key, value in writer_stats().items():
+            registry.gauge(f'vi_writer_{key}', 'Background SQLite writer statistics').set(value)
+        for key, value in dispatcher_stats().items():
+            registry.gauge(f'vi_notifier_{key}', 'Notification dispatcher statistics').set(value)
+        for key, value in get_suppression_store().stats().items():
+            registry.gauge(f'vi_suppression_{key}', 'Alert suppression store statistics').set(value)
+        for key, value in retention_stats().items():
+            registry.gauge(f'vi_retention_{key}', 'Rollup and retention job statistics').set(value)
+        for key, value in scheduler.stats().items():
+            registry.gauge(f'vi_scheduler_{key}', 'Scan scheduler state').set(value)
+        registry.gauge('vi_open_flows', 'Flows currently open').set(len(flow_table))
+        if pipeline is not None:
+            for stage, stats in pipeline.stats().items():
+                for key, value in stats.items():
+                    registry.gauge(f'vi_pipeline_{key}', 'Pipeline stage statistics', stage=stage).set(value)
+    registry.register_collector(collect)
+
+# Orderly shutdown, after a signal or an unhandled exception: lets snapshots already
+# queued in the pipeline finish every stage, then flushes what background threads
+# still hold. atexit hooks stay as a fallback; none of it runs on SIGKILL.
+def shutdown(scheduler, pipeline=None):
+    scheduler.stop()
+    if pipeline is not None:
+        if not pipeline.stop(timeout=30):
+            logger.warning("[DAEMON] Pipeline did not drain in time; exiting anyway")
+    # Commit the rows still queued for the connection writer
+    stop_writer()
+    # Keep reputation verdicts fetched since the last batch write, so they are not paid for twice
+    try:
+        flush_reputation_cache()
+    except Exception:
+        logger.exception("[INTEL] Failed to flush the reputation cache")
+    # Bring the aggregated rows of suppressed repeats up to date
+    try:
+        get_suppression_store().flush()
+    except Exception:
+        logger.exception("[ALERT] Failed to flush alert suppression state")
+    # Send notifications held in the coalescing window or by the rate limit as a final summary
+    stop_dispatcher()
+    logger.info("[DAEMON] Shutdown complete")
+
 # Main loop:
 # 1. Logs system boot time and active processes.
 # 2. Retrieves active network connections.
-# 3. Tracks connection durations and stores their start time.
-# 4. Queries IP reputation and applies ML predictions.
+# 3. Diffs them against the flow table for start times, durations and churn.
+# 4. Applies ML predictions to the snapshot and queries IP reputation.
 # 5. Detects anomalies and logs alerts.
 # 6. Saves results to SQLite and updates baselines.
-# 7. Sleeps and repeats.
+# 7. Waits for the scheduler's next tick and repeats.
+# Steps 4-6 run as pipeline stages on their own threads when pipeline.enabled is set.
 
 def main():
     # Set up log formatting and output file
     configure_logging()
     
     # Log critical configuration values
-    logging.info("[BOOT] Vi Configuration:")
-    logging.info(f"    Scan Interval: {config.scan_interval} seconds")
-    logging.info(f"    SQLite Logging: {'Enabled' if config.enable_sqlite_logging else 'Disabled'}")
-    logging.info(f"    Alert on New Process: {config.behavior.get('alert_new_process', False)}")
-    logging.info(f"    Alert on New Process-Port Pair: {config.behavior.get('alert_new_process_port', False)}")
+    logger.info("[BOOT] Vi Configuration:")
+    logger.info(f"    Scan Interval: {config.scan_interval} seconds")
+    if config.scheduler['adaptive']:
+        logger.info(f"    Adaptive Interval: {config.scheduler['min_interval']}-{config.scheduler['max_interval']} seconds")
+    logger.info(f"    SQLite Logging: {'Enabled' if config.enable_sqlite_logging else 'Disabled'}")
+    logger.info(f"    Alert on New Process: {config.behavior.get('alert_new_process', False)}")
+    logger.info(f"    Alert on New Process-Port Pair: {config.behavior.get('alert_new_process_port', False)}")
     
     # Log the system boot timestamp
     log_boot_time()
-    # Load previously seen PID-IP mappings
-    known_links = load_linkage()
+    known_ips = load_known_ips()
+    logger.info(f"[BOOT] Loaded {len(known_ips)} known IP(s) and {len(known_ips.networks)} network(s)")
     # Set up SQLite databases for alerts, behavior, and intel
     initialize_databases()
-    last_stats_time = datetime.now()
+    if config.enable_sqlite_logging:
+        writer = start_writer(**config.storage)
+        # Mirror committed rows into the columnar feature store
+        if config.features['enabled']:
+            writer.add_listener(get_feature_store().append_rows)
+        if config.retention['enabled']:
+            start_retention(
+                raw_days=config.retention['raw_days'],
+                rollup_days=config.retention['rollup_days'],
+                interval=config.retention['interval']
+            )
+    # Restore streaming baseline statistics
+    get_baseline_accumulator()
+    # Restore alert suppression keys, so known alerts stay quiet across restarts
+    get_suppression_store()
 
-    from collections import defaultdict
+    # Flows seen across scans, with their start times and last enrichment
+    flow_table = get_flow_table()
+    # Runs scans on a fixed cadence, adapting it to churn when enabled
+    scheduler = ScanScheduler(config.scan_interval, **config.scheduler)
+    # SIGTERM (launchd stop/restart) and SIGINT end the loop after the current scan
+    scheduler.stop_on_signals()
+    # Overlaps collection with enrichment, detection and persistence of earlier snapshots
+    pipeline = None
+    if config.pipeline['enabled']:
+        pipeline = Pipeline([
+            ('enrich', enrich_snapshot, config.pipeline['enrich_workers']),
+            ('detect', detect_snapshot, 1),
+            ('persist', persist_snapshot, 1)
+        ], queue_size=config.pipeline['queue_size']).start()
 
-    # Track connection start times in-memory for duration calculation
-    _start_times: dict[Tuple[int, str], Optional[datetime]] = defaultdict(lambda: None)
+    # Expose metrics over HTTP/Unix socket and as a periodic JSON dump
+    register_metric_collectors(scheduler, flow_table, pipeline)
+    if config.metrics['enabled']:
+        metrics.start(
+            port=config.metrics['port'],
+            socket_path=config.metrics['socket_path'],
+            dump_interval=config.metrics['dump_interval']
+        )
 
     try:
         # Main monitoring loop
-        while True:
-            logging.info('--- Snapshot ---')
+        while scheduler.wait():
+            logger.debug('--- Snapshot ---')
             # Record currently running processes
             log_active_processes()
             # Pull active network connections using lsof/psutil
-            connections = get_active_connections()
+            with timed('collect'):
+                connections = get_active_connections()
             snapshot_time = datetime.now()
 
-            # Assign timestamp and calculate connection duration
-            for conn in connections:
-                conn.timestamp = snapshot_time
-                key = (conn.pid, conn.remote_ip)
-                if key not in _start_times or _start_times[key] is None:
-                    _start_times[key] = conn.timestamp
-                start_time = _start_times.get(key)
-                if start_time is not None:
-                    conn.duration_seconds = (conn.timestamp - start_time).total_seconds()
-                else:
-                    conn.duration_seconds = 0.0
-
-            # Assess IP reputation and apply ML tagging
-            for conn_obj in connections:
-                try:
-                    rep = get_ip_reputation(conn_obj.remote_ip)
-                    conn_obj.reputation_score = rep['score']
-                    conn_obj.is_malicious = rep['is_malicious']
-                except Exception as e:
-                    logging.exception(f"[INTEL] Failed to retrieve reputation for IP {conn_obj.remote_ip}")
-                    conn_obj.reputation_score = 0.0
-                    conn_obj.is_malicious = False
-
-                # ML Predictions
-                try:
-                    memory_rss_mb = (conn_obj.memory_rss or 0) / (1024 * 1024)
-                    conn_obj.tag = predict_connection(
-                        conn_obj.cpu_percent or 0.0,
-                        memory_rss_mb,
-                        conn_obj.connection_count or 0,
-                        conn_obj.duration_seconds or 0.0,
-                        conn_obj.is_remote_ipv6 or 0
-                    )
-                    logging.debug(
-                        f"[ML] Tag={conn_obj.tag} | PID={conn_obj.pid}, CPU={conn_obj.cpu_percent}, "
-                        f"MEM_MB={memory_rss_mb:.2f}, ConnCount={conn_obj.connection_count}, "
-                        f"Duration={conn_obj.duration_seconds}, IPv6={conn_obj.is_remote_ipv6}"
-                    )
-                except Exception:
-                    logging.exception(f"[ML] Prediction failed for PID {conn_obj.pid}")
-                    conn_obj.tag = "error"
+            # Diff against the flow table: assigns timestamps and durations, and
+            # splits the scan into opened, drifted, unchanged and closed flows
+            with timed('flow_diff'):
+                delta = flow_table.update(connections, snapshot_time)
+            registry.counter('vi_scans_total', 'Scans run').inc()
+            registry.histogram('vi_scan_connections', 'Connections seen per scan',
+                               buckets=SCAN_SIZE_BUCKETS).observe(len(connections))
+            for event, flows in (('opened', delta.opened), ('drifted', delta.drifted), ('closed', delta.closed)):
+                registry.counter('vi_flows_total', 'Flows opened, drifted or closed', event=event).inc(len(flows))
+            logger.info(
+                f"[FLOWS] {len(delta.opened)} opened, {len(delta.drifted)} drifted, "
+                f"{len(delta.unchanged)} unchanged, {len(delta.closed)} closed"
+            )
 
-                # Alert and log if IP is flagged as malicious
-                try:
-                    if getattr(conn_obj, "is_malicious", False):
-                        severity = ANOMALY_SEVERITY['malicious_ip']
-                        logging.warning(f"Malicious IP detected: {conn_obj.remote_ip} (score={getattr(conn_obj, 'reputation_score', 0.0)})")
-                        key = ('malicious_ip', conn_obj.remote_ip)
-                        if key not in _ALERT_HISTORY:
-                            record_alert(conn_obj, 'malicious_ip', severity=severity)
-                            send_notification("Vi Alert", f"Malicious IP detected: {conn_obj.remote_ip} (score={getattr(conn_obj, 'reputation_score', 0.0)})", severity=severity)
-                            _ALERT_HISTORY[key] = datetime.now()
-                except Exception:
-                    logging.exception(f"[ALERT] Failed while handling malicious IP alert for {conn_obj.remote_ip}")
-
-            # Run behavioral anomaly checks
-            try:
-                anomalies = check_behavior(connections)
-                for co, anomaly in anomalies:
-                    if anomaly == 'new_process' and not config.behavior['alert_new_process']:
-                        continue
-                    if anomaly == 'new_process_port' and not config.behavior['alert_new_process_port']:
-                        continue
-                    severity = ANOMALY_SEVERITY.get(anomaly, 'medium')
-                    logging.warning(f"Behavioral anomaly [{anomaly}] detected: {co.process_name} (PID {co.pid}) → remote port {co.remote_port}")
-                    key = (anomaly, co.process_name, co.remote_port)
-                    if key not in _ALERT_HISTORY:
-                        record_alert(co, anomaly, severity=severity)
-                        send_notification("Vi Alert", f"Behavioral anomaly [{anomaly}] detected: {co.process_name} (PID {co.pid}) → remote port {co.remote_port}", severity=severity)
-                        _ALERT_HISTORY[key] = datetime.now()
-            except Exception:
-                logging.exception("[BEHAVIOR] Exception occurred while checking for behavioral anomalies")
-
-            # Persist snapshot to SQLite if logging is enabled
-            if config.enable_sqlite_logging:
-                try:
-                    insert_connections(connections)
-                except Exception:
-                    logging.exception("[SQLITE] Failed to insert connections into the database")
+            # Enrich, check and persist what changed
+            if pipeline is not None:
+                pipeline.submit(delta)
+                logger.debug(f"[PIPELINE] {pipeline.stats()}")
+            else:
+                process_snapshot(delta)
 
-            # Update known IPs and linkage for future comparisons
-            try:
-                update_baseline(connections)
-                tracker.track_connections(connections, known_links)
-            except Exception:
-                logging.exception("[BASELINE] Failed to update baseline or track connection linkage")
+            scheduler.finished(len(delta.opened), len(delta.closed), len(delta.active))
 
-            # Periodically recompute and store baseline stats every 5 minutes
-            if (datetime.now() - last_stats_time).total_seconds() >= 300:
-                try:
-                    from vi.connections.storage import compute_and_store_baseline_stats
-                    compute_and_store_baseline_stats()
-                    last_stats_time = datetime.now()
-                    logging.info("[BASELINE] Baseline stats recomputed and stored")
-                except Exception:
-                    logging.exception("[BASELINE] Failed to recompute or store baseline stats")
+        if scheduler.stopped_by is not None:
+            logger.info(f"[DAEMON] Received {signal.Signals(scheduler.stopped_by).name}; shutting down")
 
-            time.sleep(config.scan_interval)
-    
     except Exception:
-        logging.exception('[DAEMON] Unhandled exception—exiting for launchd to restart.')
+        logger.exception('[DAEMON] Unhandled exception—exiting for launchd to restart.')
         sys.exit(1)
+    finally:
+        shutdown(scheduler, pipeline)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,83 @@
+# Long-lived SQLite connections shared by Vi's storage modules.
+# Each thread gets its own connection per database file (sqlite3 connections must
+# not cross threads), opened once in WAL mode and reused for every operation.
+
+import sqlite3
+import threading
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Iterator, Union
+
+# Applied to every new connection. WAL lets readers and the writer proceed
+# concurrently, and with synchronous=NORMAL commits no longer fsync the database
+# file (only checkpoints do), which is still durable against application crashes.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-8000",  # KiB, i.e. 8 MB of page cache per connection
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",  # ms to wait on a lock held by another connection
+)
+
+# Prepared statements kept per connection; sqlite3 reuses them for identical SQL
+CACHED_STATEMENTS = 256
+
+_local = threading.local()
+
+def _state():
+    if not hasattr(_local, 'connections'):
+        _local.connections = {}
+        _local.depth = {}
+    return _local
+
+def get_connection(path: Union[str, Path]) -> sqlite3.Connection:
+    """Returns this thread's connection to the database at path, opening it on first use."""
+    key = str(path)
+    state = _state()
+    conn = state.connections.get(key)
+    if conn is None:
+        Path(key).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(key, cached_statements=CACHED_STATEMENTS)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        state.connections[key] = conn
+        state.depth[key] = 0
+    return conn
+
+@contextmanager
+def transaction(*paths: Union[str, Path]) -> Iterator[sqlite3.Connection]:
+    """
+    Commits everything written to the given databases inside the block at once,
+    or rolls it all back on error. Nested blocks join the outermost transaction,
+    so a whole scan can be wrapped while individual writers still use transaction().
+    Yields the connection for the first path.
+    """
+    with ExitStack() as stack:
+        conns = [stack.enter_context(_single_transaction(path)) for path in paths]
+        yield conns[0]
+
+@contextmanager
+def _single_transaction(path: Union[str, Path]) -> Iterator[sqlite3.Connection]:
+    key = str(path)
+    conn = get_connection(key)
+    state = _state()
+    state.depth[key] += 1
+    try:
+        yield conn
+    except BaseException:
+        state.depth[key] -= 1
+        if state.depth[key] == 0:
+            conn.rollback()
+        raise
+    else:
+        state.depth[key] -= 1
+        if state.depth[key] == 0:
+            conn.commit()
+
+def close_connections():
+    """Closes the calling thread's connections, e.g. when a worker thread exits."""
+    state = _state()
+    for conn in state.connections.values():
+        conn.close()
+    state.connections.clear()
+    state.depth.clear()
@@ -0,0 +1,215 @@
+# Streaming export of connection history as training data. Rows are read partition
+# by partition in fixed-size chunks and written as they arrive, to CSV, to .npz
+# shards (one per chunk) or to Parquet when pyarrow is installed, so memory use is
+# bounded by the chunk size rather than the database. Progress is kept per output
+# as a high-water mark (the last exported rowid of each daily partition, plus the
+# newest timestamp for reference) and saved after every chunk, so repeated or
+# interrupted runs export only rows not written yet.
+
+import csv
+import importlib.util
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+from vi.connections.storage import DB_PATH, init_db, list_partitions
+from vi.db import get_connection
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path.home() / '.vi' / 'data'
+STATE_PATH = DATA_DIR / 'export_state.json'
+FORMATS = ('csv', 'npz', 'parquet')
+
+# Exported columns, in order; memory_rss is converted to memory_rss_mb
+SOURCE_COLUMNS = (
+    'pid', 'user', 'process_name',
+    'cpu_percent', 'memory_rss', 'connection_count', 'duration_seconds', 'is_remote_ipv6',
+    'local_port', 'remote_ip', 'remote_port',
+    'status', 'tag', 'anomaly_score', 'timestamp'
+)
+COLUMNS = tuple('memory_rss_mb' if c == 'memory_rss' else c for c in SOURCE_COLUMNS)
+MEMORY_INDEX = COLUMNS.index('memory_rss_mb')
+FLOAT_COLUMNS = {'cpu_percent', 'memory_rss_mb', 'duration_seconds', 'anomaly_score'}
+# Integer columns use -1 for missing values in npz/Parquet output
+INT_COLUMNS = {'pid', 'connection_count', 'is_remote_ipv6', 'local_port', 'remote_port'}
+
+BYTES_PER_MB = 1024 * 1024
+
+def default_format() -> str:
+    """Parquet when pyarrow is installed, otherwise .npz shards."""
+    return 'parquet' if importlib.util.find_spec('pyarrow') is not None else 'npz'
+
+def default_output(fmt: str) -> Path:
+    # The CSV keeps its historical single-file location; binary formats are written as shards
+    return DATA_DIR / ('training_data.csv' if fmt == 'csv' else 'training_data')
+
+def read_chunks(marks: dict, chunk_size: int) -> Iterator[tuple[str, int, list[tuple]]]:
+    """
+    Yields (partition, last rowid, rows) for rows past each partition's mark, in
+    rowid order. Rowids only grow within a partition, so the marks are exact.
+    """
+    db_conn = get_connection(DB_PATH)
+    columns = ', '.join(SOURCE_COLUMNS)
+    for table in list_partitions(db_conn):
+        cursor = db_conn.execute(
+            f'SELECT rowid, {columns} FROM {table} WHERE rowid > ? ORDER BY rowid', (marks.get(table, 0),)
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield table, rows[-1][0], [row[1:] for row in rows]
+
+def to_columns(rows: list[tuple]) -> dict[str, np.ndarray]:
+    """Transposes a chunk into typed column arrays, converting memory to MB in one step."""
+    arrays = {}
+    for name, values in zip(COLUMNS, zip(*rows)):
+        if name == 'memory_rss_mb':
+            arrays[name] = np.round(np.array(values, dtype=float) / BYTES_PER_MB, 2)
+        elif name in FLOAT_COLUMNS:
+            arrays[name] = np.array(values, dtype=float)
+        elif name in INT_COLUMNS:
+            column = np.array(values, dtype=object)
+            column[column == None] = -1  # noqa: E711 (elementwise comparison)
+            arrays[name] = column.astype(np.int64)
+        else:
+            column = np.array(values, dtype=object)
+            column[column == None] = ''  # noqa: E711
+            arrays[name] = column.astype(str)
+    return arrays
+
+class CsvSink:
+    def __init__(self, path: Path, append: bool):
+        exists = append and path.exists() and path.stat().st_size > 0
+        self.path = path
+        self.file = open(path, 'a' if exists else 'w', newline='')
+        self.writer = csv.writer(self.file)
+        if not exists:
+            self.writer.writerow(COLUMNS)
+
+    def write(self, rows: list[tuple]):
+        columns = list(zip(*rows))
+        memory = np.round(np.array(columns[MEMORY_INDEX], dtype=float) / BYTES_PER_MB, 2)
+        # Missing values stay empty, as csv writes None
+        columns[MEMORY_INDEX] = np.where(np.isnan(memory), '', memory.astype(str))
+        self.writer.writerows(zip(*columns))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class NpzSink:
+    """One compressed .npz shard per chunk: <output>-<run>-<n>.npz"""
+
+    def __init__(self, path: Path, append: bool):
+        self.prefix = f"{path}-{datetime.now().strftime('%Y%m%dT%H%M%S')}"
+        self.shards = 0
+
+    def write(self, rows: list[tuple]):
+        shard = Path(f"{self.prefix}-{self.shards:04d}.npz")
+        tmp_path = shard.with_suffix('.tmp.npz')
+        np.savez_compressed(tmp_path, **to_columns(rows))
+        os.replace(tmp_path, shard)
+        self.shards += 1
+
+    def close(self):
+        pass
+
+class ParquetSink:
+    """One Parquet file per run, one row group per chunk: <output>-<run>.parquet"""
+
+    def __init__(self, path: Path, append: bool):
+        # Optional dependency, only needed for this format
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.path = Path(f"{path}-{datetime.now().strftime('%Y%m%dT%H%M%S')}.parquet")
+        schema = pa.schema([
+            (name, pa.float64() if name in FLOAT_COLUMNS else pa.int64() if name in INT_COLUMNS else pa.string())
+            for name in COLUMNS
+        ])
+        self.writer = pq.ParquetWriter(self.path, schema)
+
+    def write(self, rows: list[tuple]):
+        columns = to_columns(rows)
+        self.writer.write_table(self.pa.table({name: columns[name] for name in COLUMNS}))
+
+    def close(self):
+        self.writer.close()
+
+SINKS = {'csv': CsvSink, 'npz': NpzSink, 'parquet': ParquetSink}
+
+def load_state(path: Path = STATE_PATH) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"[EXPORT] Could not read {path} ({e}); exporting from the start")
+        return {}
+
+def save_state(state: dict, path: Path = STATE_PATH):
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def export(fmt: Optional[str] = None, output: Optional[Path] = None, chunk_size: int = 50000,
+           full: bool = False, state_path: Path = STATE_PATH) -> dict:
+    """
+    Exports rows added since the previous export to the same output. full=True
+    ignores the high-water mark and starts over (a CSV is rewritten). Returns the
+    number of rows and chunks written and the new high-water-mark timestamp.
+    """
+    fmt = fmt or default_format()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    if fmt == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+        raise ValueError("Parquet export needs pyarrow (pip install pyarrow); use csv or npz instead")
+    output = Path(output or default_output(fmt)).expanduser()
+    output.parent.mkdir(parents=True, exist_ok=True)
+    init_db()
+
+    state = load_state(state_path)
+    # npz and Parquet share a default prefix, so marks are kept per format and output
+    key = f"{fmt}:{output}"
+    mark = {} if full else state.get(key, {})
+    partitions = dict(mark.get('partitions', {}))
+    # Marks of partitions dropped by retention are no longer needed
+    live = set(list_partitions(get_connection(DB_PATH)))
+    partitions = {table: rowid for table, rowid in partitions.items() if table in live}
+
+    sink = None
+    rows_written = chunks = 0
+    newest = mark.get('timestamp')
+    try:
+        for table, last_rowid, rows in read_chunks(partitions, chunk_size):
+            if sink is None:
+                sink = SINKS[fmt](output, append=bool(mark))
+            sink.write(rows)
+            rows_written += len(rows)
+            chunks += 1
+            partitions[table] = last_rowid
+            chunk_newest = max((r[-1] for r in rows if r[-1]), default=None)
+            newest = max(filter(None, (newest, chunk_newest)), default=None)
+            # Save progress after every chunk, so an interrupted export resumes here
+            state[key] = {'partitions': partitions, 'timestamp': newest,
+                          'exported_at': datetime.now().isoformat(timespec='seconds')}
+            save_state(state, state_path)
+    finally:
+        if sink is not None:
+            sink.close()
+    if not rows_written and key in state:
+        # Still record the pruned partition marks
+        state[key]['partitions'] = partitions
+        save_state(state, state_path)
+    logger.info(f"[EXPORT] Wrote {rows_written} row(s) in {chunks} chunk(s) to {output} ({fmt})")
+    return {'rows': rows_written, 'chunks': chunks, 'timestamp': newest, 'output': str(output)}
@@ -0,0 +1,319 @@
+# Columnar store of numeric connection features for bulk jobs (baseline stats,
+# training, offline rescoring). The connection writer appends every committed batch
+# to one raw little-endian file per column, with process names and remote IPs
+# interned to integer ids, so readers open the columns as NumPy memmaps and compute
+# over them without copying or going through SQLite.
+#
+# Layout under features.path (default ~/.vi/data/features):
+#   manifest.json              segments with their row count and first/last timestamp
+#   segments/<n>/<column>.bin  one file per column of FEATURE_COLUMNS
+#   process_names.jsonl        interned strings; the line number is the id
+#   remote_ips.jsonl
+#
+# Rows within a segment are kept in timestamp order (a batch older than the open
+# segment starts a new one), so the manifest narrows a time range to segments and a
+# binary search of the timestamp column narrows it to row offsets. Segments rotate
+# after segment_rows rows and are deleted whole once older than keep_days. The
+# manifest is replaced atomically after the column files are written, and readers
+# only map the rows it lists.
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+from vi.config import config
+from vi.connections.storage import CONNECTION_COLUMNS
+from vi.query import parse_time
+from vi.stats import RunningStats
+
+logger = logging.getLogger(__name__)
+
+# Column name -> dtype. Missing values are NaN in float columns and -1 in integer ones.
+FEATURE_COLUMNS = {
+    'timestamp': np.dtype('<f8'),  # Seconds since the epoch
+    'process_id': np.dtype('<i4'),  # Line of process_names.jsonl
+    'ip_id': np.dtype('<i4'),  # Line of remote_ips.jsonl
+    'cpu_percent': np.dtype('<f4'),
+    'memory_rss': np.dtype('<f8'),
+    'connection_count': np.dtype('<i4'),
+    'duration_seconds': np.dtype('<f4'),
+    'is_remote_ipv6': np.dtype('i1'),
+    'anomaly_score': np.dtype('<f4')
+}
+# Columns copied from connection rows as they are
+_ROW_COLUMNS = ('cpu_percent', 'memory_rss', 'connection_count', 'duration_seconds', 'is_remote_ipv6', 'anomaly_score')
+
+STRING_TABLES = {'process_id': 'process_names.jsonl', 'ip_id': 'remote_ips.jsonl'}
+
+def to_epoch(value) -> float:
+    """Converts a stored timestamp (datetime or ISO string) to seconds since the epoch; NaN if unusable."""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return float('nan')
+
+def _column(values, dtype: np.dtype) -> np.ndarray:
+    # None becomes NaN (floats) or -1 (integers)
+    column = np.array(values, dtype=object)
+    column[column == None] = np.nan if dtype.kind == 'f' else -1  # noqa: E711 (elementwise comparison)
+    return column.astype(dtype)
+
+class Segment:
+    """One segment as listed in the manifest: a contiguous, time-ordered run of rows."""
+
+    def __init__(self, root: Path, name: str, rows: int, first: float, last: float):
+        self.path = root / 'segments' / name
+        self.name = name
+        self.rows = rows
+        self.first = first
+        self.last = last
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only memmap of a column, limited to the rows in the manifest."""
+        dtype = FEATURE_COLUMNS[name]
+        if self.rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self.path / f'{name}.bin', dtype=dtype, mode='r', shape=(self.rows,))
+
+    def bounds(self, since: Optional[float], until: Optional[float]) -> tuple[int, int]:
+        """Row offsets [start, stop) of timestamps in [since, until), by binary search."""
+        timestamps = self.column('timestamp')
+        start = 0 if since is None or since <= self.first else int(np.searchsorted(timestamps, since, 'left'))
+        stop = self.rows if until is None or until > self.last else int(np.searchsorted(timestamps, until, 'left'))
+        return start, stop
+
+    def entry(self) -> dict:
+        return {'name': self.name, 'rows': self.rows, 'first': self.first, 'last': self.last}
+
+class FeatureStore:
+    def __init__(self, path: Path, segment_rows: int = 1_000_000, keep_days: int = 365):
+        self.path = Path(path).expanduser()
+        self.segment_rows = segment_rows
+        self.keep_days = keep_days
+        self._lock = threading.Lock()
+        # Writer state, loaded on the first append
+        self._segments: Optional[list[Segment]] = None
+        self._strings: dict[str, dict[str, int]] = {}
+        self._last_timestamp = (object(), float('nan'))
+
+    # --- Reading -------------------------------------------------------------
+
+    def segments(self, since=None, until=None) -> list[Segment]:
+        """Segments overlapping [since, until), as of the last manifest written."""
+        since, until = self._epoch(since), self._epoch(until)
+        return [
+            s for s in self._load_manifest()
+            if s.rows and (since is None or s.last >= since) and (until is None or s.first < until)
+        ]
+
+    def __len__(self) -> int:
+        return sum(s.rows for s in self._load_manifest())
+
+    def columns(self, names=None, since=None, until=None) -> Iterator[dict[str, np.ndarray]]:
+        """
+        Yields, per segment, {column: memmap view} for rows with timestamps in
+        [since, until). The views share the files' pages; nothing is copied.
+        since/until take the same forms as vi.query (datetimes, ISO strings, '7d').
+        """
+        names = tuple(names or FEATURE_COLUMNS)
+        since_ts, until_ts = self._epoch(since), self._epoch(until)
+        for segment in self.segments(since_ts, until_ts):
+            start, stop = segment.bounds(since_ts, until_ts)
+            if stop > start:
+                yield {name: segment.column(name)[start:stop] for name in names}
+
+    def stats(self, name: str, since=None, until=None, process_name: Optional[str] = None) -> tuple[int, float, float]:
+        """
+        Returns (count, mean, m2) of a column over a time range, optionally for one
+        process, skipping missing values. m2 is the sum of squared deviations, as
+        kept by vi.stats.RunningStats. Computed segment by segment and merged.
+        """
+        process_id = None
+        if process_name is not None:
+            process_id = self.string_ids('process_id').get(process_name)
+            if process_id is None:
+                return 0, 0.0, 0.0
+        total = RunningStats()
+        for view in self.columns((name, 'process_id'), since, until):
+            values = view[name]
+            if process_id is not None:
+                values = values[view['process_id'] == process_id]
+            values = values[~np.isnan(values)] if values.dtype.kind == 'f' else values[values != -1]
+            if len(values):
+                mean = float(values.mean(dtype=np.float64))
+                total.merge(len(values), mean, float(np.square(values - mean, dtype=np.float64).sum()))
+        return total.count, total.mean, total.m2
+
+    def strings(self, column: str) -> list[str]:
+        """Interned strings of 'process_id' or 'ip_id'; the list index is the id."""
+        path = self.path / STRING_TABLES[column]
+        if not path.exists():
+            return []
+        with open(path, encoding='utf-8') as f:
+            # A line without its newline is an append still in progress
+            return [json.loads(line) for line in f if line.endswith('\n')]
+
+    def string_ids(self, column: str) -> dict[str, int]:
+        return {value: i for i, value in enumerate(self.strings(column))}
+
+    # --- Writing -------------------------------------------------------------
+
+    def append_rows(self, rows: list[tuple]):
+        """Appends connection rows (in CONNECTION_COLUMNS order, as the writer commits them)."""
+        if not rows:
+            return
+        with self._lock:
+            self._open()
+            by_name = dict(zip(CONNECTION_COLUMNS, zip(*rows)))
+            columns = {name: _column(by_name[name], FEATURE_COLUMNS[name]) for name in _ROW_COLUMNS}
+            timestamps = np.array([self._to_epoch(t) for t in by_name['timestamp']], dtype=np.float64)
+            # Rows without a usable timestamp are filed under the time they arrive
+            columns['timestamp'] = np.where(np.isnan(timestamps), time.time(), timestamps)
+            columns['process_id'] = self._intern('process_id', by_name['process_name'])
+            columns['ip_id'] = self._intern('ip_id', by_name['remote_ip'])
+            self._append(columns)
+
+    def append_columns(self, columns: dict[str, np.ndarray]):
+        """Appends whole columns at once, e.g. when backfilling; ids must already be interned."""
+        with self._lock:
+            self._open()
+            self._append({name: np.asarray(columns[name], dtype=dtype) for name, dtype in FEATURE_COLUMNS.items()})
+
+    def intern(self, column: str, values) -> np.ndarray:
+        """Ids of values in the 'process_id' or 'ip_id' string table, adding new ones."""
+        with self._lock:
+            self._open()
+            return self._intern(column, values)
+
+    def _to_epoch(self, value) -> float:
+        # Rows of one snapshot share a timestamp, so only a change of timestamp is parsed
+        if value != self._last_timestamp[0]:
+            self._last_timestamp = (value, to_epoch(value))
+        return self._last_timestamp[1]
+
+    def _intern(self, column: str, values) -> np.ndarray:
+        ids = self._strings[column]
+        new = []
+        result = np.empty(len(values), dtype=FEATURE_COLUMNS[column])
+        for i, value in enumerate(values):
+            if value is None:
+                result[i] = -1
+                continue
+            id_ = ids.get(value)
+            if id_ is None:
+                id_ = ids[value] = len(ids)
+                new.append(value)
+            result[i] = id_
+        if new:
+            # Written before any row refers to them
+            with open(self.path / STRING_TABLES[column], 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(value) + '\n' for value in new)
+        return result
+
+    def _append(self, columns: dict[str, np.ndarray]):
+        timestamps = columns['timestamp']
+        if len(timestamps) == 0:
+            return
+        # Keep each segment in time order
+        if len(timestamps) > 1 and (np.diff(timestamps) < 0).any():
+            order = np.argsort(timestamps, kind='stable')
+            columns = {name: values[order] for name, values in columns.items()}
+            timestamps = columns['timestamp']
+        offset = 0
+        while offset < len(timestamps):
+            segment = self._segments[-1] if self._segments else None
+            if (segment is None or segment.rows >= self.segment_rows
+                    or (segment.rows and timestamps[offset] < segment.last)):
+                segment = self._new_segment()
+            take = min(self.segment_rows - segment.rows, len(timestamps) - offset)
+            for name, values in columns.items():
+                with open(segment.path / f'{name}.bin', 'ab') as f:
+                    f.write(values[offset:offset + take].tobytes())
+            if segment.rows == 0:
+                segment.first = float(timestamps[offset])
+            segment.rows += take
+            segment.last = float(timestamps[offset + take - 1])
+            offset += take
+        self._save_manifest()
+
+    def _new_segment(self) -> Segment:
+        self._prune()
+        number = int(self._segments[-1].name) + 1 if self._segments else 1
+        segment = Segment(self.path, f'{number:06d}', 0, float('nan'), float('nan'))
+        segment.path.mkdir(parents=True, exist_ok=True)
+        self._segments.append(segment)
+        return segment
+
+    def _prune(self):
+        # Whole segments past keep_days are deleted when a new one starts
+        cutoff = time.time() - self.keep_days * 86400
+        expired = [s for s in self._segments if s.rows and s.last < cutoff]
+        if not expired:
+            return
+        self._segments = [s for s in self._segments if s not in expired]
+        self._save_manifest()
+        for segment in expired:
+            shutil.rmtree(segment.path, ignore_errors=True)
+        logger.info(f"[FEATURES] Deleted {len(expired)} segment(s) older than {self.keep_days} day(s)")
+
+    def _open(self):
+        if self._segments is not None:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._segments = self._load_manifest()
+        # Drop bytes written after the last manifest, e.g. by an interrupted append
+        for segment in self._segments[-1:]:
+            for name, dtype in FEATURE_COLUMNS.items():
+                path = segment.path / f'{name}.bin'
+                if path.exists() and path.stat().st_size != segment.rows * dtype.itemsize:
+                    os.truncate(path, segment.rows * dtype.itemsize)
+        for column in STRING_TABLES:
+            path = self.path / STRING_TABLES[column]
+            strings = self.strings(column)
+            if path.exists():
+                # Likewise drop a partial last line
+                os.truncate(path, sum(len(json.dumps(s).encode('utf-8')) + 1 for s in strings))
+            self._strings[column] = {value: i for i, value in enumerate(strings)}
+
+    def _load_manifest(self) -> list[Segment]:
+        try:
+            with open(self.path / 'manifest.json') as f:
+                entries = json.load(f)['segments']
+        except FileNotFoundError:
+            return []
+        return [Segment(self.path, e['name'], e['rows'], e['first'], e['last']) for e in entries]
+
+    def _save_manifest(self):
+        tmp_path = self.path / 'manifest.json.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'segments': [s.entry() for s in self._segments if s.rows]}, f)
+        os.replace(tmp_path, self.path / 'manifest.json')
+
+    @staticmethod
+    def _epoch(value) -> Optional[float]:
+        if value is None or isinstance(value, (int, float)):
+            return value
+        return to_epoch(parse_time(value))
+
+_store: Optional[FeatureStore] = None
+
+def get_feature_store() -> FeatureStore:
+    """Returns the process-wide store configured under [features]."""
+    global _store
+    if _store is None:
+        _store = FeatureStore(
+            config.features['path'],
+            segment_rows=config.features['segment_rows'],
+            keep_days=config.features['keep_days']
+        )
+    return _store
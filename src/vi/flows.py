@@ -0,0 +1,163 @@
+# Table of flows (connections keyed by pid and 5-tuple) that persists across scans.
+# Each scan is diffed against the table so only flows that opened, or whose features
+# drifted since they were last enriched, go through intel/ML/behavior/baseline work.
+# Still-open flows carry their enrichment forward; closed flows yield a final record.
+# Enrichment is copied over by FlowDelta.inherit_enrichment() rather than during the
+# diff, so a scan can be diffed while the previous one is still being enriched.
+
+import copy
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from vi.config import config
+
+FlowKey = tuple[int, str, str, int, str, int]
+
+# Attributes set by enrichment that a still-open flow inherits from its last scan
+ENRICHED_ATTRS = ('tag', 'reputation_score', 'is_malicious', 'anomaly_score')
+
+# Features compared against their values at the last enrichment to detect drift;
+# duration is left out since it grows every scan
+DRIFT_FEATURES = ('cpu_percent', 'memory_rss', 'connection_count')
+
+def flow_key(conn) -> FlowKey:
+    return (conn.pid, conn.protocol, conn.local_ip, conn.local_port, conn.remote_ip, conn.remote_port)
+
+# Plain tuples rather than arrays: the drift check runs once per open flow per scan,
+# where NumPy's per-call overhead on three values outweighs the arithmetic
+def _drift_vector(conn) -> tuple:
+    return tuple(getattr(conn, f) or 0 for f in DRIFT_FEATURES)
+
+class Flow:
+    __slots__ = ('key', 'first_seen', 'last_seen', 'conn', 'enriched_conn', 'enriched_at', 'enriched_features')
+
+    def __init__(self, key: FlowKey, conn, first_seen: datetime):
+        self.key = key
+        self.first_seen = first_seen
+        self.last_seen = first_seen
+        self.conn = conn
+        # The observation that was (or is being) enriched, and its features at the time
+        self.enriched_conn = None
+        self.enriched_at: Optional[datetime] = None
+        self.enriched_features: Optional[tuple] = None
+
+    def mark_enriched(self, conn, now: datetime):
+        self.enriched_conn = conn
+        self.enriched_at = now
+        self.enriched_features = _drift_vector(conn)
+
+@dataclass
+class FlowDelta:
+    """Result of diffing one scan against the flow table."""
+    opened: list = field(default_factory=list)
+    drifted: list = field(default_factory=list)
+    unchanged: list = field(default_factory=list)
+    closed: list = field(default_factory=list)
+    # (connection, enriched connection it inherits from) for unchanged and closed flows
+    sources: list = field(default_factory=list)
+
+    def inherit_enrichment(self):
+        """Copies tags, reputation and scores from each flow's last enriched observation."""
+        for conn, source in self.sources:
+            for attr in ENRICHED_ATTRS:
+                if hasattr(source, attr):
+                    setattr(conn, attr, getattr(source, attr))
+
+    @property
+    def changed(self) -> list:
+        """Connections that need enrichment: opened or drifted flows."""
+        return self.opened + self.drifted
+
+    @property
+    def active(self) -> list:
+        return self.opened + self.drifted + self.unchanged
+
+class FlowTable:
+    def __init__(self, drift_threshold: float = 0.5, refresh_interval: float = 3600):
+        self.drift_threshold = drift_threshold
+        self.refresh_interval = refresh_interval
+        self._flows: dict[FlowKey, Flow] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._flows)
+
+    def __contains__(self, key):
+        return key in self._flows
+
+    def get(self, key: FlowKey) -> Optional[Flow]:
+        return self._flows.get(key)
+
+    def update(self, connections, now: Optional[datetime] = None) -> FlowDelta:
+        """
+        Diffs a scan against the table: sets each connection's timestamp and true
+        duration, and removes flows that are gone, returning a CLOSED record for each.
+        Opened and drifted connections are recorded as enriched; the caller enriches
+        them and then calls inherit_enrichment() for the rest.
+        """
+        now = now or datetime.now()
+        delta = FlowDelta()
+        seen: set[FlowKey] = set()
+        with self._lock:
+            for conn in connections:
+                key = flow_key(conn)
+                if key in seen:
+                    continue
+                seen.add(key)
+                conn.timestamp = now
+                flow = self._flows.get(key)
+                if flow is None:
+                    flow = self._flows[key] = Flow(key, conn, now)
+                    flow.mark_enriched(conn, now)
+                    conn.duration_seconds = 0.0
+                    delta.opened.append(conn)
+                    continue
+
+                flow.conn, flow.last_seen = conn, now
+                conn.duration_seconds = (now - flow.first_seen).total_seconds()
+                if self._needs_refresh(flow, conn, now):
+                    flow.mark_enriched(conn, now)
+                    delta.drifted.append(conn)
+                else:
+                    delta.unchanged.append(conn)
+                    delta.sources.append((conn, flow.enriched_conn))
+
+            for key in [k for k in self._flows if k not in seen]:
+                flow = self._flows.pop(key)
+                record = self._closed_record(flow, now)
+                delta.closed.append(record)
+                delta.sources.append((record, flow.enriched_conn))
+
+        return delta
+
+    def _needs_refresh(self, flow: Flow, conn, now: datetime) -> bool:
+        if flow.enriched_features is None or flow.enriched_at is None:
+            return True
+        if (now - flow.enriched_at).total_seconds() >= self.refresh_interval:
+            return True
+        threshold = self.drift_threshold
+        return any(abs(new - old) > threshold * max(abs(old), 1.0)
+                   for new, old in zip(_drift_vector(conn), flow.enriched_features))
+
+    # The final record of a flow: its last observation, with the time it was last seen open
+    @staticmethod
+    def _closed_record(flow: Flow, now: datetime):
+        record = copy.copy(flow.conn)
+        record.status = 'CLOSED'
+        record.timestamp = now
+        record.duration_seconds = (flow.last_seen - flow.first_seen).total_seconds()
+        return record
+
+_table: Optional[FlowTable] = None
+
+# Returns the process-wide flow table
+def get_flow_table() -> FlowTable:
+    global _table
+    if _table is None:
+        _table = FlowTable(
+            drift_threshold=config.flows['drift_threshold'],
+            refresh_interval=config.flows['refresh_interval']
+        )
+    return _table
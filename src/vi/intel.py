@@ -1,75 +1,270 @@
-import sqlite3, time, requests
+import atexit, time, requests, threading
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
 from pathlib import Path
+from typing import Iterable, Optional
+from requests.adapters import HTTPAdapter
+from vi.cache import LRUCache
 from vi.config import config
+from vi.db import get_connection, transaction
 import logging
 
+logger = logging.getLogger(__name__)
+
 DB_PATH = Path.home() / '.vi' / 'logs' / 'intel_cache.sqlite'
 
+# Longest we will honour a Retry-After / rate-limit reset before trying again
+MAX_BACKOFF_SECONDS = 3600
+
+# Shared HTTP session and worker pool, created on first lookup
+_session: Optional[requests.Session] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# IPs whose lookup failed recently: ip -> time after which we may retry
+_negative_cache: dict[str, float] = {}
+# Set when AbuseIPDB tells us to back off; no requests are made before this time
+_backoff_until = 0.0
+_state_lock = threading.Lock()
+
+# In-memory tier in front of the ip_reputation table: ip -> score
+_reputation_cache = LRUCache(max_size=config.intel['memory_cache_size'], ttl=config.intel['cache_ttl'])
+_sqlite_hits = 0
+# Fetched verdicts not yet written to SQLite: ip -> (ip, last_checked, score)
+_pending_writes: dict[str, tuple[str, float, int]] = {}
+_last_write = time.monotonic()
+_atexit_registered = False
+
 def init_intel_db():
     """Create the cache table for IP reputations."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS ip_reputation (
-        ip TEXT PRIMARY KEY,
-        last_checked REAL,
-        score INTEGER,
-        is_malicious INTEGER
-    )
-    """)
-    conn.commit()
-    conn.close()
-
-def get_ip_reputation(ip: str) -> dict:
-    """Returns {'score': int, 'is_malicious': bool}, using cache or AbuseIPDB."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    now = time.time()
-    # Check cache (recompute malicious against current threshold)
-    c.execute("SELECT last_checked, score FROM ip_reputation WHERE ip=?", (ip,))
-    row = c.fetchone()
-    if row and (now - row[0]) < config.intel['cache_ttl']:
-        raw_score = row[1]
-        is_m = raw_score >= config.intel['threshold_score']
-        conn.close()
-        return {'score': raw_score, 'is_malicious': is_m}
-
-    # Query AbuseIPDB
-    logging.info(f"Querying AbuseIPDB for {ip}")
-    try:
-        headers = {
-            'Key': config.intel['abuseipdb_api_key'],
-            'Accept': 'application/json'
-        }
-        resp = requests.get(
-            'https://api.abuseipdb.com/api/v2/check',
-            params={'ipAddress': ip},
-            headers=headers
-        )
-        resp.raise_for_status()
-        data = resp.json()['data']
-        score = data.get('abuseConfidenceScore', 0)
-        is_mal = score >= config.intel['threshold_score']
-        # Debug: log threshold comparison
-        logging.info(
-            f"AbuseIPDB: IP={ip}, score={score}, threshold={config.intel['threshold_score']}, is_malicious={is_mal}"
+    global _atexit_registered
+    with transaction(DB_PATH) as conn:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS ip_reputation (
+            ip TEXT PRIMARY KEY,
+            last_checked REAL,
+            score INTEGER,
+            is_malicious INTEGER
         )
-    except Exception as e:
-        logging.error(f"AbuseIPDB lookup failed for {ip}: {e}")
-        # Fallback to safe defaults on error
-        score = 0
-        # Determine malicious flag based on configured threshold even on error
-        is_mal = score >= config.intel['threshold_score']
-        # Debug: log threshold comparison on error path
-        logging.info(
-            f"AbuseIPDB (error path): IP={ip}, score={score}, threshold={config.intel['threshold_score']}, is_malicious={is_mal}"
+        """)
+    if not _atexit_registered:
+        # Verdicts still batched at shutdown were paid for; keep them
+        atexit.register(flush_reputation_cache)
+        _atexit_registered = True
+    warm_reputation_cache()
+
+def _get_pool() -> tuple[requests.Session, ThreadPoolExecutor]:
+    global _session, _executor
+    with _pool_lock:
+        if _session is None:
+            workers = config.intel['max_workers']
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+            _session.headers.update({
+                'Key': config.intel['abuseipdb_api_key'] or '',
+                'Accept': 'application/json'
+            })
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='vi-intel')
+        return _session, _executor
+
+def _retry_after_seconds(resp: requests.Response) -> Optional[float]:
+    """Reads Retry-After (seconds or HTTP date) or X-RateLimit-Reset (epoch seconds)."""
+    retry_after = resp.headers.get('Retry-After')
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            try:
+                return parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                pass
+    reset = resp.headers.get('X-RateLimit-Reset')
+    if reset:
+        try:
+            return float(reset) - time.time()
+        except ValueError:
+            pass
+    return None
+
+def _back_off(seconds: float):
+    global _backoff_until
+    seconds = min(max(seconds, 0.0), MAX_BACKOFF_SECONDS)
+    with _state_lock:
+        until = time.monotonic() + seconds
+        if until <= _backoff_until:
+            return
+        _backoff_until = until
+    logger.warning(f"[INTEL] AbuseIPDB rate limit reached; pausing lookups for {seconds:.0f}s")
+
+def _lookup_remote(ip: str) -> Optional[int]:
+    """Queries AbuseIPDB for one IP. Returns the score, or None if the lookup failed."""
+    session, _ = _get_pool()
+    retries = config.intel['max_retries']
+    for attempt in range(retries + 1):
+        if time.monotonic() < _backoff_until:
+            return None
+        try:
+            resp = session.get(
+                config.intel['api_url'],
+                # lsof brackets IPv6 addresses
+                params={'ipAddress': ip.strip('[]')},
+                timeout=config.intel['timeout']
+            )
+            if resp.status_code == 429:
+                _back_off(_retry_after_seconds(resp) or 60.0)
+                return None
+            if resp.status_code >= 500:
+                raise requests.HTTPError(f"{resp.status_code} Server Error", response=resp)
+            resp.raise_for_status()
+            # Stop before the quota runs out rather than waiting for a 429
+            if resp.headers.get('X-RateLimit-Remaining') == '0':
+                _back_off(_retry_after_seconds(resp) or 60.0)
+            return resp.json()['data'].get('abuseConfidenceScore', 0)
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            status = getattr(e.response, 'status_code', None) if isinstance(e, requests.HTTPError) else None
+            # Client errors other than rate limiting will not succeed on retry
+            if status is not None and status < 500:
+                logger.error(f"AbuseIPDB lookup failed for {ip}: {e}")
+                return None
+            if attempt < retries:
+                time.sleep(config.intel['backoff_base'] * (2 ** attempt))
+                continue
+            logger.error(f"AbuseIPDB lookup failed for {ip}: {e}")
+        except Exception as e:
+            logger.error(f"AbuseIPDB lookup failed for {ip}: {e}")
+            return None
+    return None
+
+def _verdict(score: int) -> dict:
+    # Malicious is recomputed against the current threshold, not the one at lookup time
+    return {'score': score, 'is_malicious': score >= config.intel['threshold_score']}
+
+def _read_sqlite_cache(ips: list[str], now: float) -> dict[str, int]:
+    """Bulk-reads unexpired scores for IPs missing from the in-memory tier."""
+    found = {}
+    c = get_connection(DB_PATH).cursor()
+    # Stay under SQLite's default bound-parameter limit
+    for i in range(0, len(ips), 500):
+        chunk = ips[i:i + 500]
+        c.execute(
+            f"SELECT ip, last_checked, score FROM ip_reputation WHERE ip IN ({','.join('?' * len(chunk))})",
+            chunk
         )
+        for ip, last_checked, score in c.fetchall():
+            remaining = config.intel['cache_ttl'] - (now - last_checked)
+            if remaining > 0:
+                found[ip] = score
+                _reputation_cache.set(ip, score, ttl=remaining)
+    return found
+
+def flush_reputation_cache():
+    """Writes verdicts fetched since the last flush back to SQLite in one batch."""
+    global _last_write
+    with _state_lock:
+        pending = list(_pending_writes.values())
+        _pending_writes.clear()
+        _last_write = time.monotonic()
+    if not pending:
+        return
+    with transaction(DB_PATH) as conn:
+        conn.executemany("""
+          REPLACE INTO ip_reputation (ip, last_checked, score)
+          VALUES (?, ?, ?)
+        """, pending)
+    logger.debug(f"[INTEL] Wrote {len(pending)} reputation(s) to the SQLite cache")
+
+def warm_reputation_cache() -> int:
+    """Loads the freshest unexpired verdicts from SQLite into memory with one query."""
+    now = time.time()
+    rows = get_connection(DB_PATH).execute(
+        "SELECT ip, last_checked, score FROM ip_reputation WHERE last_checked > ? "
+        "ORDER BY last_checked DESC LIMIT ?",
+        (now - config.intel['cache_ttl'], config.intel['memory_cache_size'])
+    ).fetchall()
+    # Oldest first, so the most recently checked IPs end up most recently used
+    for ip, last_checked, score in reversed(rows):
+        _reputation_cache.set(ip, score, ttl=config.intel['cache_ttl'] - (now - last_checked))
+    logger.info(f"[INTEL] Warmed reputation cache with {len(rows)} IP(s)")
+    return len(rows)
+
+def reputation_cache_stats() -> dict:
+    """Hit/miss/eviction counters for the in-memory tier, plus pending writes."""
+    stats = _reputation_cache.stats()
+    stats['sqlite_hits'] = _sqlite_hits
+    stats['pending_writes'] = len(_pending_writes)
+    return stats
+
+def resolve_reputations(ips: Iterable[str]) -> dict[str, dict]:
+    """
+    Resolves every distinct IP in a snapshot to {'score': int, 'is_malicious': bool}.
+    Verdicts come from the in-memory cache, then SQLite; remaining misses are looked
+    up concurrently. Failed lookups report score 0 and are not retried until the
+    negative-cache TTL expires.
+    """
+    global _sqlite_hits
+    unique = {ip for ip in ips if ip}
+    if not unique:
+        return {}
+    now = time.time()
+    results: dict[str, dict] = {}
+
+    uncached = []
+    for ip in unique:
+        score = _reputation_cache.get(ip)
+        if score is not None:
+            results[ip] = _verdict(score)
+        else:
+            uncached.append(ip)
 
-    # Update cache
-    c.execute("""
-      REPLACE INTO ip_reputation (ip, last_checked, score)
-      VALUES (?, ?, ?)
-    """, (ip, now, score))
-    conn.commit()
-    conn.close()
-    return {'score': score, 'is_malicious': is_mal}
\ No newline at end of file
+    if uncached:
+        found = _read_sqlite_cache(uncached, now)
+        _sqlite_hits += len(found)
+        for ip, score in found.items():
+            results[ip] = _verdict(score)
+
+    misses = []
+    with _state_lock:
+        for expired in [ip for ip, retry_at in _negative_cache.items() if retry_at <= now]:
+            del _negative_cache[expired]
+        for ip in unique - results.keys():
+            retry_at = _negative_cache.get(ip)
+            if retry_at is not None:
+                results[ip] = _verdict(0)
+            else:
+                misses.append(ip)
+
+    if misses and not config.intel['abuseipdb_api_key']:
+        logger.debug(f"[INTEL] No AbuseIPDB API key configured; skipping {len(misses)} lookup(s)")
+        for ip in misses:
+            results[ip] = _verdict(0)
+        misses = []
+
+    if misses:
+        logger.info(f"[INTEL] Querying AbuseIPDB for {len(misses)} IP(s) ({len(unique) - len(misses)} cached)")
+        _, executor = _get_pool()
+        for ip, score in zip(misses, executor.map(_lookup_remote, misses)):
+            if score is None:
+                with _state_lock:
+                    _negative_cache[ip] = now + config.intel['negative_cache_ttl']
+                results[ip] = _verdict(0)
+            else:
+                _reputation_cache.set(ip, score)
+                with _state_lock:
+                    _pending_writes[ip] = (ip, now, score)
+                results[ip] = _verdict(score)
+                logger.debug(
+                    f"AbuseIPDB: IP={ip}, score={score}, threshold={config.intel['threshold_score']}, "
+                    f"is_malicious={results[ip]['is_malicious']}"
+                )
+
+    # Write back in batches rather than on every lookup
+    if len(_pending_writes) >= config.intel['write_batch_size'] or (
+            _pending_writes and time.monotonic() - _last_write >= config.intel['write_interval']):
+        flush_reputation_cache()
+    return results
+
+def get_ip_reputation(ip: str) -> dict:
+    """Returns {'score': int, 'is_malicious': bool}, using cache or AbuseIPDB."""
+    return resolve_reputations([ip]).get(ip, _verdict(0))
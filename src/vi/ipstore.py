@@ -0,0 +1,308 @@
+# Compact store of the outbound IPs and networks Vi has already seen.
+# Addresses are kept as packed integers in sorted NumPy arrays (IPv4 as uint32,
+# IPv6 as 16-byte big-endian strings, which sort in numeric order), so membership
+# and CIDR queries are binary searches. known_ips.npz holds a compacted snapshot;
+# additions are appended to known_ips.log and folded into the snapshot once the
+# log grows past a threshold. baseline.json remains an import/export format.
+
+import ipaddress
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STORE_FILE = Path.home() / ".vi" / "config" / "known_ips.npz"
+LOG_FILE = Path.home() / ".vi" / "config" / "known_ips.log"
+
+# Number of log entries after which the snapshot is rewritten
+COMPACT_THRESHOLD = 50000
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+_V6_DTYPE = 'S16'
+
+# Parses an address as printed by lsof/psutil ("[::1]", "fe80::1%en0"); IPv4-mapped
+# IPv6 addresses are stored as IPv4. Returns None for anything that is not an IP.
+def parse_ip(value: str) -> Optional[IPAddress]:
+    try:
+        ip = ipaddress.ip_address(str(value).strip().strip('[]').split('%', 1)[0])
+    except ValueError:
+        return None
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        return ip.ipv4_mapped
+    return ip
+
+def parse_network(value: str) -> Optional[IPNetwork]:
+    try:
+        return ipaddress.ip_network(str(value).strip(), strict=False)
+    except ValueError:
+        return None
+
+def _pack(ip: IPAddress):
+    return int(ip) if ip.version == 4 else ip.packed
+
+def _unpack_v6(value: bytes) -> ipaddress.IPv6Address:
+    # NumPy strips trailing NUL bytes from 'S' items
+    return ipaddress.IPv6Address(value.ljust(16, b'\0'))
+
+def _sorted_unique(values, version: int) -> np.ndarray:
+    if version == 4:
+        return np.unique(np.asarray(list(values), dtype=np.uint32))
+    return np.unique(np.asarray(list(values), dtype=_V6_DTYPE))
+
+def _empty(version: int) -> np.ndarray:
+    return np.empty(0, dtype=np.uint32 if version == 4 else _V6_DTYPE)
+
+def _in_sorted(array: np.ndarray, values: np.ndarray) -> np.ndarray:
+    if len(array) == 0 or len(values) == 0:
+        return np.zeros(len(values), dtype=bool)
+    idx = np.minimum(np.searchsorted(array, values), len(array) - 1)
+    return array[idx] == values
+
+def _in_ranges(starts: np.ndarray, ends: np.ndarray, values: np.ndarray) -> np.ndarray:
+    # Ranges are collapsed, so at most one can start at or before each value
+    if len(starts) == 0 or len(values) == 0:
+        return np.zeros(len(values), dtype=bool)
+    idx = np.searchsorted(starts, values, side='right') - 1
+    return (idx >= 0) & (ends[np.maximum(idx, 0)] >= values)
+
+class KnownIPStore:
+    def __init__(self, store_path: Path = STORE_FILE, log_path: Path = LOG_FILE,
+                 compact_threshold: int = COMPACT_THRESHOLD):
+        self.store_path = Path(store_path)
+        self.log_path = Path(log_path)
+        self.compact_threshold = compact_threshold
+        # Compacted addresses per IP version, and added-since-compaction ones
+        self._addresses: dict[int, np.ndarray] = {4: _empty(4), 6: _empty(6)}
+        self._recent: dict[int, set] = {4: set(), 6: set()}
+        self._networks: list[IPNetwork] = []
+        # Collapsed networks as sorted (start, end) arrays per IP version
+        self._ranges: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+        self._pending: list[str] = []
+        self._log_entries = 0
+        self._lock = threading.Lock()
+        self._rebuild_ranges()
+
+    def __len__(self):
+        return sum(len(a) for a in self._addresses.values()) + sum(len(s) for s in self._recent.values())
+
+    def __contains__(self, ip) -> bool:
+        return bool(self.contains_many([ip])[0])
+
+    @property
+    def networks(self) -> list[IPNetwork]:
+        return list(self._networks)
+
+    # Reads the snapshot, then replays any log entries written after it
+    def load(self) -> "KnownIPStore":
+        with self._lock:
+            self._addresses = {4: _empty(4), 6: _empty(6)}
+            self._recent = {4: set(), 6: set()}
+            self._networks = []
+            self._pending.clear()
+            self._log_entries = 0
+            try:
+                if self.store_path.exists():
+                    with np.load(self.store_path) as data:
+                        self._addresses = {4: data['v4'], 6: data['v6']}
+                        self._networks = [ipaddress.ip_network(n) for n in data['networks'].tolist()]
+            except Exception as e:
+                logger.warning(f"[WARN] Failed to load known-IP store: {e}")
+
+            try:
+                if self.log_path.exists():
+                    with open(self.log_path, "r") as f:
+                        for line in f:
+                            # A torn final line from a crash mid-append fails to parse and is skipped
+                            self._apply(line.strip())
+                            self._log_entries += 1
+            except Exception as e:
+                logger.warning(f"[WARN] Failed to replay known-IP log: {e}")
+            self._rebuild_ranges()
+
+        logger.info(f"[BASELINE] Loaded {len(self)} known IP(s), {len(self._networks)} network(s), "
+                     f"{self._log_entries} log entries")
+        if self._log_entries >= self.compact_threshold:
+            self.compact()
+        return self
+
+    # Adds one address or CIDR entry to memory; returns True when it was not yet covered
+    def _apply(self, entry: str) -> bool:
+        if '/' in entry:
+            network = parse_network(entry)
+            if network is None or network in self._networks:
+                return False
+            self._networks.append(network)
+            return True
+        ip = parse_ip(entry)
+        if ip is None or self._covered(ip):
+            return False
+        self._recent[ip.version].add(_pack(ip))
+        return True
+
+    def _covered(self, ip: IPAddress) -> bool:
+        value = _pack(ip)
+        if value in self._recent[ip.version]:
+            return True
+        packed = np.asarray([value], dtype=np.uint32 if ip.version == 4 else _V6_DTYPE)
+        starts, ends = self._ranges[ip.version]
+        return bool(_in_sorted(self._addresses[ip.version], packed)[0]
+                    or _in_ranges(starts, ends, packed)[0])
+
+    def _rebuild_ranges(self):
+        self._networks = list(ipaddress.collapse_addresses(n for n in self._networks if n.version == 4)) + \
+            list(ipaddress.collapse_addresses(n for n in self._networks if n.version == 6))
+        for version in (4, 6):
+            networks = [n for n in self._networks if n.version == version]
+            starts = [_pack(n.network_address) for n in networks]
+            ends = [_pack(n.broadcast_address) for n in networks]
+            dtype = np.uint32 if version == 4 else _V6_DTYPE
+            self._ranges[version] = (np.asarray(starts, dtype=dtype), np.asarray(ends, dtype=dtype))
+
+    def contains_many(self, ips: Iterable[str]) -> np.ndarray:
+        """Vectorized membership: True where an address is known or inside a known network."""
+        ips = list(ips)
+        result = np.zeros(len(ips), dtype=bool)
+        rows: dict[int, list[int]] = {4: [], 6: []}
+        values: dict[int, list] = {4: [], 6: []}
+        for i, value in enumerate(ips):
+            ip = parse_ip(value)
+            if ip is not None:
+                rows[ip.version].append(i)
+                values[ip.version].append(_pack(ip))
+        with self._lock:
+            for version in (4, 6):
+                if not rows[version]:
+                    continue
+                packed = np.asarray(values[version], dtype=np.uint32 if version == 4 else _V6_DTYPE)
+                starts, ends = self._ranges[version]
+                hits = _in_sorted(self._addresses[version], packed) | _in_ranges(starts, ends, packed)
+                recent = self._recent[version]
+                if recent:
+                    hits |= np.fromiter((v in recent for v in values[version]), dtype=bool, count=len(packed))
+                result[rows[version]] = hits
+        return result
+
+    def add(self, ip: str) -> bool:
+        """Records an address; returns True when it was not already known."""
+        parsed = parse_ip(ip)
+        if parsed is None:
+            return False
+        with self._lock:
+            if not self._apply(str(parsed)):
+                return False
+            self._pending.append(str(parsed))
+        return True
+
+    def add_network(self, cidr: str) -> bool:
+        """Records a network (e.g. a cloud provider range); its addresses are dropped at compaction."""
+        network = parse_network(cidr)
+        if network is None:
+            raise ValueError(f"Invalid network: {cidr!r}")
+        with self._lock:
+            if not self._apply(str(network)):
+                return False
+            self._rebuild_ranges()
+            self._pending.append(str(network))
+        return True
+
+    def addresses_in(self, cidr: str) -> list[str]:
+        """Known individual addresses inside a network (a prefix query)."""
+        network = parse_network(cidr)
+        if network is None:
+            raise ValueError(f"Invalid network: {cidr!r}")
+        version = network.version
+        dtype = np.uint32 if version == 4 else _V6_DTYPE
+        low, high = _pack(network.network_address), _pack(network.broadcast_address)
+        with self._lock:
+            array = self._addresses[version]
+            bounds = np.asarray([low, high], dtype=dtype)
+            start, stop = np.searchsorted(array, bounds[0]), np.searchsorted(array, bounds[1], side='right')
+            found = array[start:stop].tolist() + [v for v in self._recent[version] if low <= v <= high]
+        if version == 4:
+            return [str(ipaddress.IPv4Address(v)) for v in sorted(found)]
+        return [str(_unpack_v6(v)) for v in sorted(v.ljust(16, b'\0') for v in found)]
+
+    # Appends pending additions to the log and compacts when it grows too large
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, "a") as f:
+                f.write("".join(entry + "\n" for entry in pending))
+            self._log_entries += len(pending)
+        if self._log_entries >= self.compact_threshold:
+            self.compact()
+
+    # Merges recent additions into the sorted arrays, drops addresses covered by a
+    # network, rewrites the snapshot and truncates the log
+    def compact(self):
+        with self._lock:
+            for version in (4, 6):
+                merged = self._addresses[version]
+                if self._recent[version]:
+                    merged = _sorted_unique(list(self._recent[version]) + merged.tolist(), version)
+                starts, ends = self._ranges[version]
+                self._addresses[version] = merged[~_in_ranges(starts, ends, merged)]
+                self._recent[version] = set()
+            self.store_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.store_path.with_suffix(".npz.tmp")
+            with open(tmp_path, "wb") as f:
+                np.savez(f, v4=self._addresses[4], v6=self._addresses[6],
+                         networks=np.asarray([str(n) for n in self._networks], dtype=str))
+            os.replace(tmp_path, self.store_path)
+            # Pending additions are now in the snapshot too
+            self._pending.clear()
+            open(self.log_path, "w").close()
+            self._log_entries = 0
+        logger.info(f"[BASELINE] Compacted {len(self)} known IP(s) and {len(self._networks)} network(s) "
+                     f"into {self.store_path.name}")
+
+    def import_json(self, path: Path) -> int:
+        """Adds known_ips (and known_networks) from a baseline.json-style file; returns entries added."""
+        with open(path, "r") as f:
+            data = json.load(f)
+        added = sum(self.add_network(n) for n in data.get("known_networks", []))
+        added += sum(self.add(ip) for ip in data.get("known_ips", []))
+        self.flush()
+        return added
+
+    def export_json(self, path: Path):
+        """Writes the store in the baseline.json format."""
+        with self._lock:
+            v4 = sorted(self._addresses[4].tolist() + list(self._recent[4]))
+            v6 = sorted(v.ljust(16, b'\0') for v in self._addresses[6].tolist() + list(self._recent[6]))
+            networks = [str(n) for n in self._networks]
+        data = {
+            "known_ips": [str(ipaddress.IPv4Address(v)) for v in v4] + [str(_unpack_v6(v)) for v in v6],
+            "known_networks": networks
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=4)
+
+_store: Optional[KnownIPStore] = None
+
+# Returns the process-wide store, loading it on first use. The first run after an
+# upgrade imports the existing baseline.json.
+def get_known_ip_store(legacy_json: Optional[Path] = None) -> KnownIPStore:
+    global _store
+    if _store is None:
+        fresh = not STORE_FILE.exists() and not LOG_FILE.exists()
+        _store = KnownIPStore().load()
+        if fresh and legacy_json is not None and Path(legacy_json).exists():
+            try:
+                added = _store.import_json(legacy_json)
+                _store.compact()
+                logger.info(f"[BASELINE] Imported {added} entries from {Path(legacy_json).name}")
+            except Exception as e:
+                logger.warning(f"[WARN] Failed to import {legacy_json}: {e}")
+    return _store
@@ -0,0 +1,144 @@
+# In-memory index of which PID contacted which IP, shared for the daemon's lifetime.
+# linkage.json holds a compacted snapshot; new links are appended to a journal
+# and folded back into the snapshot once the journal grows past a threshold.
+
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+LINKAGE_FILE = Path.home() / ".vi" / "config" / "linkage.json"
+JOURNAL_FILE = Path.home() / ".vi" / "config" / "linkage.journal"
+
+# Number of journal entries after which the snapshot is rewritten
+COMPACT_THRESHOLD = 50000
+
+LinkKey = tuple[int, str, str]
+
+# Keys are formatted as "pid:ip:day". IPv6 addresses contain colons, so the PID is
+# matched from the left and the day from the right; older files carry a full
+# timestamp after the day, which is dropped.
+_KEY_PATTERN = re.compile(r"^(\d+):(.+):(\d{4}-\d{2}-\d{2})(?: [\d:.]+)?$")
+
+# Returns the day component used in link keys for a datetime or timestamp string
+def link_day(timestamp) -> str:
+    if isinstance(timestamp, datetime):
+        return timestamp.date().isoformat()
+    return str(timestamp)[:10]
+
+class LinkageIndex:
+    def __init__(self, snapshot_path: Path = LINKAGE_FILE, journal_path: Path = JOURNAL_FILE,
+                 compact_threshold: int = COMPACT_THRESHOLD):
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = Path(journal_path)
+        self.compact_threshold = compact_threshold
+        self._links: dict[LinkKey, str] = {}
+        self._pending: list[list] = []
+        self._journal_entries = 0
+        self._lock = threading.Lock()
+        self.load()
+
+    def __len__(self):
+        return len(self._links)
+
+    def __contains__(self, key):
+        return key in self._links
+
+    # Reads the snapshot, then replays any journal entries written after it
+    def load(self):
+        with self._lock:
+            self._links.clear()
+            self._pending.clear()
+            self._journal_entries = 0
+            rewrite_snapshot = False
+            try:
+                if self.snapshot_path.exists():
+                    with open(self.snapshot_path, "r") as f:
+                        data = json.load(f)
+                    for key, first_seen in data.items():
+                        match = _KEY_PATTERN.match(key)
+                        if not match:
+                            continue
+                        pid, ip, day = match.groups()
+                        link = (int(pid), ip, day)
+                        # Legacy per-scan keys collapse into one link per day, keeping the earliest
+                        if link not in self._links or first_seen < self._links[link]:
+                            self._links[link] = first_seen
+                    rewrite_snapshot = len(self._links) != len(data)
+            except Exception as e:
+                logger.warning(f"[WARN] Failed to load linkage snapshot: {e}")
+
+            try:
+                if self.journal_path.exists():
+                    with open(self.journal_path, "r") as f:
+                        for line in f:
+                            try:
+                                pid, ip, day, first_seen = json.loads(line)
+                            except ValueError:
+                                # A torn final line from a crash mid-append
+                                continue
+                            self._links.setdefault((int(pid), ip, day), first_seen)
+                            self._journal_entries += 1
+            except Exception as e:
+                logger.warning(f"[WARN] Failed to replay linkage journal: {e}")
+
+        logger.info(f"[LINKAGE] Loaded {len(self._links)} link(s), {self._journal_entries} journal entries")
+        if rewrite_snapshot or self._journal_entries >= self.compact_threshold:
+            self.compact()
+
+    def get(self, pid: int, ip: str, day: str) -> Optional[str]:
+        return self._links.get((pid, ip, day))
+
+    # Records a link if unseen; returns True when the link is new
+    def add(self, pid: int, ip: str, day: str, first_seen: Optional[str] = None) -> bool:
+        key = (int(pid), ip, day)
+        with self._lock:
+            if key in self._links:
+                return False
+            first_seen = first_seen or datetime.now().isoformat()
+            self._links[key] = first_seen
+            self._pending.append([key[0], ip, day, first_seen])
+        return True
+
+    # Appends pending links to the journal and compacts when it grows too large
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.journal_path, "a") as f:
+                f.write("".join(json.dumps(entry) + "\n" for entry in pending))
+            self._journal_entries += len(pending)
+        if self._journal_entries >= self.compact_threshold:
+            self.compact()
+
+    # Rewrites the snapshot from memory and truncates the journal
+    def compact(self):
+        with self._lock:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.snapshot_path.with_suffix(".json.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump({f"{pid}:{ip}:{day}": first_seen
+                           for (pid, ip, day), first_seen in self._links.items()}, f)
+            os.replace(tmp_path, self.snapshot_path)
+            # Pending links are now in the snapshot too
+            self._pending.clear()
+            open(self.journal_path, "w").close()
+            self._journal_entries = 0
+        logger.info(f"[LINKAGE] Compacted {len(self._links)} link(s) into {self.snapshot_path.name}")
+
+_index: Optional[LinkageIndex] = None
+
+# Returns the process-wide linkage index, loading it on first use
+def get_linkage_index() -> LinkageIndex:
+    global _index
+    if _index is None:
+        _index = LinkageIndex()
+    return _index
@@ -0,0 +1,182 @@
+# Logging setup for the daemon. The calling thread only filters a record and puts it
+# on a bounded queue; a background listener formats and writes it, so a scan never
+# waits on disk. Output is JSON lines (or plain text) in ~/.vi/logs/vi.log with
+# size-based rotation. Every call site is rate limited with a token bucket: lines over
+# the limit are dropped and counted, and the next line let through from that call site
+# carries the number suppressed. DEBUG records may also be sampled. Levels are set per
+# subsystem through the logger names (vi.net_monitor, vi.intel, ...).
+
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Iterable, Optional
+
+from vi.metrics import registry
+
+LOG_PATH = Path.home() / '.vi' / 'logs' / 'vi.log'
+
+# Attributes every LogRecord has; anything else was passed through extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+# Formats records as one JSON object per line; fields passed through extra= are included
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+# The previous plain-text layout, noting suppressed lines at the end
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s [%(levelname)s] %(name)s: %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        return f"{line} (+{suppressed} similar suppressed)" if suppressed else line
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets each call site (logger name and line) emit at most `rate` lines per second
+    after an initial `burst`; a rate of 0 disables limiting. Keeps roughly
+    debug_sample_rate of DEBUG records, evenly spaced.
+    """
+
+    def __init__(self, rate: float = 5.0, burst: int = 50, debug_sample_rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.debug_sample_rate = debug_sample_rate
+        # (logger, lineno) -> [tokens, last refill, suppressed since last line]
+        self._buckets: dict[tuple[str, int], list] = {}
+        self._debug_seen = 0
+        self._lock = threading.Lock()
+        self._rate_limited = registry.counter('vi_log_records_dropped_total', 'Log records not written',
+                                              reason='rate_limit')
+        self._sampled = registry.counter('vi_log_records_dropped_total', 'Log records not written',
+                                         reason='sampled')
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.DEBUG and self.debug_sample_rate < 1:
+            with self._lock:
+                self._debug_seen += 1
+                keep = int(self._debug_seen * self.debug_sample_rate) != int((self._debug_seen - 1) * self.debug_sample_rate)
+            if not keep:
+                self._sampled.inc()
+                return False
+        if not self.rate:
+            return True
+
+        now = time.monotonic()
+        key = (record.name, record.lineno)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                bucket[2] += 1
+                suppressed = True
+            else:
+                bucket[0] = tokens - 1
+                if bucket[2]:
+                    record.suppressed = bucket[2]
+                    bucket[2] = 0
+                suppressed = False
+        if suppressed:
+            self._rate_limited.inc()
+        return not suppressed
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments now, since they may change after the call returns, but
+        # leave formatting (and any traceback) to the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            registry.counter('vi_log_records_dropped_total', 'Log records not written', reason='queue_full').inc()
+
+_listener: Optional[QueueListener] = None
+_atexit_registered = False
+
+def configure_logging(level: str = 'INFO', levels: Optional[dict] = None, format: str = 'json',
+                      max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5, rate_limit: float = 5.0,
+                      burst: int = 50, debug_sample_rate: float = 1.0, queue_size: int = 10000,
+                      path: Path = LOG_PATH):
+    """
+    Routes every logger through a queue to a rotating file at `path` (stdout if the
+    file cannot be opened). `levels` maps logger names to levels, e.g.
+    {'vi.net_monitor': 'WARNING'}; everything else logs at `level`.
+    """
+    global _listener, _atexit_registered
+    stop_logging()
+
+    fallback = False
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        target: logging.Handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                      encoding='utf-8')
+    except OSError:
+        target = logging.StreamHandler(sys.stdout)
+        fallback = True
+    target.setFormatter(JsonFormatter() if format == 'json' else TextFormatter())
+
+    handler = _QueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(RateLimitFilter(rate_limit, burst, debug_sample_rate))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    for name, name_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(name_level.upper())
+
+    _listener = QueueListener(handler.queue, target)
+    _listener.start()
+    if not _atexit_registered:
+        atexit.register(stop_logging)
+        _atexit_registered = True
+    if fallback:
+        logging.getLogger(__name__).warning("[LOGGING] Failed to write to file; logging to stdout instead.")
+
+def stop_logging():
+    """Writes out queued records and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+def preview(items: Iterable, limit: int = 5) -> str:
+    """Joins the first `limit` items for a summary line, noting how many were left out."""
+    items = list(items)
+    shown = ', '.join(str(item) for item in items[:limit])
+    return f"{shown}, ... (+{len(items) - limit} more)" if len(items) > limit else shown
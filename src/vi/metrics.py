@@ -0,0 +1,248 @@
+# In-process metrics for the daemon: counters, gauges and latency histograms,
+# exposed in Prometheus text format over a localhost HTTP port or a Unix socket,
+# and dumped periodically as JSON to ~/.vi/logs/metrics.json.
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DUMP_PATH = Path.home() / '.vi' / 'logs' / 'metrics.json'
+
+# Upper bounds in seconds for stage latency histograms, from sub-millisecond
+# in-memory work up to a slow lsof or intel round trip
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(labels: Labels, extra: Optional[tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (k + '="' + v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for k, v in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+class Gauge:
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = float(value)
+
+class Histogram:
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        with self._lock:
+            total, result = 0, []
+            for bound, count in zip(self.buckets, self.counts):
+                total += count
+                result.append((bound, total))
+            return result
+
+class Registry:
+    def __init__(self):
+        # name -> (type, help, {labels: metric})
+        self._families: dict[str, tuple[str, str, dict]] = {}
+        self._collectors: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _get(self, kind: str, factory, name: str, help_text: str, labels: dict):
+        key = _labels(labels)
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = (kind, help_text, {})
+            elif family[0] != kind:
+                raise ValueError(f"Metric {name} is already registered as a {family[0]}")
+            metrics = family[2]
+            if key not in metrics:
+                metrics[key] = factory()
+            return metrics[key]
+
+    def counter(self, name: str, help_text: str = '', **labels) -> Counter:
+        return self._get('counter', Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str = '', **labels) -> Gauge:
+        return self._get('gauge', Gauge, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str = '', buckets: tuple = DEFAULT_BUCKETS, **labels) -> Histogram:
+        return self._get('histogram', lambda: Histogram(buckets), name, help_text, labels)
+
+    def register_collector(self, func: Callable[[], None]):
+        """Adds a callback run before every render, e.g. to copy queue depths into gauges."""
+        self._collectors.append(func)
+
+    def _collect(self):
+        for func in self._collectors:
+            try:
+                func()
+            except Exception:
+                logger.exception("[METRICS] Collector failed")
+
+    def _snapshot(self) -> list[tuple[str, str, str, list]]:
+        with self._lock:
+            return [(name, kind, help_text, list(metrics.items()))
+                    for name, (kind, help_text, metrics) in sorted(self._families.items())]
+
+    def render_prometheus(self) -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        self._collect()
+        lines = []
+        for name, kind, help_text, metrics in self._snapshot():
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in metrics:
+                if kind == 'histogram':
+                    for bound, count in metric.cumulative():
+                        lines.append(f"{name}_bucket{_format_labels(labels, ('le', repr(bound)))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {metric.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {metric.sum}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {metric.count}")
+                else:
+                    lines.append(f"{name}{_format_labels(labels)} {metric.value}")
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self) -> dict:
+        """Metrics as plain data; histograms report count, sum, mean and buckets."""
+        self._collect()
+        result: dict[str, list] = {}
+        for name, kind, _, metrics in self._snapshot():
+            entries = result.setdefault(name, [])
+            for labels, metric in metrics:
+                entry = {'labels': dict(labels)}
+                if kind == 'histogram':
+                    entry.update(count=metric.count, sum=metric.sum,
+                                 mean=metric.sum / metric.count if metric.count else 0.0,
+                                 buckets={repr(b): c for b, c in metric.cumulative()})
+                else:
+                    entry['value'] = metric.value
+                entries.append(entry)
+        return result
+
+    @contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        """Observes the block's duration in vi_stage_duration_seconds{stage=...}."""
+        histogram = self.histogram('vi_stage_duration_seconds', 'Duration of each scan stage', stage=stage)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.observe(time.perf_counter() - started)
+
+# Process-wide registry used by the daemon and its modules
+registry = Registry()
+timed = registry.timed
+
+def dump_json(path: Path = DUMP_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump({'timestamp': time.time(), 'metrics': registry.to_dict()}, f, indent=2)
+    os.replace(tmp_path, path)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects a (host, port) client address
+        return request, ('local', 0)
+
+_servers: list = []
+_stop = threading.Event()
+
+def _serve(server):
+    threading.Thread(target=server.serve_forever, name='vi-metrics-http', daemon=True).start()
+    _servers.append(server)
+
+def _dump_loop(interval: float, path: Path):
+    while not _stop.wait(interval):
+        try:
+            dump_json(path)
+        except Exception:
+            logger.exception("[METRICS] Failed to write metrics dump")
+
+def start(port: int = 0, socket_path: str = '', dump_interval: float = 0, dump_path: Path = DUMP_PATH):
+    """
+    Serves /metrics on 127.0.0.1:port and/or a Unix socket, and writes the JSON dump
+    every dump_interval seconds. A zero port, empty socket path or zero interval
+    disables that output.
+    """
+    if port:
+        try:
+            _serve(ThreadingHTTPServer(('127.0.0.1', port), _MetricsHandler))
+            logger.info(f"[METRICS] Serving Prometheus metrics on http://127.0.0.1:{port}/metrics")
+        except OSError as e:
+            logger.warning(f"[METRICS] Could not listen on port {port}: {e}")
+    if socket_path and hasattr(socket, 'AF_UNIX'):
+        path = Path(socket_path).expanduser()
+        try:
+            if path.exists():
+                path.unlink()
+            _serve(_UnixHTTPServer(str(path), _MetricsHandler))
+            logger.info(f"[METRICS] Serving Prometheus metrics on unix socket {path}")
+        except OSError as e:
+            logger.warning(f"[METRICS] Could not listen on {path}: {e}")
+    if dump_interval:
+        threading.Thread(target=_dump_loop, args=(dump_interval, dump_path),
+                         name='vi-metrics-dump', daemon=True).start()
+
+def stop():
+    _stop.set()
+    for server in _servers:
+        server.shutdown()
+        server.server_close()
+    _servers.clear()
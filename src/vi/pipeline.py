@@ -0,0 +1,149 @@
+# Staged execution of the scan loop. Each stage has its own worker thread(s) and a
+# bounded input queue, so snapshot N+1 can be collected while snapshot N is still
+# being enriched or persisted. Stages with several workers may finish snapshots out
+# of order; a reorder buffer releases results downstream strictly in submission
+# order, so single-worker stages (and the alerts they raise) see snapshots in order.
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from vi.db import close_connections
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+_FAILED = object()
+
+class Stage:
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1, queue_size: int = 2):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.next: Optional["Stage"] = None
+        self.threads: list[threading.Thread] = []
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        # Reorder buffer: results held until every earlier sequence number is released
+        self._held: dict[int, Any] = {}
+        self._next_seq = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"vi-{self.name}-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            seq, payload = item
+            started = time.monotonic()
+            try:
+                result = self.func(payload)
+            except Exception:
+                logger.exception(f"[PIPELINE] Stage {self.name} failed on snapshot {seq}")
+                result = _FAILED
+            with self._lock:
+                self.busy_seconds += time.monotonic() - started
+                self.processed += 1
+                if result is _FAILED:
+                    self.errors += 1
+            self._release(seq, result)
+            self.queue.task_done()
+        close_connections()
+
+    def _release(self, seq: int, result: Any):
+        with self._lock:
+            self._held[seq] = result
+            while self._next_seq in self._held:
+                ready = self._held.pop(self._next_seq)
+                # A failed snapshot is dropped, but still hands its turn to the next one
+                if ready is not _FAILED and self.next is not None:
+                    self.next.queue.put((self._next_seq, ready))
+                self._next_seq += 1
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits for queued snapshots to pass through, then stops the workers. With a
+        timeout, gives up after that many seconds, leaving stuck workers (daemon
+        threads) behind; returns False if it did.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining() -> Optional[float]:
+            return None if deadline is None else max(deadline - time.monotonic(), 0)
+
+        # Queue.join() without its unbounded wait
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                if deadline is not None and not remaining():
+                    break
+                self.queue.all_tasks_done.wait(remaining())
+        drained = not self.queue.unfinished_tasks
+        try:
+            for _ in self.threads:
+                self.queue.put(_STOP, timeout=remaining())
+        except queue.Full:
+            pass
+        for thread in self.threads:
+            thread.join(remaining())
+        stopped = drained and not any(thread.is_alive() for thread in self.threads)
+        if not stopped:
+            logger.warning(f"[PIPELINE] Stage {self.name} did not stop in time; "
+                           f"{self.queue.unfinished_tasks} snapshot(s) unfinished")
+        self.threads = []
+        return stopped
+
+    def stats(self) -> dict:
+        return {
+            'workers': self.workers,
+            'queue_depth': self.queue.qsize(),
+            'processed': self.processed,
+            'errors': self.errors,
+            'busy_seconds': round(self.busy_seconds, 3)
+        }
+
+class Pipeline:
+    """
+    Chains stages given as (name, func, workers). Each func takes the previous
+    stage's result. submit() blocks while the first stage's queue is full, which
+    pushes back on the collector instead of letting snapshots pile up.
+    """
+
+    def __init__(self, stages: list[tuple[str, Callable[[Any], Any], int]], queue_size: int = 2):
+        self.stages = [Stage(name, func, workers, queue_size) for name, func, workers in stages]
+        for stage, following in zip(self.stages, self.stages[1:]):
+            stage.next = following
+        self._seq = 0
+
+    def start(self) -> "Pipeline":
+        for stage in self.stages:
+            stage.start()
+        return self
+
+    def submit(self, item: Any):
+        self.stages[0].queue.put((self._seq, item))
+        self._seq += 1
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """
+        Drains every stage in order and stops its workers, within timeout seconds
+        overall if given. Returns False if some stage had to be abandoned.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        stopped = True
+        for stage in self.stages:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            stopped = stage.stop(remaining) and stopped
+        return stopped
+
+    def stats(self) -> dict:
+        return {stage.name: stage.stats() for stage in self.stages}
@@ -0,0 +1,94 @@
+# Samples each process's name, user, CPU and memory usage once per snapshot
+import logging
+import time
+from typing import NamedTuple
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# Previous cpu times keyed by (pid, create_time) so a reused PID never inherits
+# the counters of the process that held it before
+_previous_cpu_times: dict[tuple[int, float], tuple[float, float]] = {}
+
+# Helper to calculate cpu percent for a process
+def calculate_cpu_percent(key: tuple[int, float], current_time: float, current_cpu_time: float) -> float:
+    if key not in _previous_cpu_times:
+        _previous_cpu_times[key] = (current_cpu_time, current_time)
+        return 0.0
+
+    prev_cpu_time, prev_time = _previous_cpu_times[key]
+    delta_cpu = current_cpu_time - prev_cpu_time
+    delta_time = current_time - prev_time
+
+    _previous_cpu_times[key] = (current_cpu_time, current_time)
+
+    if delta_time <= 0:
+        return 0.0
+
+    return (delta_cpu / delta_time) * 100
+
+# Drops cpu history for processes that exited or whose PID was reused
+def _prune(seen: set[tuple[int, float]]):
+    seen_pids = {pid for pid, _ in seen}
+    for key in list(_previous_cpu_times):
+        if key in seen:
+            continue
+        pid = key[0]
+        if pid in seen_pids or not psutil.pid_exists(pid):
+            del _previous_cpu_times[key]
+
+class ProcessSample(NamedTuple):
+    name: str
+    user: str
+    cpu_percent: float
+    memory_rss: int
+
+# (name, user) keyed by (pid, create_time); only processes seen in the last call are kept
+_identities: dict[tuple[int, float], tuple[str, str]] = {}
+
+def _identity(proc) -> tuple[str, str]:
+    try:
+        user = proc.username()
+    except (psutil.AccessDenied, KeyError):
+        user = str(proc.uids().real)
+    return proc.name(), user
+
+def sample_processes(pids) -> dict[int, ProcessSample]:
+    """
+    Samples each distinct PID once, in a single oneshot() pass: name and user from
+    the process table (so every socket backend names processes alike) and CPU and
+    memory usage. Vanished processes are left out; processes whose usage may not
+    be read (other users' on macOS) report 0.0 and 0.
+    """
+    global _identities
+    samples: dict[int, ProcessSample] = {}
+    seen: set[tuple[int, float]] = set()
+    identities: dict[tuple[int, float], tuple[str, str]] = {}
+    now = time.monotonic()
+
+    for pid in set(pids):
+        try:
+            proc = psutil.Process(pid)
+            with proc.oneshot():
+                key = (pid, proc.create_time())
+                identity = _identities.get(key) or _identity(proc)
+                try:
+                    cpu_times = proc.cpu_times()
+                    mem = proc.memory_info().rss
+                except psutil.AccessDenied:
+                    cpu_times, mem = None, 0
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+
+        identities[key] = identity
+        cpu = 0.0
+        if cpu_times is not None:
+            seen.add(key)
+            cpu = calculate_cpu_percent(key, now, cpu_times.user + cpu_times.system)
+        samples[pid] = ProcessSample(identity[0], identity[1], cpu, mem)
+
+    _identities = identities
+    _prune(seen)
+    logger.debug(f"[PROC] Sampled {len(samples)} process(es), tracking {len(_previous_cpu_times)}")
+    return samples
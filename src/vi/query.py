@@ -0,0 +1,206 @@
+# Forensic queries over connection history, per-minute rollups and alerts.
+# Filters (time range, remote IP, process, port, ...) are pushed down to SQL, where
+# the indexes kept by storage and alerts serve them, and the time range also skips
+# daily partitions outside it. Results stream in time order, fetched in chunks, and
+# pages resume from a keyset cursor rather than an OFFSET, so a late page costs the
+# same as the first.
+
+import re
+from datetime import datetime, timedelta
+from typing import Iterator, Optional, Union
+
+from vi.alerts import DB_PATH as ALERTS_DB_PATH, init_alerts_db
+from vi.connections.storage import DB_PATH, init_db, list_partitions, partition_day
+from vi.db import get_connection
+
+SOURCES = ('connections', 'rollups', 'alerts')
+
+# Filters accepted by each source, mapped to their column
+FILTERS = {
+    'connections': {'remote_ip': 'remote_ip', 'process_name': 'process_name', 'remote_port': 'remote_port',
+                    'pid': 'pid', 'status': 'status'},
+    'rollups': {'remote_ip': 'remote_ip', 'process_name': 'process_name', 'remote_port': 'remote_port'},
+    'alerts': {'remote_ip': 'remote_ip', 'process_name': 'process_name', 'remote_port': 'remote_port',
+               'pid': 'pid', 'type': 'type', 'severity': 'severity'}
+}
+
+_DURATION_RE = re.compile(r'(\d+(?:\.\d+)?)([smhdw])')
+_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+_schema_ready = False
+
+def _ensure_schema():
+    # Creates any missing tables and indexes, e.g. on databases written by older versions
+    global _schema_ready
+    if not _schema_ready:
+        init_db()
+        init_alerts_db()
+        _schema_ready = True
+
+def parse_time(value: Union[str, datetime, None], now: Optional[datetime] = None) -> Optional[str]:
+    """
+    Accepts a datetime, an ISO date or datetime, or a duration before now such as
+    '30m', '12h', '7d' or '2w'. Returns 'YYYY-MM-DD HH:MM:SS', the stored format.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        match = _DURATION_RE.fullmatch(value.strip())
+        if match:
+            moment = (now or datetime.now()) - timedelta(seconds=float(match.group(1)) * _UNITS[match.group(2)])
+        else:
+            try:
+                moment = datetime.fromisoformat(value.strip())
+            except ValueError:
+                raise ValueError(f"Unrecognised time {value!r}; use e.g. 7d, 12h, 2024-05-01 or 2024-05-01T13:00")
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+def _where(source: str, time_column: str, since: Optional[str], until: Optional[str], filters: dict):
+    clauses, params = [], []
+    if since is not None:
+        clauses.append(f'{time_column} >= ?')
+        params.append(since)
+    if until is not None:
+        clauses.append(f'{time_column} < ?')
+        params.append(until)
+    for name, value in filters.items():
+        if value is None:
+            continue
+        column = FILTERS[source].get(name)
+        if column is None:
+            raise ValueError(f"{source} cannot be filtered by {name}")
+        clauses.append(f'{column} = ?')
+        params.append(value)
+    return clauses, params
+
+def _select(db_conn, table: str, time_column: str, clauses: list, params: list,
+            after: Optional[tuple], limit: Optional[int], chunk_size: int) -> Iterator[dict]:
+    clauses, params = list(clauses), list(params)
+    if after is not None:
+        clauses.append(f'({time_column}, rowid) > (?, ?)')
+        params.extend(after)
+    sql = f'SELECT rowid AS rowid, * FROM {table}'
+    if clauses:
+        sql += ' WHERE ' + ' AND '.join(clauses)
+    sql += f' ORDER BY {time_column}, rowid'
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    cursor = db_conn.execute(sql, params)
+    columns = [d[0] for d in cursor.description]
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        for row in rows:
+            yield dict(zip(columns, row))
+
+def _keyed_rows(source: str, since: Optional[str], until: Optional[str], after: Optional[str],
+                limit: Optional[int], chunk_size: int, filters: dict) -> Iterator[tuple[tuple, dict]]:
+    # Yields (cursor key, row); the key of the last row taken resumes the next page
+    _ensure_schema()
+    if source == 'connections':
+        db_conn = get_connection(DB_PATH)
+        clauses, params = _where(source, 'timestamp', since, until, filters)
+        after_table, after_key = None, None
+        if after:
+            after_table, timestamp, rowid = after.split('|')
+            after_key = (timestamp, int(rowid))
+        tables = [
+            t for t in list_partitions(db_conn)
+            if (since is None or partition_day(t) >= since[:10])
+            and (until is None or partition_day(t) <= until[:10])
+            and (after_table is None or t >= after_table)
+        ]
+        for table in tables:
+            key = after_key if table == after_table else None
+            for row in _select(db_conn, table, 'timestamp', clauses, params, key, limit, chunk_size):
+                yield (table, row['timestamp'], row['rowid']), row
+                if limit is not None:
+                    limit -= 1
+            if limit == 0:
+                return
+    elif source in ('rollups', 'alerts'):
+        table, time_column, path = (('connection_rollups', 'minute', DB_PATH) if source == 'rollups'
+                                    else ('alerts', 'timestamp', ALERTS_DB_PATH))
+        if source == 'rollups':
+            # Rollups are keyed by minute ('YYYY-MM-DD HH:MM')
+            since, until = since and since[:16], until and until[:16]
+        clauses, params = _where(source, time_column, since, until, filters)
+        after_key = None
+        if after:
+            timestamp, rowid = after.split('|')
+            after_key = (timestamp, int(rowid))
+        for row in _select(get_connection(path), table, time_column, clauses, params, after_key, limit, chunk_size):
+            yield (row[time_column], row['rowid']), row
+    else:
+        raise ValueError(f"Unknown source {source!r}; expected one of {', '.join(SOURCES)}")
+
+def query(source: str, since=None, until=None, after: Optional[str] = None, limit: Optional[int] = None,
+          chunk_size: int = 1000, **filters) -> Iterator[dict]:
+    """
+    Streams rows of source ('connections', 'rollups' or 'alerts') in time order.
+    since/until bound the time range (see parse_time; until is exclusive); other
+    keyword filters match columns exactly, e.g. remote_ip='1.2.3.4', remote_port=443.
+    """
+    for _, row in _keyed_rows(source, parse_time(since), parse_time(until), after, limit, chunk_size, filters):
+        yield row
+
+def page(source: str, limit: int = 100, after: Optional[str] = None, since=None, until=None,
+         **filters) -> tuple[list[dict], Optional[str]]:
+    """
+    Returns up to limit rows and the cursor for the next page (None on the last
+    page). Pass the cursor back as after= with the same filters.
+    """
+    rows, last_key = [], None
+    for key, row in _keyed_rows(source, parse_time(since), parse_time(until), after, limit + 1,
+                                min(limit + 1, 1000), filters):
+        if len(rows) == limit:
+            return rows, '|'.join(str(part) for part in last_key)
+        rows.append(row)
+        last_key = key
+    return rows, None
+
+def talkers(remote_ip: str, since=None, until=None) -> list[dict]:
+    """
+    Which processes talked to remote_ip: one entry per process (and pid, where raw
+    rows still exist) with the number of samples and the first and last time seen.
+    Raw partitions are read through the covering remote_ip index; minutes before the
+    oldest partition come from the rollups.
+    """
+    since, until = parse_time(since), parse_time(until)
+    _ensure_schema()
+    db_conn = get_connection(DB_PATH)
+    partitions = list_partitions(db_conn)
+    found: dict[tuple, dict] = {}
+
+    def merge(process_name, pid, samples, first_seen, last_seen):
+        entry = found.setdefault((process_name, pid), {
+            'process_name': process_name, 'pid': pid, 'samples': 0, 'first_seen': first_seen, 'last_seen': last_seen
+        })
+        entry['samples'] += samples
+        entry['first_seen'] = min(entry['first_seen'], first_seen)
+        entry['last_seen'] = max(entry['last_seen'], last_seen)
+
+    clauses, params = _where('connections', 'timestamp', since, until, {'remote_ip': remote_ip})
+    for table in partitions:
+        if (since and partition_day(table) < since[:10]) or (until and partition_day(table) > until[:10]):
+            continue
+        for row in db_conn.execute(
+            f'SELECT process_name, pid, COUNT(*), MIN(timestamp), MAX(timestamp) FROM {table} '
+            f'WHERE {" AND ".join(clauses)} GROUP BY process_name, pid', params
+        ):
+            merge(*row)
+
+    # Rolled-up history from before the oldest raw partition
+    oldest = partition_day(partitions[0]) if partitions else None
+    rollup_until = min(filter(None, (until and until[:16], oldest)), default=None)
+    clauses, params = _where('rollups', 'minute', since and since[:16], rollup_until, {'remote_ip': remote_ip})
+    for row in db_conn.execute(
+        f'SELECT process_name, NULL, SUM(samples), MIN(minute), MAX(minute) FROM connection_rollups '
+        f'WHERE {" AND ".join(clauses)} GROUP BY process_name', params
+    ):
+        merge(*row)
+    return sorted(found.values(), key=lambda entry: entry['last_seen'], reverse=True)
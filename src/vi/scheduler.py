@@ -0,0 +1,114 @@
+# Fixed-cadence scan scheduler for the daemon loop.
+# Scan deadlines are laid out on a monotonic clock, so the period does not stretch by
+# the time each scan takes. A scan that runs past the next deadline is reported as an
+# overrun and the missed ticks are skipped rather than run back to back. Optionally the
+# interval adapts between min_interval and max_interval: shorter while flows are
+# opening, longer while the host is idle, and never so short that the scan itself
+# takes more than max_duty_cycle of the period.
+
+import logging
+import signal
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class ScanScheduler:
+    def __init__(self, interval: float, adaptive: bool = False,
+                 min_interval: Optional[float] = None, max_interval: Optional[float] = None,
+                 churn_threshold: float = 0.05, max_duty_cycle: float = 0.5,
+                 speedup: float = 0.5, slowdown: float = 1.25):
+        self.base_interval = float(interval)
+        self.interval = float(interval)
+        self.adaptive = adaptive
+        self.min_interval = float(min_interval if min_interval is not None else interval)
+        self.max_interval = float(max_interval if max_interval is not None else interval)
+        self.churn_threshold = churn_threshold
+        self.max_duty_cycle = max_duty_cycle
+        self.speedup = speedup
+        self.slowdown = slowdown
+        self.scans = 0
+        self.overruns = 0
+        self.skipped_ticks = 0
+        self.last_cost = 0.0
+        self._deadline: Optional[float] = None
+        self._started_at: Optional[float] = None
+        self._stop = threading.Event()
+        self.stopped_by: Optional[int] = None
+
+    def wait(self) -> bool:
+        """Sleeps until the next scan is due. Returns False once stop() has been called."""
+        now = time.monotonic()
+        if self._deadline is None:
+            self._deadline = now
+        delay = self._deadline - now
+        if delay > 0 and self._stop.wait(delay):
+            return False
+        self._started_at = time.monotonic()
+        return not self._stop.is_set()
+
+    def finished(self, opened: int = 0, closed: int = 0, active: int = 0):
+        """
+        Records the end of a scan: measures its cost, adapts the interval to the
+        scan's churn (flows opened and closed out of those active) and schedules
+        the next deadline one interval after this scan's.
+        """
+        now = time.monotonic()
+        started = self._started_at if self._started_at is not None else now
+        self.last_cost = now - started
+        self.scans += 1
+        if self.adaptive:
+            self._adapt(opened, closed, active)
+
+        self._deadline += self.interval
+        if now > self._deadline:
+            missed = int((now - self._deadline) // self.interval) + 1
+            self._deadline += missed * self.interval
+            self.overruns += 1
+            self.skipped_ticks += missed
+            logger.warning(
+                f"[SCHED] Scan took {self.last_cost:.2f}s, overrunning the {self.interval:.1f}s period; "
+                f"skipped {missed} tick(s) ({self.overruns} overrun(s) so far)"
+            )
+
+    def _adapt(self, opened: int, closed: int, active: int):
+        churn = (opened + closed) / max(active, 1)
+        interval = self.interval
+        if opened and churn >= self.churn_threshold:
+            interval *= self.speedup
+        elif not opened and not closed:
+            interval *= self.slowdown
+        # Keep the scan's own cost within the duty cycle
+        interval = max(interval, self.last_cost / self.max_duty_cycle)
+        interval = min(max(interval, self.min_interval), self.max_interval)
+        if interval != self.interval:
+            logger.debug(f"[SCHED] Interval {self.interval:.2f}s -> {interval:.2f}s "
+                          f"(churn {churn:.2%}, scan cost {self.last_cost:.2f}s)")
+            self.interval = interval
+
+    def stop(self):
+        self._stop.set()
+
+    def stop_on_signals(self, signums=(signal.SIGTERM, signal.SIGINT)):
+        """
+        Makes the given signals (launchd stops with SIGTERM) call stop(), so the scan
+        loop ends after the current scan instead of the process dying mid-scan.
+        Must be called from the main thread.
+        """
+        for signum in signums:
+            signal.signal(signum, self._on_signal)
+
+    def _on_signal(self, signum, frame):
+        # Only sets the event: logging here could deadlock on a lock the interrupted code holds
+        self.stopped_by = signum
+        self.stop()
+
+    def stats(self) -> dict:
+        return {
+            'interval': self.interval,
+            'scans': self.scans,
+            'overruns': self.overruns,
+            'skipped_ticks': self.skipped_ticks,
+            'last_cost': self.last_cost
+        }
@@ -0,0 +1,291 @@
+# Streaming per-feature statistics for Vi's behavioral baseline.
+# Accumulators are updated with every snapshot and periodically persisted to the
+# baseline_stats table, so the baseline never needs a full scan of `connections`.
+
+import logging
+import math
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from vi.config import config
+from vi.connections.storage import DB_PATH
+from vi.db import get_connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# Features tracked in the baseline, as named in the connections table
+FEATURES = ('cpu_percent', 'memory_rss', 'connection_count', 'duration_seconds')
+
+
+def feature_matrix(connections) -> np.ndarray:
+    """Builds the (n, len(FEATURES)) matrix of baseline features for a snapshot."""
+    return np.array(
+        [[c.cpu_percent or 0, c.memory_rss or 0, c.connection_count or 0, c.duration_seconds or 0]
+         for c in connections],
+        dtype=np.float64
+    ).reshape(len(connections), len(FEATURES))
+
+
+class RunningStats:
+    """Exact mean/variance over every sample seen (Welford, merged per batch)."""
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, values: np.ndarray):
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        self.merge(n, batch_mean, batch_m2)
+
+    # Chan et al. parallel combination of two partial aggregates
+    def merge(self, count: int, mean: float, m2: float):
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+
+class EWMAStats(RunningStats):
+    """Exponentially weighted mean/variance; alpha is the weight of each snapshot."""
+
+    def __init__(self, alpha: float, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        super().__init__(count, mean, m2)
+        self.alpha = alpha
+        self.variance = m2 / count if count else 0.0
+
+    def update(self, values: np.ndarray):
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = float(values.mean())
+        batch_var = float(values.var())
+        if self.count == 0:
+            self.mean, self.variance = batch_mean, batch_var
+        else:
+            delta = batch_mean - self.mean
+            self.mean += self.alpha * delta
+            self.variance = (1 - self.alpha) * (self.variance + self.alpha * delta * delta) + self.alpha * batch_var
+        self.count += n
+        self.m2 = self.variance * self.count
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class WindowStats(RunningStats):
+    """Mean/variance over the last `window` snapshots only."""
+
+    def __init__(self, window: int, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        super().__init__()
+        self.blocks: deque = deque(maxlen=window)
+        if count:
+            # A persisted window is restored as a single block
+            self.blocks.append((count, mean, m2))
+        self._recombine()
+
+    def update(self, values: np.ndarray):
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = float(values.mean())
+        self.blocks.append((n, batch_mean, float(((values - batch_mean) ** 2).sum())))
+        self._recombine()
+
+    def _recombine(self):
+        self.count, self.mean, self.m2 = 0, 0.0, 0.0
+        for block in self.blocks:
+            self.merge(*block)
+
+
+class BaselineAccumulator:
+    """
+    Holds one accumulator per feature, and optionally per (process_name, feature).
+    mode is 'cumulative', 'ewma' or 'window'.
+    """
+
+    def __init__(self, mode: str = 'cumulative', per_process: bool = False,
+                 window_snapshots: int = 360, ewma_alpha: float = 0.05):
+        self.mode = mode
+        self.per_process = per_process
+        self.window_snapshots = window_snapshots
+        self.ewma_alpha = ewma_alpha
+        self.global_stats: dict[str, RunningStats] = {f: self._new() for f in FEATURES}
+        self.process_stats: dict[str, dict[str, RunningStats]] = {}
+        self._lock = threading.Lock()
+
+    def _new(self, count: int = 0, mean: float = 0.0, m2: float = 0.0) -> RunningStats:
+        if self.mode == 'ewma':
+            return EWMAStats(self.ewma_alpha, count, mean, m2)
+        if self.mode == 'window':
+            return WindowStats(self.window_snapshots, count, mean, m2)
+        return RunningStats(count, mean, m2)
+
+    def update(self, connections):
+        """Folds one snapshot into the accumulators."""
+        if not connections:
+            return
+        matrix = feature_matrix(connections)
+        with self._lock:
+            for i, feature in enumerate(FEATURES):
+                self.global_stats[feature].update(matrix[:, i])
+            if self.per_process:
+                rows_by_process: dict[str, list[int]] = {}
+                for row, c in enumerate(connections):
+                    rows_by_process.setdefault(c.process_name, []).append(row)
+                for name, rows in rows_by_process.items():
+                    stats = self.process_stats.get(name)
+                    if stats is None:
+                        stats = self.process_stats[name] = {f: self._new() for f in FEATURES}
+                    block = matrix[rows]
+                    for i, feature in enumerate(FEATURES):
+                        stats[feature].update(block[:, i])
+
+    def get(self, feature: str, process_name: Optional[str] = None) -> tuple[int, float, float]:
+        """Returns (sample_count, mean, stddev) for a feature, globally or for one process."""
+        with self._lock:
+            if process_name is not None:
+                stats = self.process_stats.get(process_name, {}).get(feature)
+            else:
+                stats = self.global_stats.get(feature)
+            if stats is None:
+                return 0, 0.0, 0.0
+            return stats.count, stats.mean, stats.stddev
+
+    def arrays(self, process_names: Optional[list] = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns (counts, means, stddevs) as arrays of shape (len(FEATURES),), or of
+        shape (len(process_names), len(FEATURES)) with one row per name. Processes
+        without enough samples of their own fall back to the global statistics.
+        """
+        with self._lock:
+            global_row = [(s.count, s.mean, s.stddev) for s in (self.global_stats[f] for f in FEATURES)]
+            if process_names is None:
+                return tuple(np.array(col, dtype=np.float64) for col in zip(*global_row))
+            min_samples = config.anomaly['min_samples']
+            rows = []
+            for name in process_names:
+                stats = self.process_stats.get(name)
+                row = []
+                for i, feature in enumerate(FEATURES):
+                    s = stats.get(feature) if stats else None
+                    row.append((s.count, s.mean, s.stddev) if s and s.count >= min_samples else global_row[i])
+                rows.append(row)
+        table = np.array(rows, dtype=np.float64).reshape(len(process_names), len(FEATURES), 3)
+        return table[:, :, 0], table[:, :, 1], table[:, :, 2]
+
+    def is_ready(self, feature: str, process_name: Optional[str] = None) -> bool:
+        """True once enough samples exist for detection (anomaly.min_samples)."""
+        return self.get(feature, process_name)[0] >= config.anomaly['min_samples']
+
+    def load(self):
+        """Restores accumulators from baseline_stats, seeding legacy rows from the raw table once."""
+        conn = get_connection(DB_PATH)
+        rows = {
+            name: (count, mean, m2)
+            for name, count, mean, m2 in conn.execute(
+                'SELECT feature_name, sample_count, mean, m2 FROM baseline_stats'
+            )
+        }
+        with self._lock:
+            for feature in FEATURES:
+                count, mean, m2 = rows.get(feature, (None, None, None))
+                if not count or m2 is None:
+                    count, mean, m2 = _seed_from_connections(conn, feature)
+                self.global_stats[feature] = self._new(count, mean, m2)
+            if self.per_process:
+                for name, feature, count, mean, m2 in conn.execute(
+                    'SELECT process_name, feature_name, sample_count, mean, m2 FROM process_baseline_stats'
+                ):
+                    if feature in FEATURES:
+                        self.process_stats.setdefault(name, {f: self._new() for f in FEATURES})[feature] = \
+                            self._new(count, mean, m2)
+        logger.info(
+            f"[BASELINE] Loaded streaming stats ({self.mode}); "
+            + ", ".join(f"{f}: n={self.global_stats[f].count}" for f in FEATURES)
+        )
+
+    def persist(self):
+        """Writes current accumulators to baseline_stats (and process_baseline_stats)."""
+        last_updated = datetime.now().isoformat()
+        with self._lock:
+            global_rows = [
+                (f, s.mean, s.stddev, s.count, s.m2, last_updated) for f, s in self.global_stats.items()
+            ]
+            process_rows = [
+                (name, f, s.mean, s.stddev, s.count, s.m2, last_updated)
+                for name, stats in self.process_stats.items() for f, s in stats.items() if s.count
+            ]
+        with transaction(DB_PATH) as conn:
+            conn.executemany('''
+                INSERT INTO baseline_stats (feature_name, mean, stddev, sample_count, m2, last_updated)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(feature_name) DO UPDATE SET
+                    mean=excluded.mean,
+                    stddev=excluded.stddev,
+                    sample_count=excluded.sample_count,
+                    m2=excluded.m2,
+                    last_updated=excluded.last_updated
+            ''', global_rows)
+            conn.executemany('''
+                INSERT INTO process_baseline_stats
+                    (process_name, feature_name, mean, stddev, sample_count, m2, last_updated)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(process_name, feature_name) DO UPDATE SET
+                    mean=excluded.mean,
+                    stddev=excluded.stddev,
+                    sample_count=excluded.sample_count,
+                    m2=excluded.m2,
+                    last_updated=excluded.last_updated
+            ''', process_rows)
+        for feature, mean, stddev, count, _, _ in global_rows:
+            logger.debug(f"[BASELINE] Stats persisted for {feature}: n={count}, mean={mean:.2f}, stddev={stddev:.2f}")
+
+
+# One-time aggregate for baselines persisted before sample counts existed: a
+# vectorized pass over the feature store when it has rows, else a scan of the raw table
+def _seed_from_connections(conn, feature: str) -> tuple[int, float, float]:
+    if config.features['enabled']:
+        from vi.feature_store import get_feature_store
+        count, mean, m2 = get_feature_store().stats(feature)
+        if count:
+            return count, mean, m2
+    count, mean, mean_sq = conn.execute(
+        f"SELECT COUNT({feature}), AVG({feature}), AVG({feature} * {feature}) "
+        f"FROM connections WHERE {feature} IS NOT NULL"
+    ).fetchone()
+    if not count:
+        return 0, 0.0, 0.0
+    return count, mean, max(count * (mean_sq - mean * mean), 0.0)
+
+
+_accumulator: Optional[BaselineAccumulator] = None
+
+def get_baseline_accumulator() -> BaselineAccumulator:
+    """Returns the process-wide accumulator, restoring it from SQLite on first use."""
+    global _accumulator
+    if _accumulator is None:
+        _accumulator = BaselineAccumulator(
+            mode=config.baseline['mode'],
+            per_process=config.baseline['per_process'],
+            window_snapshots=config.baseline['window_snapshots'],
+            ewma_alpha=config.baseline['ewma_alpha']
+        )
+        _accumulator.load()
+    return _accumulator
@@ -0,0 +1,248 @@
+# Alert suppression: once an alert fires for a key (e.g. ('outlier', process, ip,
+# port)), repeats of it are suppressed for a TTL that depends on the anomaly type.
+# Suppressed repeats are counted and written to the alerts table as one aggregated
+# row per key and TTL window (alerts.suppressed holds the count), which each flush
+# brings up to date, so a noisy key costs one alert and one row per window however
+# long the incident lasts. At most max_entries keys are held,
+# evicting the least recently seen, and the keys are persisted in alerts.sqlite
+# (table alert_suppression), so a restart does not re-alert everything it knew. A
+# key is saved as soon as its alert fires, in the caller's alerts transaction, so
+# even a killed daemon keeps it; the periodic flush only brings counts up to date.
+
+import atexit
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from vi.alerts import DB_PATH, init_alerts_db, record_suppressed
+from vi.config import config
+from vi.db import get_connection, transaction
+from vi.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+class Entry:
+    __slots__ = ('anomaly_type', 'alerted_at', 'last_seen', 'suppressed', 'first_suppressed', 'last_suppressed',
+                 'process_name', 'pid', 'remote_ip', 'remote_port', 'severity', 'written', 'row_id')
+
+    def __init__(self, anomaly_type: str, alerted_at: float, conn_obj=None, severity: Optional[str] = None):
+        self.anomaly_type = anomaly_type
+        self.alerted_at = alerted_at
+        self.last_seen = alerted_at
+        # Repeats in this window; the first `written` of them are on the aggregated row
+        self.suppressed = 0
+        self.written = 0
+        self.row_id: Optional[int] = None
+        self.first_suppressed: Optional[float] = None
+        self.last_suppressed: Optional[float] = None
+        # Details of the latest occurrence, for the aggregated row
+        self.process_name = getattr(conn_obj, 'process_name', None)
+        self.pid = getattr(conn_obj, 'pid', None)
+        self.remote_ip = getattr(conn_obj, 'remote_ip', None)
+        self.remote_port = getattr(conn_obj, 'remote_port', None)
+        self.severity = severity
+
+    def aggregated_row(self) -> tuple:
+        return (
+            datetime.fromtimestamp(self.first_suppressed).strftime('%Y-%m-%d %H:%M:%S'),
+            self.anomaly_type, self.process_name, self.pid, self.remote_ip, self.remote_port, self.severity,
+            self.suppressed, datetime.fromtimestamp(self.last_suppressed).strftime('%Y-%m-%d %H:%M:%S')
+        )
+
+_COLUMNS = Entry.__slots__
+
+def init_suppression_table():
+    with transaction(DB_PATH) as conn:
+        conn.execute('''
+          CREATE TABLE IF NOT EXISTS alert_suppression (
+            key TEXT PRIMARY KEY,
+            anomaly_type TEXT,
+            alerted_at REAL,
+            last_seen REAL,
+            suppressed INTEGER,
+            first_suppressed REAL,
+            last_suppressed REAL,
+            process_name TEXT,
+            pid INTEGER,
+            remote_ip TEXT,
+            remote_port INTEGER,
+            severity TEXT,
+            written INTEGER DEFAULT 0,
+            row_id INTEGER
+          )
+        ''')
+        # Tables created before rows were updated in place lack their bookkeeping
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(alert_suppression)')}
+        if 'written' not in columns:
+            conn.execute('ALTER TABLE alert_suppression ADD COLUMN written INTEGER DEFAULT 0')
+        if 'row_id' not in columns:
+            conn.execute('ALTER TABLE alert_suppression ADD COLUMN row_id INTEGER')
+
+class SuppressionStore:
+    """
+    check() decides whether an occurrence alerts or is suppressed, saving the key of
+    an alert that fires; flush() brings the aggregated rows of suppressed repeats up
+    to date and saves changed keys. Both are called from the detection stage, inside
+    its alerts transaction, so a key commits together with its alert row.
+    """
+
+    def __init__(self, ttls: dict, default_ttl: float, max_entries: int, flush_interval: float):
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.entries: OrderedDict[tuple, Entry] = OrderedDict()
+        self._dirty: set[tuple] = set()
+        self._removed: set[tuple] = set()
+        self._last_flush = time.time()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.suppressed_total = 0
+
+    def ttl(self, anomaly_type: str) -> float:
+        return self.ttls.get(anomaly_type, self.default_ttl)
+
+    def check(self, key: tuple, conn_obj, severity: str, now: Optional[float] = None) -> bool:
+        """
+        Returns True if the alert for key should fire, i.e. it is new or its TTL has
+        passed; otherwise counts the occurrence as suppressed and returns False.
+        The first element of key is the anomaly type.
+        """
+        now = now or time.time()
+        anomaly_type = key[0]
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and now - entry.alerted_at < self.ttl(anomaly_type):
+                entry.suppressed += 1
+                entry.first_suppressed = entry.first_suppressed or now
+                entry.last_suppressed = now
+                entry.last_seen = now
+                entry.pid, entry.remote_ip = getattr(conn_obj, 'pid', None), getattr(conn_obj, 'remote_ip', None)
+                self.entries.move_to_end(key)
+                self._dirty.add(key)
+                self.suppressed_total += 1
+                registry.counter('vi_alerts_suppressed_total', 'Repeated alerts suppressed',
+                                 type=anomaly_type).inc()
+                return False
+
+            if entry is not None:
+                # The window that just ended may still owe its row the latest repeats
+                self._write(entry)
+            self.entries[key] = Entry(anomaly_type, now, conn_obj, severity)
+            self.entries.move_to_end(key)
+            self._removed.discard(key)
+            self._save([key])
+            self._evict()
+            return True
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            key, entry = self.entries.popitem(last=False)
+            self._write(entry)
+            self._dirty.discard(key)
+            self._removed.add(key)
+            self.evictions += 1
+
+    def _save(self, keys):
+        with transaction(DB_PATH) as conn:
+            conn.executemany(
+                f'INSERT OR REPLACE INTO alert_suppression (key, {", ".join(_COLUMNS)}) '
+                f'VALUES ({", ".join("?" * (len(_COLUMNS) + 1))})',
+                [(json.dumps(key),) + tuple(getattr(self.entries[key], c) for c in _COLUMNS) for key in keys]
+            )
+
+    @staticmethod
+    def _write(entry: Entry) -> int:
+        # Inserts the window's aggregated row, or updates it with repeats since the
+        # last write; returns the number of repeats newly recorded
+        pending = entry.suppressed - entry.written
+        if pending:
+            entry.row_id = record_suppressed(entry.aggregated_row(), entry.row_id)
+            entry.written = entry.suppressed
+        return pending
+
+    def maybe_flush(self, now: Optional[float] = None):
+        now = now or time.time()
+        if now - self._last_flush >= self.flush_interval:
+            self.flush(now)
+
+    def flush(self, now: Optional[float] = None) -> int:
+        """
+        Writes the repeats suppressed since the last flush to each key's aggregated
+        row, forgets keys whose TTL has passed, and saves the changes. Returns the
+        rows inserted or updated.
+        """
+        now = now or time.time()
+        rows = repeats = 0
+        with self._lock, transaction(DB_PATH) as conn:
+            expired = []
+            for key, entry in self.entries.items():
+                pending = self._write(entry)
+                if pending:
+                    rows += 1
+                    repeats += pending
+                    self._dirty.add(key)
+                if now - entry.alerted_at >= self.ttl(entry.anomaly_type):
+                    expired.append(key)
+            for key in expired:
+                del self.entries[key]
+            self._removed.update(expired)
+            self._dirty.difference_update(expired)
+            conn.executemany('DELETE FROM alert_suppression WHERE key = ?',
+                             [(json.dumps(key),) for key in self._removed])
+            self._save(self._dirty)
+            self._dirty.clear()
+            self._removed.clear()
+            self._last_flush = now
+        if rows:
+            logger.info(f"[ALERT] Recorded {repeats} suppressed repeat(s) in {rows} aggregated row(s)")
+        return rows
+
+    def load(self):
+        """Restores the most recently seen keys whose TTL has not passed, or whose row is behind."""
+        init_suppression_table()
+        now = time.time()
+        conn = get_connection(DB_PATH)
+        cursor = conn.execute(
+            f'SELECT key, {", ".join(_COLUMNS)} FROM alert_suppression ORDER BY last_seen DESC LIMIT ?',
+            (self.max_entries,)
+        )
+        restored = []
+        for key, *values in cursor:
+            entry = Entry(values[0], values[1])
+            for column, value in zip(_COLUMNS, values):
+                setattr(entry, column, value)
+            if entry.suppressed > entry.written or now - entry.alerted_at < self.ttl(entry.anomaly_type):
+                restored.append((tuple(json.loads(key)), entry))
+        with self._lock:
+            self.entries = OrderedDict(reversed(restored))
+        logger.info(f"[ALERT] Restored {len(self.entries)} suppressed alert key(s)")
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self.entries),
+            'suppressed_total': self.suppressed_total,
+            'evictions': self.evictions
+        }
+
+_store: Optional[SuppressionStore] = None
+
+def get_suppression_store() -> SuppressionStore:
+    """Returns the process-wide store configured under [suppression], restoring it on first use."""
+    global _store
+    if _store is None:
+        init_alerts_db()
+        _store = SuppressionStore(
+            ttls=config.suppression['ttl'],
+            default_ttl=config.suppression['default_ttl'],
+            max_entries=config.suppression['max_entries'],
+            flush_interval=config.suppression['flush_interval']
+        )
+        _store.load()
+        # Counts suppressed since the last flush are written on shutdown
+        atexit.register(_store.flush)
+    return _store
@@ -5,16 +5,33 @@ import psutil
 import logging
 from datetime import datetime
 
+from vi.logs import preview
+
+logger = logging.getLogger(__name__)
+
 # Fetches OS boot timestamp w/ psutil
 def log_boot_time():
     boot_time = datetime.fromtimestamp(psutil.boot_time())
-    logging.info(f'Boot Time: {boot_time}')
+    logger.info(f'Boot Time: {boot_time}')
+
+# (pid, name) of the processes running at the previous call
+_last_processes: set[tuple[int, str]] = set()
 
-# Logs PID and name for running processes
+# Logs one summary of running processes: how many, and which started or exited since the last call
 def log_active_processes():
-    logging.info('Active Processes:')
+    global _last_processes
+    processes = set()
     for proc in psutil.process_iter(['pid', 'name']):
         try:
-            logging.info(f'     PID: {proc.info["pid"]}, Name: {proc.info["name"]}')
+            processes.add((proc.info["pid"], proc.info["name"]))
         except (psutil.NoSuchProcess, psutil.AccessDenied):
-            continue
\ No newline at end of file
+            continue
+    started = sorted(processes - _last_processes)
+    exited = sorted(_last_processes - processes)
+    _last_processes = processes
+    logger.info(
+        f"[SYSTEM] {len(processes)} active process(es), {len(started)} started, {len(exited)} exited",
+        extra={'processes': len(processes), 'started': len(started), 'exited': len(exited)}
+    )
+    if started and logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"[SYSTEM] Started: {preview(f'{name} ({pid})' for pid, name in started)}")
\ No newline at end of file